@@ -0,0 +1,237 @@
+"""
+Offline benchmark of the scrape → extract → clean → split → parse pipeline.
+
+Bright Data and Gemini are replaced by the fakes in bench/fakes.py, so numbers only reflect
+our own code plus the configured fake latencies. Each stage is timed per fixture for
+throughput and p50/p95 latency, then run once more under tracemalloc for peak memory.
+Results are written as JSON; pass --baseline to compare against an earlier run.
+
+    python bench/benchmark.py --iterations 10 --llm-latency 0.05
+    python bench/benchmark.py --baseline bench/results/previous.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+INVOCATION_DIR = os.getcwd()
+
+# The app resolves ../.env and ../logs relative to src/, and must not touch real services or caches
+os.chdir(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+os.environ.update({
+    "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY") or "benchmark",
+    "RESPONSE_CACHE_ENABLED": "false",
+    "PAGE_CACHE_ENABLED": "false",
+    "SCRAPER_HTTP_FIRST": "false",
+    "DEDUP_MEMORY_PATH": "",
+})
+
+import logging  # noqa: E402
+
+from fakes import FakeGenaiClient, FakeRemoteDriver  # noqa: E402
+from fixtures import load_fixtures  # noqa: E402
+from scrape import WebScraper  # noqa: E402
+from parse import GeminiParser  # noqa: E402
+from rate_limit import RateLimiter  # noqa: E402
+from dedup import ContentDeduplicator  # noqa: E402
+from structured import ExtractionSchema  # noqa: E402
+
+FIXTURE_HOST = "https://fixtures.local"
+BENCH_SCHEMA = ExtractionSchema.parse("name*: string\nprice: number\nstock: integer\navailable: boolean")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def measure(fn: Callable[[], Any], iterations: int, input_bytes: int, warmup: int = 1) -> Dict[str, float]:
+    """Latency distribution and throughput over several runs, plus peak memory of one traced run"""
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    return {
+        "iterations": iterations,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "ops_per_s": iterations / total if total else 0.0,
+        "mb_per_s": input_bytes * iterations / total / 1e6 if total else 0.0,
+        "peak_mem_mb": peak / 1e6,
+    }
+
+
+def build_pipeline(pages: Dict[str, str], args: argparse.Namespace):
+    driver_seed = iter(range(1_000_000))
+    scraper = WebScraper(
+        pool_size=args.scrape_concurrency,
+        driver_factory=lambda: FakeRemoteDriver(pages, args.browser_latency, args.browser_latency / 4, seed=next(driver_seed)),
+        http_first=False,
+        deduplicator=ContentDeduplicator(memory=None),
+    )
+    parser = GeminiParser(
+        max_workers=args.parse_concurrency,
+        rate_limiter=RateLimiter(rpm=1_000_000, tpm=1_000_000_000, max_concurrency=args.parse_concurrency, base_delay=0.01, max_delay=0.1),
+    )
+    parser.client = FakeGenaiClient(
+        latency=args.llm_latency, per_kchar=args.llm_per_kchar,
+        failure_rate=args.llm_failure_rate, throttle_rate=args.llm_throttle_rate, seed=1,
+    )
+    return scraper, parser
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    pages = load_fixtures()
+    scraper, parser = build_pipeline(pages, args)
+    names = args.fixtures or list(pages)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in names:
+        html = pages[name]
+        url = f"{FIXTURE_HOST}/{name}"
+        body = scraper.extract_body_content(html)
+        cleaned = scraper.clean_body_content(body)
+        chunks = scraper.split_dom_content(cleaned, args.chunk_tokens)
+        size = len(html.encode("utf-8"))
+        print(f"{name}: {size / 1e3:.0f} KB html, {len(cleaned) / 1e3:.0f} K chars text, {len(chunks)} chunks", file=sys.stderr)
+
+        def end_to_end():
+            scraped = scraper.fetch_page(url)
+            text = scraper.extract_clean_content(scraped.html)
+            text, _ = scraper.dedup_content(text, url)
+            return parser.parse_with_gemini(scraper.split_dom_content(text, args.chunk_tokens), args.query)
+
+        stages = {
+            "scrape": lambda: scraper.fetch_page(url),
+            "extract_body_content": lambda: scraper.extract_body_content(html),
+            "clean_body_content": lambda: scraper.clean_body_content(body),
+            "extract_clean_content": lambda: scraper.extract_clean_content(html),
+            "dedup_content": lambda: scraper.dedup_content(cleaned, url),
+            "split_dom_content": lambda: scraper.split_dom_content(cleaned, args.chunk_tokens),
+            "stream_chunks": lambda: sum(1 for _ in scraper.stream_chunks(html, args.chunk_tokens)),
+            "parse_with_gemini": lambda: parser.parse_with_gemini(chunks, args.query),
+            "parse_structured": lambda: parser.parse_structured(chunks, BENCH_SCHEMA, args.query),
+            "end_to_end": end_to_end,
+        }
+        results[name] = {"html_bytes": size, "text_chars": len(cleaned), "chunks": len(chunks)}
+        for stage, fn in stages.items():
+            if args.stages and stage not in args.stages:
+                continue
+            results[name][stage] = measure(fn, args.iterations, size)
+
+    scraper.close()
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+            "llm_calls": parser.client.models.calls,
+            "llm_retries": parser.rate_limiter.retries,
+        },
+        "results": results,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=BENCH_DIR
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    print(f"{'fixture':8} {'stage':22} {'p50 ms':>9} {'p95 ms':>9} {'ops/s':>8} {'MB/s':>8} {'peak MB':>8}" + ("  Δp50" if baseline else ""))
+    for name, stages in report["results"].items():
+        for stage, stats in stages.items():
+            if not isinstance(stats, dict):
+                continue
+            line = (
+                f"{name:8} {stage:22} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} "
+                f"{stats['ops_per_s']:8.1f} {stats['mb_per_s']:8.2f} {stats['peak_mem_mb']:8.2f}"
+            )
+            previous = (baseline or {}).get("results", {}).get(name, {}).get(stage)
+            if previous and previous.get("p50_ms"):
+                line += f"  {(stats['p50_ms'] / previous['p50_ms'] - 1) * 100:+.1f}%"
+            print(line)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser(description="Offline pipeline benchmark with fake browser and Gemini backends")
+    arg_parser.add_argument("--iterations", type=int, default=5)
+    arg_parser.add_argument("--fixtures", nargs="*", help="fixture names to run (default: all)")
+    arg_parser.add_argument("--stages", nargs="*", help="stage names to run (default: all)")
+    arg_parser.add_argument("--chunk-tokens", type=int, default=1500)
+    arg_parser.add_argument("--query", default="Extract all product names and prices")
+    arg_parser.add_argument("--scrape-concurrency", type=int, default=2)
+    arg_parser.add_argument("--parse-concurrency", type=int, default=4)
+    arg_parser.add_argument("--browser-latency", type=float, default=0.0, help="fake page load time in seconds")
+    arg_parser.add_argument("--llm-latency", type=float, default=0.0, help="fake fixed model latency in seconds")
+    arg_parser.add_argument("--llm-per-kchar", type=float, default=0.0, help="fake model latency per 1000 prompt chars")
+    arg_parser.add_argument("--llm-failure-rate", type=float, default=0.0, help="fraction of calls failing with 503")
+    arg_parser.add_argument("--llm-throttle-rate", type=float, default=0.0, help="fraction of calls failing with 429")
+    arg_parser.add_argument("--output", help="result JSON path (default: bench/results/<timestamp>.json)")
+    arg_parser.add_argument("--baseline", help="earlier result JSON to compare against")
+    arg_parser.add_argument("--verbose", action="store_true", help="keep the application's INFO logs")
+    return arg_parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    for option in ("output", "baseline"):
+        if getattr(args, option):
+            setattr(args, option, os.path.join(INVOCATION_DIR, getattr(args, option)))
+    if not args.verbose:
+        for name in ("scraper", "parser", "main", "cache"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    report = run(args)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"\nResults saved to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
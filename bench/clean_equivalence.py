@@ -0,0 +1,74 @@
+"""
+Equivalence check for the HTML cleaners.
+
+Edge-case documents (template and textarea contents, missing or nested body, stray text
+and a title in head, unknown entities, comments) are cleaned four ways, which must all
+give exactly the expected text:
+
+- the streaming cleaner, fed the whole page and fed a few characters at a time;
+- the BeautifulSoup tree cleaner (extract_clean_content with streaming off);
+- the two-step pair extract_body_content, then clean_body_content.
+
+Any difference fails the run, so it can gate CI alongside the benchmarks.
+
+    python bench/clean_equivalence.py
+"""
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+sys.path.insert(0, SRC_DIR)
+os.environ.setdefault("LOG_CONSOLE", "false")
+os.environ.setdefault("PAGE_CACHE_ENABLED", "false")
+
+import scrape  # noqa: E402
+from stream_clean import iter_clean_lines  # noqa: E402
+
+# name -> (html, cleaned text every path must produce)
+CASES: Dict[str, Tuple[str, str]] = {
+    "template": ("<html><body><template><p>tpl</p></template><p>svgt</p></body></html>", "svgt"),
+    "textarea": ("<html><body><textarea>a &lt;b&gt; c</textarea><p>y</p></body></html>", "a <b> c\ny"),
+    "no body": ("<p>frag</p> trailing text", "frag\ntrailing text"),
+    "nested body": ("<html><body><p>a</p><body><p>b</p></body><p>c</p></body></html>", "a\nb\nc"),
+    "stray head text": ("<html><head>stray<title>T</title></head><body><p>b</p></body></html>", "b"),
+    "unclosed head": ("<html><head><title>T</title><meta name='x'><body><p>b</p></body></html>", "b"),
+    "unknown entity": ("<html><body><p>a &bogus; b &amp; c</p></body></html>", "a &bogus; b & c"),
+    "comment": ("<html><body>a<!-- hidden -->b<script>x()</script><noscript>n</noscript></body></html>", "a\nb"),
+    "skipped in head": ("<html><head><style>p{}</style><script>y()</script></head><body>z</body></html>", "z"),
+    "header element": ("<html><body><header>top</header><p>b</p></body></html>", "top\nb"),
+}
+
+
+def outputs(scraper: scrape.WebScraper, html: str) -> Dict[str, str]:
+    streaming = scrape.SCRAPER_STREAMING_CLEAN
+    try:
+        scrape.SCRAPER_STREAMING_CLEAN = False
+        tree = scraper.extract_clean_content(html)
+        two_step = scraper.clean_body_content(scraper.extract_body_content(html))
+    finally:
+        scrape.SCRAPER_STREAMING_CLEAN = streaming
+    return {
+        "stream": "\n".join(iter_clean_lines(html)),
+        "stream (3-char feed)": "\n".join(iter_clean_lines(html, feed_chars=3)),
+        "tree": tree,
+        "two-step": two_step,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    scraper = scrape.WebScraper(http_first=False, deduplicator=None)
+    failures = 0
+    print(f"tree parser: {scrape.HTML_PARSER}")
+    for name, (html, expected) in CASES.items():
+        wrong = {path: text for path, text in outputs(scraper, html).items() if text != expected}
+        failures += bool(wrong)
+        print(f"{'FAIL' if wrong else 'ok  '} {name:16} {expected!r}")
+        for path, text in wrong.items():
+            print(f"     {path}: {text!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Offline stand-ins for the remote services: a selenium Remote driver serving fixture pages
+and a google-genai client, both with configurable latency and failure injection.
+"""
+import json
+import random
+import threading
+import time
+import types
+from typing import Dict, Iterator, Optional
+
+from google.genai import errors
+from selenium.common.exceptions import TimeoutException
+
+
+def _sleep(latency: float, jitter: float, rng: random.Random) -> None:
+    if latency > 0:
+        time.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+
+
+class FakeElement:
+    pass
+
+
+class FakeRemoteDriver:
+    """Implements the part of selenium's Remote driver that WebScraper uses"""
+
+    def __init__(self, pages: Dict[str, str], latency: float = 0.0, jitter: float = 0.0, timeout_rate: float = 0.0, seed: int = 0):
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.timeout_rate = timeout_rate
+        self.current_url = "about:blank"
+        self.page_source = ""
+        self._rng = random.Random(seed)
+
+    def set_page_load_timeout(self, timeout: float) -> None:
+        pass
+
+    def implicitly_wait(self, timeout: float) -> None:
+        pass
+
+    def get(self, url: str) -> None:
+        _sleep(self.latency, self.jitter, self._rng)
+        if self._rng.random() < self.timeout_rate:
+            raise TimeoutException(f"Fake page load timeout for {url}")
+        self.current_url = url
+        self.page_source = self.pages.get(url.rstrip("/").rsplit("/", 1)[-1], "<html><body></body></html>")
+
+    def execute(self, command: str, params: Optional[dict] = None) -> dict:
+        return {"value": {"status": "not_detected"}}
+
+    def execute_cdp_cmd(self, command: str, params: dict) -> dict:
+        return {}
+
+    def execute_script(self, script: str, *args):
+        return "complete"
+
+    def set_script_timeout(self, timeout: float) -> None:
+        pass
+
+    def execute_async_script(self, script: str, *args) -> dict:
+        return {"ready": True, "reason": "ready", "captcha": None, "waited_ms": 0}
+
+    def find_element(self, by: str, value: str) -> FakeElement:
+        return FakeElement()
+
+    def find_elements(self, by: str, value: str):
+        return [FakeElement()]
+
+    def quit(self) -> None:
+        pass
+
+
+class FakeModels:
+    """genai client.models with latency proportional to prompt size and injected errors"""
+
+    def __init__(self, latency: float = 0.0, per_kchar: float = 0.0, failure_rate: float = 0.0, throttle_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.per_kchar = per_kchar
+        self.failure_rate = failure_rate
+        self.throttle_rate = throttle_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self, contents: str) -> str:
+        with self._lock:
+            self.calls += 1
+            roll = self._rng.random()
+        _sleep(self.latency + self.per_kchar * len(contents) / 1000, 0.0, self._rng)
+        if roll < self.throttle_rate:
+            raise errors.ClientError(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": "fake quota"}})
+        if roll < self.throttle_rate + self.failure_rate:
+            raise errors.ServerError(503, {"error": {"code": 503, "status": "UNAVAILABLE", "message": "fake outage"}})
+        return f"extracted {len(contents)} chars"
+
+    @staticmethod
+    def _records(contents: str, response_schema: Dict) -> str:
+        """A JSON reply for a structured request: three records per chunk, one repeated across chunks"""
+        fake_values = {"STRING": lambda name, n: f"{name} {n}", "NUMBER": lambda name, n: n * 1.5,
+                       "INTEGER": lambda name, n: n, "BOOLEAN": lambda name, n: n % 2 == 0}
+        properties = response_schema["items"]["properties"]
+        rows = [0] + [len(contents) * 10 + n for n in range(1, 3)]
+        return json.dumps([
+            {name: fake_values[spec["type"]](name, row) for name, spec in properties.items()} for row in rows
+        ])
+
+    def generate_content(self, model: str, contents: str, **kwargs):
+        text = self._call(contents)
+        config = kwargs.get("config") or {}
+        if config.get("response_mime_type") == "application/json":
+            text = self._records(contents, config["response_schema"])
+        return types.SimpleNamespace(text=text)
+
+    def generate_content_stream(self, model: str, contents: str, **kwargs) -> Iterator:
+        text = self._call(contents)
+        for i in range(0, len(text), 8):
+            yield types.SimpleNamespace(text=text[i:i + 8])
+
+
+class FakeGenaiClient:
+    def __init__(self, **kwargs):
+        self.models = FakeModels(**kwargs)
@@ -0,0 +1,236 @@
+"""
+Local multi-page catalog site for exercising crawl mode without the network.
+
+Home → categories → paginated listings (?page=N, rel=next) → product pages, plus the
+usual crawl traps: tracking-parameter and fragment duplicates of the same pages, external
+and mailto links, image/PDF links, a rel=nofollow login link and a robots-nofollow page.
+The server counts hits per path and the peak number of concurrent requests, so a crawl
+can be checked for deduplication and per-host politeness.
+
+    python bench/fixture_site.py                  # crawl it and check the result
+    python bench/fixture_site.py --serve          # just serve it and print the URL
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+sys.path.insert(0, BENCH_DIR)
+
+from fixtures import SEED, _sentence  # noqa: E402
+
+CATEGORIES = ("laptops", "phones", "cameras")
+LISTING_PAGES = 3
+PRODUCTS_PER_PAGE = 4
+
+
+def _page(title: str, body: str, head: str = "") -> str:
+    navigation = "".join(f"<a href='/category/{category}'>{category.title()}</a> " for category in CATEGORIES)
+    return (
+        f"<!DOCTYPE html><html><head><title>{title}</title>{head}</head><body>"
+        f"<header><a href='/'>Home</a> {navigation}<a href='/about#team'>About</a> "
+        f"<a href='/login' rel='nofollow'>Log in</a></header>"
+        f"<main><h1>{title}</h1>{body}</main>"
+        f"<footer><a href='https://example.org/partner'>Partner</a> <a href='mailto:shop@example.com'>Email</a> "
+        f"<a href='/static/catalog.pdf'>Catalog PDF</a></footer></body></html>"
+    )
+
+
+def _product_slug(category: str, number: int) -> str:
+    return f"{category}-{number}"
+
+
+def build_site(seed: int = SEED) -> Dict[str, str]:
+    """Path (with query) → HTML for every crawlable page"""
+    rng = random.Random(f"{seed}:site")
+    pages: Dict[str, str] = {}
+
+    pages["/"] = _page("Fixture Shop", "".join(
+        f"<p>{_sentence(rng, 25)}</p>" for _ in range(3)
+    ) + "<a href='/category/laptops?utm_source=home'>Shop laptops</a> <img src='/static/banner.jpg'>")
+    pages["/about"] = _page("About us", "".join(f"<p>{_sentence(rng, 25)}</p>" for _ in range(3)))
+
+    for category in CATEGORIES:
+        for page_number in range(1, LISTING_PAGES + 1):
+            products = []
+            for slot in range(PRODUCTS_PER_PAGE):
+                number = (page_number - 1) * PRODUCTS_PER_PAGE + slot + 1
+                slug = _product_slug(category, number)
+                products.append(
+                    f"<li><a href='/product/{slug}'>{category.title()} {number}</a> "
+                    f"<a href='/product/{slug}?utm_campaign=list#reviews'>reviews</a> "
+                    f"<span>{_sentence(rng, 8)}</span> <span>${rng.randint(50, 2000)}</span></li>"
+                )
+            head = body_links = ""
+            if page_number < LISTING_PAGES:
+                next_url = f"/category/{category}?page={page_number + 1}"
+                head = f"<link rel='next' href='{next_url}'>"
+                body_links = f"<a href='{next_url}'>Next ›</a>"
+            if page_number > 1:
+                previous_url = f"/category/{category}" + (f"?page={page_number - 1}" if page_number > 2 else "")
+                body_links = f"<a href='{previous_url}'>‹ Previous</a> " + body_links
+            path = f"/category/{category}" + (f"?page={page_number}" if page_number > 1 else "")
+            pages[path] = _page(
+                f"{category.title()} – page {page_number}",
+                f"<p>{_sentence(rng, 20)}</p><ul>{''.join(products)}</ul><nav>{body_links}</nav>",
+                head,
+            )
+
+        for number in range(1, LISTING_PAGES * PRODUCTS_PER_PAGE + 1):
+            related = _product_slug(category, number % (LISTING_PAGES * PRODUCTS_PER_PAGE) + 1)
+            pages[f"/product/{_product_slug(category, number)}"] = _page(
+                f"{category.title()} {number}",
+                "".join(f"<p>{_sentence(rng, 20)}</p>" for _ in range(2))
+                + f"<p>Price: ${rng.randint(50, 2000)}</p>"
+                + f"<a href='/product/{related}'>Related product</a> "
+                + f"<a href='/category/{category}'>Back to {category}</a>",
+            )
+
+    # Reachable only through a nofollow link, so a polite crawl never fetches it
+    pages["/login"] = _page("Log in", "<p>" + _sentence(rng, 40) + "</p>", "<meta name='robots' content='noindex, nofollow'>")
+    return pages
+
+
+def expected_pages(max_depth: int) -> int:
+    """Pages a same-site crawl from / reaches when pagination does not count towards depth"""
+    count = 1
+    if max_depth >= 1:
+        count += 1 + len(CATEGORIES) * LISTING_PAGES
+    if max_depth >= 2:
+        count += len(CATEGORIES) * LISTING_PAGES * PRODUCTS_PER_PAGE
+    return count
+
+
+class FixtureSite(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, pages: Dict[str, str], latency: float = 0.1):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.pages = pages
+        self.latency = latency
+        self.hits: Dict[str, int] = {}
+        self.active = 0
+        self.peak_active = 0
+        self.starts: List[float] = []
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FixtureSite
+
+    def do_GET(self):
+        site = self.server
+        parts = urlsplit(self.path)
+        page_number = parse_qs(parts.query).get("page", ["1"])[0]
+        path = parts.path + (f"?page={page_number}" if parts.path.startswith("/category/") and page_number != "1" else "")
+        with site._lock:
+            site.hits[path] = site.hits.get(path, 0) + 1
+            site.active += 1
+            site.peak_active = max(site.peak_active, site.active)
+            site.starts.append(time.monotonic())
+        try:
+            time.sleep(site.latency)
+            body = site.pages.get(path)
+            status = 200 if body is not None else 404
+            data = (body or "<html><body>Not found</body></html>").encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            with site._lock:
+                site.active -= 1
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(pages: Optional[Dict[str, str]] = None, latency: float = 0.1) -> Tuple[FixtureSite, str]:
+    """Start the site on a free local port in a background thread; returns (server, base URL)"""
+    site = FixtureSite(pages or build_site(), latency)
+    threading.Thread(target=site.serve_forever, daemon=True).start()
+    return site, site.base_url
+
+
+def check_crawl(max_depth: int, per_host: int, delay: float) -> List[str]:
+    """Crawl the fixture site with the real Crawler and return the failed checks"""
+    os.environ.update({"PAGE_CACHE_ENABLED": "false", "DEDUP_MEMORY_PATH": "", "LOG_CONSOLE": "false"})
+    sys.path.insert(0, SRC_DIR)
+    from crawler import Crawler
+    from scrape import WebScraper
+
+    site, base_url = serve()
+    scraper = WebScraper(http_first=True, deduplicator=None)
+    crawler = Crawler(scraper, max_pages=500, max_depth=max_depth, concurrency=8, per_host=per_host, delay=delay)
+    start = time.perf_counter()
+    pages = list(crawler.crawl([base_url + "/?utm_source=seed"]))
+    elapsed = time.perf_counter() - start
+    site.shutdown()
+
+    gaps = [later - earlier for earlier, later in zip(site.starts, site.starts[1:])]
+    print(
+        f"{len(pages)} pages in {elapsed:.2f}s, {crawler.stats['duplicates']} duplicate and "
+        f"{crawler.stats['filtered']} filtered links, peak {site.peak_active} concurrent, "
+        f"min start gap {min(gaps, default=0):.3f}s"
+    )
+
+    failures = []
+    expected = expected_pages(max_depth)
+    if len(pages) != expected:
+        failures.append(f"crawled {len(pages)} pages, expected {expected}")
+    if any(not page.result.ok for page in pages):
+        failures.append("some pages failed: " + ", ".join(page.url for page in pages if not page.result.ok))
+    repeated = [path for path, hits in site.hits.items() if hits > 1]
+    if repeated:
+        failures.append(f"pages fetched more than once: {', '.join(sorted(repeated))}")
+    if "/login" in site.hits:
+        failures.append("followed a nofollow link")
+    if site.peak_active > per_host:
+        failures.append(f"{site.peak_active} concurrent requests exceed per-host limit {per_host}")
+    # Start times are taken on the server, so allow for some scheduling jitter
+    if gaps and min(gaps) < delay * 0.75:
+        failures.append(f"requests started {min(gaps):.3f}s apart, below the {delay}s delay")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Local catalog site for crawl tests")
+    arg_parser.add_argument("--serve", action="store_true", help="serve until interrupted instead of crawling")
+    arg_parser.add_argument("--depth", type=int, default=2)
+    arg_parser.add_argument("--per-host", type=int, default=2)
+    arg_parser.add_argument("--delay", type=float, default=0.05)
+    args = arg_parser.parse_args(argv)
+
+    if args.serve:
+        site, base_url = serve()
+        print(f"Serving {len(site.pages)} pages at {base_url}/")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return 0
+
+    failures = check_crawl(args.depth, args.per_host, args.delay)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
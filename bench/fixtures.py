@@ -0,0 +1,99 @@
+"""
+HTML fixture corpus for the benchmarks. Pages are generated from a fixed seed and saved
+under bench/fixtures/ on first use, so every run (and every machine) measures the same input.
+"""
+import os
+import random
+from typing import Callable, Dict
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SEED = 1337
+
+WORDS = (
+    "data product price shipping customer review rating service quality support order account "
+    "delivery return policy contact email phone address team company market report analysis "
+    "value feature design performance warranty stock available offer discount category brand"
+).split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _page(head: str, body: str) -> str:
+    return f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Fixture</title>{head}</head><body>{body}</body></html>"
+
+
+def _navigation(rng: random.Random) -> str:
+    links = "".join(f"<li><a href='/{word}'>{word.title()}</a></li>" for word in rng.sample(WORDS, 8))
+    return f"<header><nav><ul>{links}</ul></nav></header>"
+
+
+def _footer() -> str:
+    return "<footer><p>© 2024 Example Inc. All rights reserved.</p><a href='/privacy'>Privacy Policy</a></footer>"
+
+
+def small_page(rng: random.Random) -> str:
+    """A short article page (~5 KB)"""
+    paragraphs = "".join(f"<p>{_sentence(rng, rng.randint(12, 30))}</p>" for _ in range(20))
+    return _page("", f"{_navigation(rng)}<main><h1>Article</h1>{paragraphs}</main>{_footer()}")
+
+
+def large_page(rng: random.Random, cards_count: int = 3000) -> str:
+    """A long listing page with nested markup (~1.5 MB at the default 3000 cards)"""
+    cards = []
+    for i in range(cards_count):
+        cards.append(
+            f"<div class='card'><div class='inner'><h3>Product {i}</h3>"
+            f"<p class='desc'>{_sentence(rng, rng.randint(15, 40))}</p>"
+            f"<span class='price'>${rng.randint(5, 999)}.{rng.randint(0, 99):02d}</span>"
+            f"<button>Add to cart</button></div></div>"
+        )
+    return _page("", f"{_navigation(rng)}<main>{''.join(cards)}</main>{_footer()}")
+
+
+def table_page(rng: random.Random) -> str:
+    """A data-heavy page made of wide tables (~600 KB)"""
+    tables = []
+    for t in range(10):
+        header = "".join(f"<th>{word}</th>" for word in rng.sample(WORDS, 8))
+        rows = "".join(
+            "<tr>" + "".join(f"<td>{rng.choice([rng.choice(WORDS), str(rng.randint(0, 99999))])}</td>" for _ in range(8)) + "</tr>"
+            for _ in range(250)
+        )
+        tables.append(f"<h2>Table {t}</h2><table><thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table>")
+    return _page("", f"{_navigation(rng)}<main>{''.join(tables)}</main>{_footer()}")
+
+
+def script_page(rng: random.Random) -> str:
+    """A client-rendered app page dominated by inline scripts and styles (~800 KB)"""
+    scripts = []
+    for i in range(40):
+        state = ", ".join(f'"k{j}": {rng.randint(0, 1 << 30)}' for j in range(400))
+        scripts.append(f"<script>window.__STATE_{i}__ = {{{state}}};</script>")
+    scripts = "".join(scripts)
+    styles = "".join(f"<style>.c{i} {{ margin: {i}px; color: #{rng.randint(0, 0xFFFFFF):06x}; }}</style>" for i in range(2000))
+    paragraphs = "".join(f"<p>{_sentence(rng, rng.randint(10, 25))}</p>" for _ in range(60))
+    return _page(styles, f"{_navigation(rng)}<div id='root'>{paragraphs}</div>{scripts}<noscript>Enable JavaScript</noscript>{_footer()}")
+
+
+FIXTURES: Dict[str, Callable[[random.Random], str]] = {
+    "small": small_page,
+    "large": large_page,
+    "table": table_page,
+    "script": script_page,
+}
+
+
+def load_fixtures(directory: str = FIXTURES_DIR) -> Dict[str, str]:
+    """Read the fixture corpus, generating and saving any missing page first"""
+    os.makedirs(directory, exist_ok=True)
+    pages = {}
+    for name, build in FIXTURES.items():
+        path = os.path.join(directory, f"{name}.html")
+        if not os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(build(random.Random(f"{SEED}:{name}")))
+        with open(path, encoding="utf-8") as f:
+            pages[name] = f.read()
+    return pages
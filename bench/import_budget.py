@@ -0,0 +1,125 @@
+"""
+Startup budget check: cold import time of the app modules and the time of a Streamlit rerun.
+
+Each module is imported in a fresh interpreter with -X importtime, so results are not
+skewed by modules an earlier import already loaded. Heavy dependencies that should only
+load on first use (selenium.webdriver, google.genai) are reported if they sneak back into
+the import path. Budgets leave a little headroom over measured times (scrape ~360 ms, parse
+~140 ms, cli ~370 ms, first run ~1000 ms, rerun ~90 ms), so an eager heavy import such as
+selenium or google.genai pushes a check over. Exits non-zero when any budget is exceeded,
+so it can gate CI; --budget-scale loosens every budget on slower machines.
+
+    python bench/import_budget.py
+    python bench/import_budget.py --budget-scale 1.5
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+
+# Cold import budget per module, in ms
+MODULE_BUDGETS_MS = {"scrape": 450, "parse": 200, "cli": 450}
+FIRST_RUN_BUDGET_MS = 1300
+RERUN_BUDGET_MS = 150
+# Must not be imported until a browser session or a Gemini call is actually needed
+LAZY_MODULES = ("selenium.webdriver.remote.webdriver", "google.genai")
+
+RERUN_SCRIPT = """
+import time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("main.py", default_timeout=60)
+start = time.perf_counter()
+app.run()
+first = time.perf_counter() - start
+start = time.perf_counter()
+app.run()
+print(f"{first:.6f} {time.perf_counter() - start:.6f}")
+"""
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": SRC_DIR,
+        "GEMINI_API_KEY": env.get("GEMINI_API_KEY") or "budget",
+        "PAGE_CACHE_ENABLED": "false",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "DEDUP_MEMORY_PATH": "",
+        "METRICS_PORT": "0",
+    })
+    return env
+
+
+def import_profile(module: str) -> Dict[str, float]:
+    """Cumulative import time in ms of every module loaded by a cold `import module`"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=SRC_DIR, env=_env(), check=True,
+    )
+    profile = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        profile[name.strip()] = int(cumulative) / 1000
+    return profile
+
+
+def rerun_times() -> Optional[List[float]]:
+    """First run and rerun of the Streamlit app in seconds, or None if streamlit is unavailable"""
+    completed = subprocess.run(
+        [sys.executable, "-c", RERUN_SCRIPT], capture_output=True, text=True, cwd=SRC_DIR, env=_env()
+    )
+    if completed.returncode != 0:
+        print(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "AppTest failed", file=sys.stderr)
+        return None
+    return [float(value) for value in completed.stdout.split()[-2:]]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Check cold import and Streamlit rerun times against a budget")
+    arg_parser.add_argument("--budget-ms", type=float, help="max cold import time for every module (default: per-module budgets)")
+    arg_parser.add_argument("--first-run-budget-ms", type=float, default=FIRST_RUN_BUDGET_MS, help="max Streamlit first run time")
+    arg_parser.add_argument("--rerun-budget-ms", type=float, default=RERUN_BUDGET_MS, help="max Streamlit rerun time")
+    arg_parser.add_argument("--budget-scale", type=float, default=1.0, help="multiply every budget, for slower machines")
+    arg_parser.add_argument("--skip-rerun", action="store_true", help="only measure imports")
+    args = arg_parser.parse_args(argv)
+
+    failures = []
+    for module, module_budget in MODULE_BUDGETS_MS.items():
+        budget = (args.budget_ms or module_budget) * args.budget_scale
+        profile = import_profile(module)
+        total = profile.get(module, 0.0)
+        eager = [name for name in LAZY_MODULES if name in profile]
+        status = "ok" if total <= budget and not eager else "OVER"
+        print(f"import {module:10} {total:8.1f} ms  {status}")
+        if total > budget:
+            failures.append(f"import {module} took {total:.0f} ms (budget {budget:.0f} ms)")
+        for name in eager:
+            failures.append(f"import {module} eagerly loads {name} ({profile[name]:.0f} ms)")
+
+    if not args.skip_rerun:
+        times = rerun_times()
+        if times is None:
+            failures.append("Streamlit rerun could not be measured")
+        else:
+            for label, seconds, budget in (
+                ("first run", times[0], args.first_run_budget_ms * args.budget_scale),
+                ("rerun", times[1], args.rerun_budget_ms * args.budget_scale),
+            ):
+                status = "ok" if seconds * 1000 <= budget else "OVER"
+                print(f"streamlit {label:9} {seconds * 1000:8.1f} ms  {status}")
+                if seconds * 1000 > budget:
+                    failures.append(f"Streamlit {label} took {seconds * 1000:.0f} ms (budget {budget:.0f} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Memory benchmark for cleaning and chunking very large pages.
+
+Listing pages of growing size are cleaned and split twice, each in a fresh interpreter:
+with the BeautifulSoup tree cleaner followed by split_dom_content, and with
+WebScraper.stream_chunks consumed one chunk at a time. Peak memory is reported both as
+the tracemalloc peak (Python objects) and as resident-set growth (which also counts
+lxml's C allocations), excluding the HTML string itself.
+
+The run fails if the streaming peak grows with page size instead of staying bounded by
+the chunk size, so it can gate CI.
+
+    python bench/stream_memory.py
+    python bench/stream_memory.py --cards 3000 12000 48000 --chunk-tokens 1500
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+
+# Streaming peak may not exceed this many chunk sizes (plus a fixed parser allowance)
+CHUNK_MULTIPLE_LIMIT = 8
+PARSER_ALLOWANCE_MB = 4.0
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure_child(mode: str, cards: int, chunk_tokens: int) -> Dict[str, Any]:
+    """Runs inside the child interpreter: build the page, then clean and chunk it once"""
+    os.chdir(SRC_DIR)
+    sys.path.insert(0, SRC_DIR)
+    sys.path.insert(0, BENCH_DIR)
+    os.environ.update({"PAGE_CACHE_ENABLED": "false", "DEDUP_MEMORY_PATH": "", "LOG_CONSOLE": "false"})
+
+    import logging
+    from fixtures import SEED, large_page
+    import scrape
+
+    logging.getLogger("scraper").setLevel(logging.WARNING)
+    scraper = scrape.WebScraper(http_first=False, deduplicator=None)
+    html = large_page(random.Random(f"{SEED}:large"), cards)
+    # Warm up imports and parser state on a small page so only the big page is measured
+    list(scraper.stream_chunks(html[:10_000], chunk_tokens))
+    scraper.split_dom_content(scraper.extract_clean_content(html[:10_000]), chunk_tokens)
+
+    rss_before = _rss_mb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "tree":
+        scrape.SCRAPER_STREAMING_CLEAN = False
+        chunks = scraper.split_dom_content(scraper.extract_clean_content(html), chunk_tokens)
+        count, largest = len(chunks), max(map(len, chunks), default=0)
+        del chunks
+    else:
+        count = largest = 0
+        for chunk in scraper.stream_chunks(html, chunk_tokens):
+            count += 1
+            largest = max(largest, len(chunk))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "mode": mode,
+        "html_mb": len(html) / 1e6,
+        "chunks": count,
+        "largest_chunk_chars": largest,
+        "seconds": elapsed,
+        "traced_peak_mb": peak / 1e6,
+        "rss_growth_mb": max(0.0, _rss_mb() - rss_before),
+    }
+
+
+def run_child(mode: str, cards: int, chunk_tokens: int) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--cards", str(cards), "--chunk-tokens", str(chunk_tokens)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Peak memory of tree vs streaming cleaning on large pages")
+    arg_parser.add_argument("--cards", type=int, nargs="+", default=[3000, 12000, 48000],
+                            help="listing cards per page (~500 bytes each)")
+    arg_parser.add_argument("--chunk-tokens", type=int, default=1500)
+    arg_parser.add_argument("--child", choices=["tree", "stream"], help=argparse.SUPPRESS)
+    args = arg_parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_child(args.child, args.cards[0], args.chunk_tokens)))
+        return 0
+
+    print(f"{'mode':7} {'html MB':>8} {'chunks':>7} {'seconds':>8} {'traced MB':>10} {'RSS +MB':>8}")
+    streaming = []
+    for cards in args.cards:
+        for mode in ("tree", "stream"):
+            result = run_child(mode, cards, args.chunk_tokens)
+            print(
+                f"{mode:7} {result['html_mb']:8.1f} {result['chunks']:7d} {result['seconds']:8.2f} "
+                f"{result['traced_peak_mb']:10.2f} {result['rss_growth_mb']:8.1f}"
+            )
+            if mode == "stream":
+                streaming.append(result)
+
+    failures = []
+    for result in streaming:
+        # A str costs up to 4 bytes per character
+        limit = CHUNK_MULTIPLE_LIMIT * result["largest_chunk_chars"] * 4 / 1e6 + PARSER_ALLOWANCE_MB
+        if result["traced_peak_mb"] > limit:
+            failures.append(
+                f"streaming peak {result['traced_peak_mb']:.1f} MB on a {result['html_mb']:.1f} MB page "
+                f"exceeds {limit:.1f} MB"
+            )
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
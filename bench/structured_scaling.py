@@ -0,0 +1,114 @@
+"""
+Scaling check for structured extraction results.
+
+Simulates a batch run that merges page after page of extracted records (a tenth of them
+repeats of earlier keys) into one RecordTable, then exports it to CSV and Parquet. Time
+and traced memory per record are reported for growing record counts; the run fails if
+either grows by more than LINEARITY_LIMIT between the smallest and the largest size,
+so it can gate CI.
+
+    python bench/structured_scaling.py
+    python bench/structured_scaling.py --records 50000 200000 800000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+sys.path.insert(0, SRC_DIR)
+
+from structured import ExtractionSchema, RecordTable  # noqa: E402
+
+SCHEMA = ExtractionSchema.parse("sku*: string\nname: string\nprice: number\nstock: integer\navailable: boolean")
+RECORDS_PER_PAGE = 25
+DUPLICATE_RATE = 0.1
+# Allowed growth of per-record cost from the smallest to the largest run
+LINEARITY_LIMIT = 2.0
+
+
+def _pages(count: int, rng: random.Random):
+    for start in range(0, count, RECORDS_PER_PAGE):
+        page = []
+        for n in range(start, min(start + RECORDS_PER_PAGE, count)):
+            sku = rng.randrange(n) if n and rng.random() < DUPLICATE_RATE else n
+            page.append({
+                "sku": f"SKU-{sku:08d}",
+                "name": f"Product {sku} {rng.choice(('red', 'blue', 'large', 'small'))}",
+                "price": round(rng.uniform(1, 2000), 2),
+                "stock": rng.randint(0, 500),
+                "available": rng.random() < 0.8,
+            })
+        yield f"https://shop.example/page/{start // RECORDS_PER_PAGE}", page
+
+
+def measure(count: int) -> Dict[str, Any]:
+    rng = random.Random(count)
+    tracemalloc.start()
+    start = time.perf_counter()
+    table = RecordTable(SCHEMA)
+    for source, records in _pages(count, rng):
+        table.add(records, source)
+    merge_seconds = time.perf_counter() - start
+    _, merge_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        table.export(os.path.join(directory, "records.csv"))
+        csv_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        table.export(os.path.join(directory, "records.parquet"))
+        parquet_seconds = time.perf_counter() - start
+        parquet_mb = os.path.getsize(os.path.join(directory, "records.parquet")) / 1e6
+
+    return {
+        "records": count,
+        "rows": len(table),
+        "merged": table.merged,
+        "merge_us": merge_seconds / count * 1e6,
+        "csv_us": csv_seconds / count * 1e6,
+        "parquet_us": parquet_seconds / count * 1e6,
+        "bytes_per_record": merge_peak / count,
+        "parquet_mb": parquet_mb,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Merge and export cost of structured records as the batch grows")
+    arg_parser.add_argument("--records", type=int, nargs="+", default=[20_000, 80_000, 320_000])
+    args = arg_parser.parse_args(argv)
+
+    # Warm up imports (pyarrow) so the first size is not charged for them
+    measure(RECORDS_PER_PAGE * 4)
+
+    print(f"{'records':>9} {'rows':>9} {'merged':>7} {'merge µs':>9} {'csv µs':>7} {'parquet µs':>10} {'B/record':>9} {'parquet MB':>10}")
+    results = []
+    for count in sorted(args.records):
+        result = measure(count)
+        results.append(result)
+        print(
+            f"{result['records']:9d} {result['rows']:9d} {result['merged']:7d} {result['merge_us']:9.2f} "
+            f"{result['csv_us']:7.2f} {result['parquet_us']:10.2f} {result['bytes_per_record']:9.0f} {result['parquet_mb']:10.2f}"
+        )
+
+    failures = []
+    smallest, largest = results[0], results[-1]
+    for metric in ("merge_us", "csv_us", "parquet_us", "bytes_per_record"):
+        if largest[metric] > smallest[metric] * LINEARITY_LIMIT:
+            failures.append(
+                f"{metric} grew from {smallest[metric]:.2f} to {largest[metric]:.2f} per record "
+                f"between {smallest['records']} and {largest['records']} records"
+            )
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
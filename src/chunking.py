@@ -0,0 +1,228 @@
+import math
+import zlib
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Gemini tokenizers average roughly four characters of English text per token
+CHARS_PER_TOKEN = 4
+
+# Input context windows by model family (longest matching prefix wins)
+MODEL_INPUT_TOKEN_LIMITS = {
+    "gemini-1.0": 30_720,
+    "gemini-pro": 30_720,
+    "gemini-1.5-flash": 1_048_576,
+    "gemini-1.5-pro": 2_097_152,
+    "gemini-2.0": 1_048_576,
+    "gemini-2.5": 1_048_576,
+}
+DEFAULT_INPUT_TOKEN_LIMIT = 30_720
+
+# Room left for the extraction template, the user's description and the answer
+PROMPT_OVERHEAD_TOKENS = 1_024
+
+DEFAULT_CHUNK_TOKENS = 1_500
+
+CHUNK_STRATEGY_PACKED = "packed"
+CHUNK_STRATEGY_CONTENT = "content"
+
+# Content-defined chunking: Rabin-Karp hash over a sliding window of line fingerprints
+ROLLING_WINDOW_LINES = 3
+ROLLING_BASE = 1_000_003
+ROLLING_MODULUS = (1 << 61) - 1
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate, no API round-trip"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def model_input_limit(model: Optional[str]) -> int:
+    """Input token window for a Gemini model name"""
+    if not model:
+        return DEFAULT_INPUT_TOKEN_LIMIT
+    name = model.lower().removeprefix("models/")
+    matches = [prefix for prefix in MODEL_INPUT_TOKEN_LIMITS if name.startswith(prefix)]
+    if not matches:
+        return DEFAULT_INPUT_TOKEN_LIMIT
+    return MODEL_INPUT_TOKEN_LIMITS[max(matches, key=len)]
+
+
+def model_token_budget(max_tokens: int, model: Optional[str] = None) -> int:
+    """Clamp a requested chunk budget so chunk plus prompt fits the model's window"""
+    return max(1, min(max_tokens, model_input_limit(model) - PROMPT_OVERHEAD_TOKENS))
+
+
+def _units(text: str, max_chars: int) -> Iterator[Tuple[str, str]]:
+    """
+    Break text into (separator, piece) units, preferring paragraph, then line,
+    then word boundaries, so that no piece is longer than max_chars.
+    """
+    for p, paragraph in enumerate(text.split("\n\n")):
+        for l, line in enumerate(paragraph.split("\n")):
+            yield from _line_units(line, "\n\n" if p and not l else "\n", max_chars)
+
+
+def _line_units(line: str, separator: str, max_chars: int) -> Iterator[Tuple[str, str]]:
+    if len(line) <= max_chars:
+        yield separator, line
+        return
+    for piece in _split_long_line(line, max_chars):
+        yield separator, piece
+        separator = " "
+
+
+def _split_long_line(line: str, max_chars: int) -> List[str]:
+    """Split a single over-long line at spaces, hard-cutting words that alone exceed max_chars"""
+    pieces = []
+    current = ""
+    for word in line.split(" "):
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int = DEFAULT_CHUNK_TOKENS, overlap_tokens: int = 0) -> List[str]:
+    """
+    Pack text into as few chunks as possible without exceeding max_tokens each,
+    breaking only on paragraph, line or (for over-long lines) word boundaries.
+    With overlap_tokens > 0, each chunk repeats the trailing units of the previous one.
+    """
+    if not text:
+        return []
+    max_chars, overlap_chars = _char_budgets(max_tokens, overlap_tokens)
+    return list(_packed_chunks(_units(text, max_chars), max_chars, overlap_chars))
+
+
+def _char_budgets(max_tokens: int, overlap_tokens: int) -> Tuple[int, int]:
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    return max_chars, max(0, min(overlap_tokens * CHARS_PER_TOKEN, max_chars // 2))
+
+
+def _packed_chunks(units: Iterable[Tuple[str, str]], max_chars: int, overlap_chars: int) -> Iterator[str]:
+    current: List[Tuple[str, str]] = []
+    size = 0
+
+    for separator, piece in units:
+        added = len(piece) + (len(separator) if current else 0)
+        if current and size + added > max_chars:
+            yield _join(current)
+            current = _overlap_tail(current, overlap_chars, max_chars - len(piece) - len(separator))
+            size = len(_join(current))
+            added = len(piece) + (len(separator) if current else 0)
+        current.append((separator, piece))
+        size += added
+
+    if current:
+        yield _join(current)
+
+
+def content_defined_chunks(text: str, max_tokens: int = DEFAULT_CHUNK_TOKENS, overlap_tokens: int = 0) -> List[str]:
+    """
+    Split text at content-defined line boundaries so that an edit only changes the
+    chunks around it: a rolling hash over the last few lines decides where to cut,
+    so unchanged regions produce identical chunks across re-scrapes. Chunks are never
+    larger than max_tokens and, except at the end, no smaller than a quarter of it.
+    """
+    if not text:
+        return []
+    max_chars, overlap_chars = _char_budgets(max_tokens, overlap_tokens)
+    return list(_content_defined_chunks(_units(text, max_chars), max_chars, overlap_chars))
+
+
+def _content_defined_chunks(units: Iterable[Tuple[str, str]], max_chars: int, overlap_chars: int) -> Iterator[str]:
+    min_chars = max_chars // 4
+    target_chars = max_chars // 2
+    # Cut probability per line is proportional to its length, so boundaries land about
+    # every (target - min) characters after the minimum size whatever the line lengths
+    threshold_per_char = (1 << 32) / max(1, target_chars - min_chars)
+    drop_factor = pow(ROLLING_BASE, ROLLING_WINDOW_LINES - 1, ROLLING_MODULUS)
+
+    current: List[Tuple[str, str]] = []
+    size = 0
+    window: List[int] = []
+    rolling = 0
+    # Whether current holds anything beyond overlap already emitted with the previous chunk
+    fresh = False
+
+    for separator, piece in units:
+        added = len(piece) + (len(separator) if current else 0)
+        if current and size + added > max_chars:
+            # Forced cut: the chunk is full
+            yield _join(current)
+            current = _overlap_tail(current, overlap_chars, max_chars - len(piece) - len(separator))
+            size = len(_join(current))
+            added = len(piece) + (len(separator) if current else 0)
+        current.append((separator, piece))
+        size += added
+        fresh = True
+
+        fingerprint = zlib.crc32(piece.encode("utf-8"))
+        if len(window) == ROLLING_WINDOW_LINES:
+            rolling = (rolling - window.pop(0) * drop_factor) % ROLLING_MODULUS
+        window.append(fingerprint)
+        rolling = (rolling * ROLLING_BASE + fingerprint) % ROLLING_MODULUS
+
+        if size >= min_chars and (rolling & 0xFFFFFFFF) < threshold_per_char * max(1, len(piece)):
+            yield _join(current)
+            current = _overlap_tail(current, overlap_chars, max_chars)
+            size = len(_join(current))
+            fresh = False
+
+    if current and fresh:
+        yield _join(current)
+
+
+def split_text(
+    text: str,
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = 0,
+    strategy: str = CHUNK_STRATEGY_PACKED,
+) -> List[str]:
+    """Dispatch to the packed (fewest chunks) or content-defined (stable chunks) splitter"""
+    if strategy == CHUNK_STRATEGY_CONTENT:
+        return content_defined_chunks(text, max_tokens, overlap_tokens)
+    return chunk_text(text, max_tokens, overlap_tokens)
+
+
+def iter_chunks(
+    lines: Iterable[str],
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = 0,
+    strategy: str = CHUNK_STRATEGY_PACKED,
+) -> Iterator[str]:
+    """
+    Streaming counterpart of split_text for text arriving line by line: yields each
+    chunk as soon as it is complete, holding at most one chunk of text. For text without
+    blank lines the chunks are identical to split_text("\n".join(lines), ...).
+    """
+    max_chars, overlap_chars = _char_budgets(max_tokens, overlap_tokens)
+    units = (unit for line in lines for unit in _line_units(line, "\n", max_chars))
+    if strategy == CHUNK_STRATEGY_CONTENT:
+        return _content_defined_chunks(units, max_chars, overlap_chars)
+    return _packed_chunks(units, max_chars, overlap_chars)
+
+
+def _overlap_tail(units: List[Tuple[str, str]], overlap_chars: int, room: int) -> List[Tuple[str, str]]:
+    """Trailing units of a finished chunk to carry into the next one"""
+    limit = min(overlap_chars, room)
+    tail: List[Tuple[str, str]] = []
+    for unit in reversed(units):
+        candidate = [unit] + tail
+        if len(_join(candidate)) > limit:
+            break
+        tail = candidate
+    return tail
+
+
+def _join(units: List[Tuple[str, str]]) -> str:
+    return "".join(piece if i == 0 else separator + piece for i, (separator, piece) in enumerate(units))
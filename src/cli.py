@@ -0,0 +1,432 @@
+"""
+Headless batch runner: scrape, clean, split and parse every job in a JSONL file.
+
+Each input line is a job such as {"id": "acme", "url": "https://acme.com", "queries": ["prices", "emails"]}
+("query" may be given instead of "queries"; "id" defaults to the line number). One JSON record
+per job is appended to the output file as soon as it finishes, and a rerun with the same output
+file skips jobs that already have a record, so an interrupted batch resumes where it stopped.
+With --dedup off, freshly fetched pages are cleaned and split in one streaming pass, so very
+large pages never exist as a parse tree or as one cleaned string.
+
+    python cli.py jobs.jsonl -o results.jsonl --scrape-concurrency 8 --parse-concurrency 4
+
+With --crawl-depth each job URL is a seed: same-site links are followed up to that depth
+(pagination does not count) and every crawled page is parsed as it arrives and gets its own
+record, with id "<job id>:<url hash>" and the seed and depth it was reached from.
+
+    python cli.py catalog.jsonl -o products.jsonl --crawl-depth 2 --crawl-pages 200 --crawl-delay 1
+
+With --schema each query returns records with the given fields instead of free text (a JSON
+schema file or inline "name*: string; price: number", * marking key fields). Records are
+deduplicated by their key fields within each page and across the whole batch, and --export
+writes the merged table as CSV or Parquet (by extension) when the batch ends.
+
+    python cli.py catalog.jsonl -o products.jsonl --crawl-depth 2 --schema "sku*: string; name; price: number" --export products.parquet
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from logging_config import log_context, main_logger
+from scrape import SCRAPER_STREAMING_CLEAN, WebScraper, ScrapeResult, get_scraper
+from parse import GeminiParser, GEMINI_MODEL, get_parser
+from relevance import ChunkIndex
+from chunking import CHUNK_STRATEGY_CONTENT, CHUNK_STRATEGY_PACKED, DEFAULT_CHUNK_TOKENS
+from dedup import DEDUP_LEVEL, DEDUP_LEVELS, DEDUP_OFF
+from load_profile import LOAD_PROFILES, SCRAPER_LOAD_PROFILE, LoadProfile, get_load_profile
+from crawler import CRAWL_DELAY, CRAWL_MAX_PAGES, CRAWL_PER_HOST, Crawler
+from structured import ExtractionSchema, RecordTable
+from telemetry import telemetry
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+
+def read_jobs(path: str) -> Iterator[Dict[str, Any]]:
+    """Parse the job file, skipping blank lines and reporting malformed ones"""
+    with (sys.stdin if path == "-" else open(path)) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                main_logger.error(f"Skipping malformed job on line {line_number}: {str(e)}")
+                continue
+            queries = job.get("queries") or ([job["query"]] if job.get("query") else [])
+            if not job.get("url") or not queries:
+                main_logger.error(f"Skipping job on line {line_number}: 'url' and 'queries' are required")
+                continue
+            yield {"id": str(job.get("id", line_number)), "url": job["url"], "queries": list(queries)}
+
+
+def load_checkpoint(output_path: str, retry_failed: bool = False) -> Set[str]:
+    """
+    Job ids that already have a record in the output file. A torn last line left by a
+    crash is cut off so appended records start on a clean line.
+    """
+    done: Dict[str, str] = {}
+    if not os.path.exists(output_path):
+        return set()
+
+    valid_bytes = 0
+    with open(output_path, "rb") as f:
+        for raw in f:
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                break
+            if not raw.endswith(b"\n"):
+                break
+            valid_bytes += len(raw)
+            done[str(record.get("id"))] = record.get("status")
+
+    if valid_bytes < os.path.getsize(output_path):
+        main_logger.warning(f"Truncating incomplete record at the end of {output_path}")
+        with open(output_path, "r+b") as f:
+            f.truncate(valid_bytes)
+
+    return {job_id for job_id, status in done.items() if status == STATUS_OK or not retry_failed}
+
+
+def load_schema(spec: str) -> ExtractionSchema:
+    """--schema value: a path to a JSON schema file, or the schema itself"""
+    if os.path.isfile(spec):
+        with open(spec, encoding="utf-8") as f:
+            spec = f.read()
+    return ExtractionSchema.parse(spec)
+
+
+def load_structured_results(output_path: str, table: RecordTable) -> None:
+    """
+    Merge the records of earlier successful runs into table, so an export after a resume
+    is complete. Malformed lines are reported and skipped.
+    """
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb") as f:
+        for line_number, raw in enumerate(f, start=1):
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError as e:
+                # JSONDecodeError, or UnicodeDecodeError for bytes that are not UTF-8
+                main_logger.error("Skipping malformed record on line %d of %s: %s", line_number, output_path, e)
+                continue
+            if record.get("status") == STATUS_OK and record.get("structured"):
+                for rows in record.get("results", {}).values():
+                    table.add((table.schema.coerce(row) for row in rows), record.get("url"))
+
+
+def page_record_id(job_id: str, url: str) -> str:
+    """Record id of one crawled page, stable across runs so a resumed crawl skips parsed pages"""
+    return f"{job_id}:{hashlib.blake2b(url.encode('utf-8'), digest_size=5).hexdigest()}"
+
+
+class BatchRunner:
+    """Runs scrape → clean → dedup → split → parse for a stream of jobs, writing one record per job"""
+
+    def __init__(
+        self,
+        scraper: WebScraper,
+        parser: GeminiParser,
+        output,
+        scrape_concurrency: int = 4,
+        parse_concurrency: int = 4,
+        page_workers: int = 1,
+        chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+        chunk_overlap: int = 0,
+        chunk_strategy: str = CHUNK_STRATEGY_PACKED,
+        dedup_level: str = DEDUP_LEVEL,
+        prefilter: bool = False,
+        top_k: Optional[int] = None,
+        timeout: int = 30,
+        force_refresh: bool = False,
+        load_profile: Optional[LoadProfile] = None,
+        crawl_depth: Optional[int] = None,
+        crawl_pages: int = CRAWL_MAX_PAGES,
+        crawl_per_host: int = CRAWL_PER_HOST,
+        crawl_delay: float = CRAWL_DELAY,
+        done: Optional[Set[str]] = None,
+        table: Optional[RecordTable] = None,
+    ):
+        self.logger = main_logger
+        self.scraper = scraper
+        self.parser = parser
+        self.output = output
+        self.scrape_concurrency = max(1, scrape_concurrency)
+        self.parse_concurrency = max(1, parse_concurrency)
+        self.page_workers = max(1, page_workers)
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap = chunk_overlap
+        self.chunk_strategy = chunk_strategy
+        self.dedup_level = dedup_level
+        self.prefilter = prefilter
+        self.top_k = top_k
+        self.timeout = timeout
+        self.force_refresh = force_refresh
+        self.load_profile = load_profile
+        self.crawl_depth = crawl_depth
+        self.crawl_pages = crawl_pages
+        self.crawl_per_host = crawl_per_host
+        self.crawl_delay = crawl_delay
+        self.done = done or set()
+        # Structured mode: every page's records are also merged into this batch-wide table
+        self.table = table
+        self.succeeded = 0
+        self.failed = 0
+
+    def run(self, jobs: List[Dict[str, Any]]) -> None:
+        """
+        Scrape jobs in windows so only a bounded number of pages is held in memory;
+        pages are parsed as soon as they arrive while the rest of the window downloads.
+        """
+        window = self.scrape_concurrency * 2
+        with ThreadPoolExecutor(max_workers=self.page_workers, thread_name_prefix="page") as pages:
+            for start in range(0, len(jobs), window):
+                batch = jobs[start:start + window]
+                by_url: Dict[str, List[Dict[str, Any]]] = {}
+                for job in batch:
+                    by_url.setdefault(job["url"], []).append(job)
+
+                futures = []
+                for result in self.scraper.scrape_many(
+                    list(by_url), self.scrape_concurrency, self.timeout, self.force_refresh, self.load_profile
+                ):
+                    for job in by_url[result.url]:
+                        futures.append(pages.submit(self._finish_job, job, result))
+                for future in as_completed(futures):
+                    self._write(future.result())
+
+    def crawl(self, jobs: List[Dict[str, Any]]) -> None:
+        """
+        Crawl from each job's URL and parse every page as soon as the crawler yields it.
+        At most two pages per page worker wait for parsing; beyond that the crawl pauses,
+        so a slow model bounds how much HTML is held in memory.
+        """
+        with ThreadPoolExecutor(max_workers=self.page_workers, thread_name_prefix="page") as pages:
+            for job in jobs:
+                crawler = Crawler(
+                    self.scraper,
+                    max_pages=self.crawl_pages,
+                    max_depth=self.crawl_depth,
+                    concurrency=self.scrape_concurrency,
+                    per_host=self.crawl_per_host,
+                    delay=self.crawl_delay,
+                    timeout=self.timeout,
+                    force_refresh=self.force_refresh,
+                    load_profile=self.load_profile,
+                )
+                pending = set()
+                for page in crawler.crawl([job["url"]]):
+                    page_job = {**job, "id": page_record_id(job["id"], page.url), "url": page.url,
+                                "seed": job["url"], "depth": page.depth}
+                    if page_job["id"] in self.done:
+                        continue
+                    pending.add(pages.submit(self._finish_job, page_job, page.result))
+                    finished, pending = wait(pending, timeout=0 if len(pending) < self.page_workers * 2 else None,
+                                             return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self._write(future.result())
+                for future in as_completed(pending):
+                    self._write(future.result())
+
+    def _finish_job(self, job: Dict[str, Any], result: ScrapeResult) -> Dict[str, Any]:
+        with log_context(job_id=job["id"]):
+            start_time = time.time()
+            record = {
+                "id": job["id"],
+                "url": job["url"],
+                "queries": job["queries"],
+                **{key: job[key] for key in ("seed", "depth") if key in job},
+                "tier": result.tier,
+                "scrape_seconds": round(result.elapsed, 3),
+                "scrape_phases": {name: round(seconds, 3) for name, seconds in result.phases.items()},
+            }
+            if not result.ok:
+                return {**record, "status": STATUS_ERROR, "error": result.error or "Scraping failed"}
+
+            try:
+                chunks, content_chars, dedup_saved_chars = self._chunk_page(job, result)
+                index = ChunkIndex(chunks) if self.prefilter else None
+
+                if self.table is not None:
+                    answers = []
+                    for query in job["queries"]:
+                        page_table = self.parser.parse_structured(
+                            chunks, self.table.schema, query, self.parse_concurrency, index, self.top_k, source=job["url"]
+                        )
+                        self.table.extend(page_table)
+                        answers.append(list(page_table.records(include_source=False)))
+                elif len(job["queries"]) == 1:
+                    answers = [self.parser.parse_with_gemini(
+                        chunks, job["queries"][0], self.parse_concurrency, index, self.top_k
+                    )]
+                else:
+                    answers = self.parser.parse_many_with_gemini(
+                        chunks, job["queries"], self.parse_concurrency, index, self.top_k
+                    )
+
+                return {
+                    **record,
+                    "status": STATUS_OK,
+                    "content_chars": content_chars,
+                    "dedup_saved_chars": dedup_saved_chars,
+                    "chunks": len(chunks),
+                    "results": dict(zip(job["queries"], answers)),
+                    **({"structured": True, "records": sum(map(len, answers))} if self.table is not None else {}),
+                    "parse_seconds": round(time.time() - start_time, 3),
+                }
+            except Exception as e:
+                self.logger.error(f"Job {job['id']} failed after scraping: {str(e)}")
+                return {**record, "status": STATUS_ERROR, "error": f"{type(e).__name__}: {str(e)}"}
+
+    def _chunk_page(self, job: Dict[str, Any], result: ScrapeResult):
+        """
+        Clean, dedup and split a scraped page; returns (chunks, cleaned chars or None when
+        streamed, chars removed as duplicates). Without duplicate removal, which needs the whole text, freshly fetched
+        HTML goes through stream_chunks so neither a parse tree nor the cleaned page is built.
+        """
+        if result.cleaned is None and self.dedup_level == DEDUP_OFF and SCRAPER_STREAMING_CLEAN:
+            chunks = list(self.scraper.stream_chunks(
+                result.html, self.chunk_tokens, self.chunk_overlap, GEMINI_MODEL, self.chunk_strategy
+            ))
+            # The cleaned text is never assembled, so its length is not known
+            return chunks, None, 0
+
+        cleaned = result.cleaned
+        if cleaned is None:
+            cleaned = self.scraper.extract_clean_content(result.html)
+            self.scraper.cache_cleaned_content(job["url"], cleaned)
+        cleaned, dedup_stats = self.scraper.dedup_content(cleaned, job["url"], self.dedup_level)
+        chunks = self.scraper.split_dom_content(
+            cleaned, self.chunk_tokens, self.chunk_overlap, GEMINI_MODEL, self.chunk_strategy
+        )
+        return chunks, len(cleaned), dedup_stats.saved_chars
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        """Append one record and make it durable before moving on"""
+        record["finished_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.output.flush()
+        os.fsync(self.output.fileno())
+
+        if record["status"] == STATUS_OK:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        print(
+            f"[{self.succeeded + self.failed}] {record['status']:5} {record['id']} {record['url']}"
+            + (f" ({record['error']})" if record.get("error") else ""),
+            file=sys.stderr,
+        )
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser(
+        description="Scrape websites and extract data with Gemini from a JSONL job file",
+    )
+    arg_parser.add_argument("jobs", help="JSONL file of {\"url\", \"queries\"} jobs ('-' for stdin)")
+    arg_parser.add_argument("-o", "--output", required=True, help="JSONL file results are appended to")
+    arg_parser.add_argument("--scrape-concurrency", type=int, default=4, help="pages fetched in parallel")
+    arg_parser.add_argument("--parse-concurrency", type=int, default=4, help="Gemini calls in flight per page")
+    arg_parser.add_argument("--page-workers", type=int, default=1, help="pages parsed in parallel")
+    arg_parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS)
+    arg_parser.add_argument("--chunk-overlap", type=int, default=0)
+    arg_parser.add_argument("--chunk-strategy", choices=[CHUNK_STRATEGY_PACKED, CHUNK_STRATEGY_CONTENT], default=CHUNK_STRATEGY_PACKED)
+    arg_parser.add_argument("--dedup", choices=list(DEDUP_LEVELS), default=DEDUP_LEVEL, help="duplicate removal level")
+    arg_parser.add_argument("--prefilter", action="store_true", help="only send chunks relevant to each query")
+    arg_parser.add_argument("--top-k", type=int, default=None, help="max chunks per query with --prefilter")
+    arg_parser.add_argument("--timeout", type=int, default=30, help="per-page scrape timeout in seconds")
+    arg_parser.add_argument("--force-refresh", action="store_true", help="ignore the page cache")
+    arg_parser.add_argument("--load-profile", choices=list(LOAD_PROFILES), default=SCRAPER_LOAD_PROFILE,
+                            help="what the browser loads and when a page counts as ready")
+    arg_parser.add_argument("--wait-selector", help="CSS selector the browser waits for before reading a page")
+    arg_parser.add_argument("--crawl-depth", type=int, help="crawl same-site links from each job URL up to this depth")
+    arg_parser.add_argument("--crawl-pages", type=int, default=CRAWL_MAX_PAGES, help="max pages crawled per job")
+    arg_parser.add_argument("--crawl-per-host", type=int, default=CRAWL_PER_HOST, help="requests in flight per host")
+    arg_parser.add_argument("--crawl-delay", type=float, default=CRAWL_DELAY, help="seconds between requests to one host")
+    arg_parser.add_argument("--schema", help="extract records with these fields: a JSON schema file or \"name*: string; price: number\"")
+    arg_parser.add_argument("--export", help="with --schema, write all records to this .csv or .parquet file at the end")
+    arg_parser.add_argument("--retry-failed", action="store_true", help="rerun jobs whose last record is an error")
+    arg_parser.add_argument("--no-resume", action="store_true", help="overwrite the output instead of resuming")
+    return arg_parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args(argv)
+    if args.export and not args.schema:
+        arg_parser.error("--export requires --schema")
+    try:
+        table = RecordTable(load_schema(args.schema)) if args.schema else None
+    except ValueError as e:
+        arg_parser.error(f"invalid --schema: {str(e)}")
+    telemetry.start_metrics_server()
+
+    jobs = list(read_jobs(args.jobs))
+    if args.no_resume and os.path.exists(args.output):
+        os.remove(args.output)
+    done = load_checkpoint(args.output, args.retry_failed)
+    crawling = args.crawl_depth is not None
+    # A crawl's pages are only known once it runs, so crawl jobs are always rerun and skip done pages
+    pending = jobs if crawling else [job for job in jobs if job["id"] not in done]
+    main_logger.info(f"Batch run: {len(jobs)} jobs, {len(jobs) - len(pending)} already done, {len(pending)} to run")
+    if args.export:
+        load_structured_results(args.output, table)
+
+    start_time = time.time()
+    with open(args.output, "a", encoding="utf-8") as output:
+        runner = BatchRunner(
+            get_scraper(),
+            get_parser(),
+            output,
+            scrape_concurrency=args.scrape_concurrency,
+            parse_concurrency=args.parse_concurrency,
+            page_workers=args.page_workers,
+            chunk_tokens=args.chunk_tokens,
+            chunk_overlap=args.chunk_overlap,
+            chunk_strategy=args.chunk_strategy,
+            dedup_level=args.dedup,
+            prefilter=args.prefilter,
+            top_k=args.top_k,
+            timeout=args.timeout,
+            force_refresh=args.force_refresh,
+            load_profile=get_load_profile(args.load_profile, args.wait_selector),
+            crawl_depth=args.crawl_depth,
+            crawl_pages=args.crawl_pages,
+            crawl_per_host=args.crawl_per_host,
+            crawl_delay=args.crawl_delay,
+            done=done,
+            table=table,
+        )
+        try:
+            if crawling:
+                runner.crawl(pending)
+            else:
+                runner.run(pending)
+        except KeyboardInterrupt:
+            main_logger.warning("Interrupted; rerun with the same output file to resume")
+            return 130
+        finally:
+            if args.export:
+                table.export(args.export)
+                main_logger.info(
+                    f"Exported {len(table)} records ({table.merged} duplicates merged, {table.rejected} rejected) to {args.export}"
+                )
+
+    main_logger.info(
+        f"Batch finished in {time.time() - start_time:.2f}s: {runner.succeeded} succeeded, {runner.failed} failed"
+    )
+    return 1 if runner.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
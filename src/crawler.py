@@ -0,0 +1,389 @@
+import hashlib
+import heapq
+import itertools
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+from http_fetch import normalize_url
+from load_profile import LoadProfile
+from logging_config import scraper_logger
+from scrape import ScrapeResult, WebScraper
+from stream_clean import make_event_parser, pieces, STREAM_FEED_CHARS
+from telemetry import telemetry
+
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "50"))
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "2"))
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))
+# Politeness: requests in flight per host, and seconds between request starts on one host
+CRAWL_PER_HOST = int(os.getenv("CRAWL_PER_HOST", "2"))
+CRAWL_DELAY = float(os.getenv("CRAWL_DELAY", "0.5"))
+# Seen-set sizing: expected distinct URLs and tolerated false-positive rate
+CRAWL_BLOOM_CAPACITY = int(os.getenv("CRAWL_BLOOM_CAPACITY", "100000"))
+CRAWL_BLOOM_ERROR = float(os.getenv("CRAWL_BLOOM_ERROR", "0.001"))
+
+# Links to files that are never HTML pages
+SKIPPED_EXTENSIONS = frozenset((
+    "pdf", "zip", "gz", "tar", "rar", "7z", "exe", "dmg", "apk", "iso",
+    "png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp",
+    "mp4", "webm", "mp3", "wav", "ogg", "mov", "avi",
+    "css", "js", "json", "xml", "rss", "atom", "txt", "csv",
+    "doc", "docx", "xls", "xlsx", "ppt", "pptx",
+    "woff", "woff2", "ttf", "otf", "eot",
+))
+SKIPPED_SCHEMES = ("javascript:", "mailto:", "tel:", "data:", "ftp:", "sms:")
+
+# No bare "p": WordPress uses ?p=<post id> for post permalinks
+PAGINATION_URL_PATTERN = re.compile(r"[?&](?:page|pg|paged|offset|start)=\d+|/page/\d+/?$", re.IGNORECASE)
+NEXT_TEXT_PATTERN = re.compile(r"^\s*(?:next|more|older|load more|›|»|→|>)(?:\s|$|[›»→>])", re.IGNORECASE)
+
+
+@dataclass
+class Link:
+    """A link found on a page: absolute URL without fragment, anchor text and rel values"""
+    url: str
+    text: str = ""
+    rel: Tuple[str, ...] = ()
+
+    @property
+    def nofollow(self) -> bool:
+        return "nofollow" in self.rel
+
+    @property
+    def pagination(self) -> bool:
+        """Links to the next page of the same listing (rel=next, ?page=N, /page/N or "Next")"""
+        return (
+            "next" in self.rel
+            or bool(PAGINATION_URL_PATTERN.search(self.url))
+            or bool(NEXT_TEXT_PATTERN.match(self.text))
+        )
+
+
+class LinkCollector:
+    """
+    Parser target that records <a href>, <area href> and <link rel=next> links with their
+    anchor text, honours <base href> and <meta name=robots content=nofollow>, and keeps no tree.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.links: List[Link] = []
+        self.nofollow = False
+        self._anchor: Optional[Tuple[str, Tuple[str, ...]]] = None
+        self._text: List[str] = []
+
+    def start(self, tag: str, attrib=None) -> None:
+        tag = tag.lower()
+        attrib = attrib or {}
+        if tag == "base" and attrib.get("href"):
+            self.base_url = urljoin(self.base_url, attrib["href"].strip())
+        elif tag == "meta" and (attrib.get("name") or "").lower() == "robots":
+            self.nofollow = self.nofollow or "nofollow" in (attrib.get("content") or "").lower()
+        elif tag in ("a", "area") and attrib.get("href"):
+            self._close_anchor()
+            self._anchor = (attrib["href"], self._rel(attrib))
+        elif tag == "link" and attrib.get("href") and "next" in self._rel(attrib):
+            self._add(attrib["href"], "", self._rel(attrib))
+
+    def end(self, tag: str) -> None:
+        if tag.lower() in ("a", "area"):
+            self._close_anchor()
+
+    def data(self, text: str) -> None:
+        if self._anchor is not None:
+            self._text.append(text)
+
+    def comment(self, text: str) -> None:
+        pass
+
+    def close(self) -> None:
+        self._close_anchor()
+
+    @staticmethod
+    def _rel(attrib) -> Tuple[str, ...]:
+        return tuple((attrib.get("rel") or "").lower().split())
+
+    def _close_anchor(self) -> None:
+        if self._anchor is not None:
+            href, rel = self._anchor
+            self._add(href, " ".join("".join(self._text).split()), rel)
+        self._anchor = None
+        self._text.clear()
+
+    def _add(self, href: str, text: str, rel: Tuple[str, ...]) -> None:
+        href = href.strip()
+        if not href or href.startswith("#") or href.lower().startswith(SKIPPED_SCHEMES):
+            return
+        url, _ = urldefrag(urljoin(self.base_url, href))
+        self.links.append(Link(url, text[:200], rel))
+
+
+def extract_links(html: str, base_url: str, feed_chars: int = STREAM_FEED_CHARS) -> List[Link]:
+    """
+    Links of an HTML page in document order, resolved against the page URL (or its <base>).
+    Parsed with the streaming event parser, so no DOM is built. A page marked
+    robots nofollow yields no links.
+    """
+    collector = LinkCollector(base_url)
+    parser = make_event_parser(collector)
+    for piece in pieces(html, feed_chars):
+        if piece:
+            parser.feed(piece)
+    parser.close()
+    return [] if collector.nofollow else collector.links
+
+
+def site_of(url: str) -> str:
+    """The host[:port] a URL belongs to, ignoring a leading www. so both forms count as one site"""
+    netloc = urlsplit(url).netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def _host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic set of strings. Never forgets an added item; may report an
+    unseen item as seen with probability ~error_rate once capacity items are stored.
+    100k URLs at 0.1% take ~180 KB instead of the ~10 MB a set of URL strings would.
+    """
+
+    def __init__(self, capacity: int = CRAWL_BLOOM_CAPACITY, error_rate: float = CRAWL_BLOOM_ERROR):
+        capacity = max(1, capacity)
+        error_rate = min(max(error_rate, 1e-9), 0.5)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> bool:
+        """Add item; returns True if it was not already (probably) present"""
+        added = False
+        with self._lock:
+            for position in self._positions(item):
+                byte, mask = position >> 3, 1 << (position & 7)
+                if not self._bits[byte] & mask:
+                    self._bits[byte] |= mask
+                    added = True
+            self.count += added
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+@dataclass
+class CrawlPage:
+    """One fetched page of a crawl; links counts the new URLs it added to the frontier"""
+    url: str
+    depth: int
+    result: ScrapeResult
+    parent: Optional[str] = None
+    links: int = 0
+
+
+@dataclass
+class _HostState:
+    active: int = 0
+    next_start: float = 0.0
+    queue: List[Tuple[float, int, str, int, Optional[str]]] = field(default_factory=list)
+
+
+class Crawler:
+    """
+    Same-site crawler on top of WebScraper. URLs are normalized (scheme/host case, tracking
+    parameters, query order) and deduplicated with a Bloom filter, then queued per host in a
+    priority frontier: shallow pages first, and pagination of the listing being crawled
+    ahead of everything else. Pagination links stay at their listing's depth, so max_depth
+    counts category → item hops rather than pages of one listing. Each host gets at most
+    per_host requests in flight, started at least delay seconds apart.
+    """
+
+    def __init__(
+        self,
+        scraper: WebScraper,
+        max_pages: int = CRAWL_MAX_PAGES,
+        max_depth: int = CRAWL_MAX_DEPTH,
+        concurrency: int = CRAWL_CONCURRENCY,
+        per_host: int = CRAWL_PER_HOST,
+        delay: float = CRAWL_DELAY,
+        include: Optional[str] = None,
+        exclude: Optional[str] = None,
+        same_site: bool = True,
+        timeout: int = 30,
+        force_refresh: bool = False,
+        load_profile: Optional[LoadProfile] = None,
+        bloom_capacity: int = CRAWL_BLOOM_CAPACITY,
+        bloom_error: float = CRAWL_BLOOM_ERROR,
+    ):
+        self.logger = scraper_logger
+        self.scraper = scraper
+        self.max_pages = max(1, max_pages)
+        self.max_depth = max(0, max_depth)
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.delay = max(0.0, delay)
+        self.include: Optional[Pattern[str]] = re.compile(include) if include else None
+        self.exclude: Optional[Pattern[str]] = re.compile(exclude) if exclude else None
+        self.same_site = same_site
+        self.timeout = timeout
+        self.force_refresh = force_refresh
+        self.load_profile = load_profile
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error = bloom_error
+        self.stats: Dict[str, int] = {}
+
+    def crawl(self, seeds: Iterable[str]) -> Iterator[CrawlPage]:
+        """
+        Crawl from the seed URLs, yielding each page as soon as it is fetched (failures
+        included) while further pages keep downloading. Stops after max_pages fetches or
+        when the frontier is exhausted; closing the generator cancels queued fetches.
+        """
+        self.stats = {"fetched": 0, "failed": 0, "queued": 0, "duplicates": 0, "filtered": 0}
+        self._seen = BloomFilter(self.bloom_capacity, self.bloom_error)
+        self._hosts: Dict[str, _HostState] = {}
+        self._sequence = itertools.count()
+        seeds = [normalize_url(seed) for seed in seeds if seed]
+        self._sites = {site_of(seed) for seed in seeds}
+        for seed in seeds:
+            if self._seen.add(seed):
+                self._push(seed, 0, 0.0, None)
+                self.stats["queued"] += 1
+
+        start_time = time.time()
+        dispatched = 0
+        in_flight: Dict[Future, Tuple[str, int, Optional[str]]] = {}
+        self.logger.info(
+            "Starting crawl of %s (max %d pages, depth %d, %d per host, %.2fs delay)",
+            ", ".join(seeds), self.max_pages, self.max_depth, self.per_host, self.delay
+        )
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="crawler")
+        try:
+            while True:
+                while dispatched < self.max_pages and len(in_flight) < self.concurrency:
+                    entry = self._pop_ready(time.monotonic())
+                    if entry is None:
+                        break
+                    url, depth, parent = entry
+                    future = executor.submit(
+                        telemetry.bind(self.scraper.fetch_page), url, self.timeout, self.force_refresh, self.load_profile
+                    )
+                    in_flight[future] = entry
+                    dispatched += 1
+
+                wake_at = self._next_start() if dispatched < self.max_pages and len(in_flight) < self.concurrency else None
+                if not in_flight:
+                    if wake_at is None:
+                        break
+                    # Everything queued is waiting out a host's delay
+                    time.sleep(max(0.0, wake_at - time.monotonic()))
+                    continue
+
+                timeout = None if wake_at is None else max(0.0, wake_at - time.monotonic())
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth, parent = in_flight.pop(future)
+                    self._hosts[_host_of(url)].active -= 1
+                    yield self._finish(future.result(), url, depth, parent)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.logger.info(
+                "Crawl finished in %.2fs: %d fetched, %d failed, %d queued, %d duplicate and %d filtered links, %d left in frontier",
+                time.time() - start_time, self.stats["fetched"], self.stats["failed"], self.stats["queued"],
+                self.stats["duplicates"], self.stats["filtered"], sum(len(host.queue) for host in self._hosts.values())
+            )
+
+    def _finish(self, result: ScrapeResult, url: str, depth: int, parent: Optional[str]) -> CrawlPage:
+        page = CrawlPage(url, depth, result, parent)
+        if not result.ok:
+            self.stats["failed"] += 1
+            return page
+
+        self.stats["fetched"] += 1
+        if result.final_url:
+            # A redirect target is the page itself; do not fetch it again when it is linked
+            self._seen.add(normalize_url(result.final_url))
+        try:
+            with telemetry.span("extract_links", url=url, html_bytes=len(result.html)) as span:
+                # Relative links resolve against where the page was served from after redirects
+                links = extract_links(result.html, result.base_url)
+                for link in links:
+                    page.links += self._enqueue(link, depth, url)
+                span.set(links=len(links), queued=page.links)
+        except Exception as e:
+            self.logger.error(f"Error extracting links from {url}: {str(e)}")
+        return page
+
+    def _enqueue(self, link: Link, depth: int, parent: str) -> bool:
+        """Queue a link found at depth unless it is filtered, too deep or already seen"""
+        if link.nofollow or not self._allowed(link.url):
+            self.stats["filtered"] += 1
+            return False
+        pagination = link.pagination
+        link_depth = depth if pagination else depth + 1
+        if link_depth > self.max_depth:
+            self.stats["filtered"] += 1
+            return False
+
+        url = normalize_url(link.url)
+        if not self._seen.add(url):
+            self.stats["duplicates"] += 1
+            return False
+        self._push(url, link_depth, link_depth - 0.5 if pagination else float(link_depth), parent)
+        self.stats["queued"] += 1
+        return True
+
+    def _allowed(self, url: str) -> bool:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            return False
+        if self.same_site and site_of(url) not in self._sites:
+            return False
+        last_segment = parts.path.rsplit("/", 1)[-1]
+        if "." in last_segment and last_segment.rpartition(".")[2].lower() in SKIPPED_EXTENSIONS:
+            return False
+        if self.include is not None and not self.include.search(url):
+            return False
+        return self.exclude is None or not self.exclude.search(url)
+
+    def _push(self, url: str, depth: int, priority: float, parent: Optional[str]) -> None:
+        host = self._hosts.setdefault(_host_of(url), _HostState())
+        heapq.heappush(host.queue, (priority, next(self._sequence), url, depth, parent))
+
+    def _pop_ready(self, now: float) -> Optional[Tuple[str, int, Optional[str]]]:
+        """Best queued URL among hosts below their concurrency limit and past their delay"""
+        best: Optional[_HostState] = None
+        for host in self._hosts.values():
+            if host.queue and host.active < self.per_host and host.next_start <= now:
+                if best is None or host.queue[0] < best.queue[0]:
+                    best = host
+        if best is None:
+            return None
+        _, _, url, depth, parent = heapq.heappop(best.queue)
+        best.active += 1
+        best.next_start = now + self.delay
+        return url, depth, parent
+
+    def _next_start(self) -> Optional[float]:
+        """When the next host with queued URLs and a free slot may start a request"""
+        times = [host.next_start for host in self._hosts.values() if host.queue and host.active < self.per_host]
+        return min(times) if times else None
@@ -0,0 +1,315 @@
+import json
+import os
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+from http_fetch import normalize_url
+from logging_config import scraper_logger
+
+DEDUP_OFF = "off"
+DEDUP_LIGHT = "light"
+DEDUP_BALANCED = "balanced"
+DEDUP_AGGRESSIVE = "aggressive"
+DEDUP_LEVELS = {DEDUP_OFF: 0, DEDUP_LIGHT: 1, DEDUP_BALANCED: 2, DEDUP_AGGRESSIVE: 3}
+
+DEDUP_LEVEL = os.getenv("DEDUP_LEVEL", DEDUP_LIGHT)
+DEDUP_MEMORY_PATH = os.getenv("DEDUP_MEMORY_PATH", "../cache/boilerplate.json")
+
+# Consecutive lines hashed together when looking for repeated blocks
+BLOCK_LINES = 3
+# Repeated blocks shorter than this are kept (e.g. table cells like "Yes / Yes / Yes")
+MIN_BLOCK_CHARS = 30
+# Exact repeats of lines at least this long are dropped at every level
+MIN_DUPLICATE_LINE_CHARS = 40
+# Lines at least this long are compared for near-duplicates on their own; shorter lines are grouped
+PARAGRAPH_CHARS = 80
+# A block seen on this many distinct pages of one site is treated as site boilerplate
+SITE_MIN_PAGES = 3
+SITE_MAX_BLOCKS = 100_000
+
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+NEAR_DUPLICATE_THRESHOLD = 0.7
+SHINGLE_WORDS = 3
+MERSENNE_PRIME = (1 << 61) - 1
+
+BOILERPLATE_PATTERNS = re.compile(
+    r"cookie|privacy policy|terms (of|and) (use|service|conditions)|all rights reserved|©|copyright"
+    r"|subscribe to (our )?newsletter|skip to (main )?content|back to top|sign (in|up)|log ?in|"
+    r"follow us|share (on|this)",
+    re.IGNORECASE,
+)
+MAX_BOILERPLATE_LINE_CHARS = 200
+
+_rng = np.random.default_rng(20240601)
+# Coefficients below 2**31 keep a * h + b (h is a 32-bit crc) inside uint64
+_PERM_A = _rng.integers(1, 1 << 31, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 31, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def _fingerprint(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def _host(url: Optional[str]) -> Optional[str]:
+    if not url:
+        return None
+    return (urlsplit(url).hostname or "").lower().removeprefix("www.") or None
+
+
+@dataclass
+class DedupStats:
+    """How much a dedup pass removed"""
+    input_chars: int = 0
+    output_chars: int = 0
+    site_boilerplate_lines: int = 0
+    duplicate_block_lines: int = 0
+    duplicate_lines: int = 0
+    near_duplicate_lines: int = 0
+    pattern_lines: int = 0
+
+    @property
+    def saved_chars(self) -> int:
+        return self.input_chars - self.output_chars
+
+    @property
+    def saved_ratio(self) -> float:
+        return self.saved_chars / self.input_chars if self.input_chars else 0.0
+
+
+class SiteBoilerplateMemory:
+    """
+    Remembers which text blocks appear on several distinct pages of the same site so
+    later pages of that site can drop them immediately. Optionally persisted as JSON.
+    """
+
+    def __init__(self, path: Optional[str] = DEDUP_MEMORY_PATH, min_pages: int = SITE_MIN_PAGES, max_blocks: int = SITE_MAX_BLOCKS):
+        self.logger = scraper_logger
+        self.path = path
+        self.min_pages = min_pages
+        self.max_blocks = max_blocks
+        self._blocks: Dict[str, Dict[int, Set[int]]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path:
+            self.load()
+
+    def is_boilerplate(self, host: str, fingerprint: int) -> bool:
+        pages = self._blocks.get(host, {}).get(fingerprint)
+        return pages is not None and len(pages) >= self.min_pages
+
+    def record(self, host: str, url: str, fingerprints: Set[int]) -> None:
+        """Note that these blocks appeared on this page"""
+        # Tracking parameters and fragments do not make another page of the site
+        page = _fingerprint(normalize_url(url))
+        with self._lock:
+            blocks = self._blocks.setdefault(host, {})
+            for fingerprint in fingerprints:
+                pages = blocks.get(fingerprint)
+                if pages is None:
+                    blocks[fingerprint] = {page}
+                elif len(pages) < self.min_pages:
+                    pages.add(page)
+            # Forget the oldest blocks first once a site grows too large
+            while len(blocks) > self.max_blocks:
+                blocks.pop(next(iter(blocks)))
+            self._dirty = True
+
+    def known_blocks(self, host: str) -> int:
+        return sum(1 for pages in self._blocks.get(host, {}).values() if len(pages) >= self.min_pages)
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self._blocks = {
+                host: {int(fingerprint): set(pages) for fingerprint, pages in blocks.items()}
+                for host, blocks in data.items()
+            }
+            self.logger.info("Loaded boilerplate memory for %d sites", len(self._blocks))
+        except Exception as e:
+            self.logger.warning("Could not load boilerplate memory: %s", e)
+
+    def save(self) -> None:
+        if not self.path or not self._dirty:
+            return
+        try:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with self._lock:
+                data = {
+                    host: {str(fingerprint): sorted(pages) for fingerprint, pages in blocks.items()}
+                    for host, blocks in self._blocks.items()
+                }
+                self._dirty = False
+            with open(self.path, "w") as f:
+                json.dump(data, f)
+        except Exception as e:
+            self.logger.warning("Could not save boilerplate memory: %s", e)
+
+
+class ContentDeduplicator:
+    """
+    Removes repeated text from cleaned page content before it is chunked.
+
+    light:      site-wide boilerplate blocks, repeated multi-line blocks, repeated long lines
+    balanced:   + near-duplicate segments (MinHash over word shingles)
+    aggressive: + every repeated line and common boilerplate phrases (cookies, legal, sign-in)
+    """
+
+    def __init__(self, level: str = DEDUP_LEVEL, memory: Optional[SiteBoilerplateMemory] = None):
+        self.logger = scraper_logger
+        self.level = level
+        self.memory = memory
+
+    def dedup(self, text: str, url: Optional[str] = None, level: Optional[str] = None) -> Tuple[str, DedupStats]:
+        stats = DedupStats(input_chars=len(text), output_chars=len(text))
+        rank = DEDUP_LEVELS.get(level or self.level, 0)
+        if not text or rank == 0:
+            return text, stats
+
+        lines = text.split("\n")
+        keep = [True] * len(lines)
+        host = _host(url)
+
+        if host and self.memory is not None:
+            stats.site_boilerplate_lines = self._drop_site_boilerplate(lines, keep, host)
+        stats.duplicate_block_lines = self._drop_repeated_blocks(lines, keep)
+        stats.duplicate_lines = self._drop_repeated_lines(lines, keep, 1 if rank >= 3 else MIN_DUPLICATE_LINE_CHARS)
+        if rank >= 2:
+            stats.near_duplicate_lines = self._drop_near_duplicates(lines, keep)
+        if rank >= 3:
+            stats.pattern_lines = self._drop_boilerplate_patterns(lines, keep)
+
+        if host and self.memory is not None:
+            self.memory.record(host, url, {fingerprint for fingerprint, _ in self._blocks(lines)})
+
+        result = "\n".join(line for line, kept in zip(lines, keep) if kept)
+        stats.output_chars = len(result)
+        self.logger.info(
+            "Dedup (%s) removed %d of %d chars (%.1f%%): site=%d blocks=%d lines=%d near=%d patterns=%d",
+            level or self.level, stats.saved_chars, stats.input_chars, stats.saved_ratio * 100,
+            stats.site_boilerplate_lines, stats.duplicate_block_lines, stats.duplicate_lines,
+            stats.near_duplicate_lines, stats.pattern_lines
+        )
+        return result, stats
+
+    @staticmethod
+    def _blocks(lines: List[str]):
+        """(fingerprint, start) for every window of BLOCK_LINES lines long enough to matter"""
+        for start in range(len(lines) - BLOCK_LINES + 1):
+            block = "\n".join(lines[start:start + BLOCK_LINES])
+            if len(block) >= MIN_BLOCK_CHARS:
+                yield _fingerprint(block), start
+
+    def _drop_site_boilerplate(self, lines: List[str], keep: List[bool], host: str) -> int:
+        dropped = 0
+        for fingerprint, start in self._blocks(lines):
+            if self.memory.is_boilerplate(host, fingerprint):
+                for i in range(start, start + BLOCK_LINES):
+                    if keep[i]:
+                        keep[i] = False
+                        dropped += 1
+        return dropped
+
+    def _drop_repeated_blocks(self, lines: List[str], keep: List[bool]) -> int:
+        """Drop every later exact copy of a multi-line block"""
+        seen = set()
+        dropped = 0
+        start = 0
+        while start <= len(lines) - BLOCK_LINES:
+            window = range(start, start + BLOCK_LINES)
+            if not all(keep[i] for i in window):
+                start += 1
+                continue
+            block = "\n".join(lines[start:start + BLOCK_LINES])
+            if len(block) < MIN_BLOCK_CHARS:
+                start += 1
+                continue
+            fingerprint = _fingerprint(block)
+            if fingerprint in seen:
+                for i in window:
+                    keep[i] = False
+                dropped += BLOCK_LINES
+                start += BLOCK_LINES
+            else:
+                seen.add(fingerprint)
+                start += 1
+        return dropped
+
+    @staticmethod
+    def _drop_repeated_lines(lines: List[str], keep: List[bool], min_chars: int) -> int:
+        seen = set()
+        dropped = 0
+        for i, line in enumerate(lines):
+            if not keep[i] or len(line) < min_chars:
+                continue
+            if line in seen:
+                keep[i] = False
+                dropped += 1
+            else:
+                seen.add(line)
+        return dropped
+
+    def _drop_near_duplicates(self, lines: List[str], keep: List[bool]) -> int:
+        """Drop segments whose MinHash signature is close to an earlier kept segment"""
+        rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+        buckets: Dict[Tuple[int, bytes], List[np.ndarray]] = {}
+        dropped = 0
+
+        for segment in self._segments(lines, keep):
+            words = " ".join(lines[i] for i in segment).lower().split()
+            if len(words) < SHINGLE_WORDS * 2:
+                continue
+            signature = self._minhash(words)
+            bands = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(MINHASH_BANDS)]
+
+            candidates = [other for key in bands for other in buckets.get(key, ())]
+            if any(np.mean(signature == other) >= NEAR_DUPLICATE_THRESHOLD for other in candidates):
+                for i in segment:
+                    keep[i] = False
+                dropped += len(segment)
+                continue
+            for key in bands:
+                buckets.setdefault(key, []).append(signature)
+        return dropped
+
+    @staticmethod
+    def _segments(lines: List[str], keep: List[bool]):
+        """Kept lines grouped for comparison: each paragraph-length line alone, short lines in runs between them"""
+        run = []
+        for i, line in enumerate(lines):
+            if not keep[i]:
+                continue
+            if len(line) >= PARAGRAPH_CHARS:
+                if run:
+                    yield run
+                    run = []
+                yield [i]
+            else:
+                run.append(i)
+        if run:
+            yield run
+
+    @staticmethod
+    def _minhash(words: List[str]) -> np.ndarray:
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+        hashes = np.fromiter((_fingerprint(shingle) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % np.uint64(MERSENNE_PRIME)
+        return permuted.min(axis=1)
+
+    @staticmethod
+    def _drop_boilerplate_patterns(lines: List[str], keep: List[bool]) -> int:
+        dropped = 0
+        for i, line in enumerate(lines):
+            if keep[i] and len(line) <= MAX_BOILERPLATE_LINE_CHARS and BOILERPLATE_PATTERNS.search(line):
+                keep[i] = False
+                dropped += 1
+        return dropped
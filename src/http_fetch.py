@@ -0,0 +1,181 @@
+import importlib.util
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+from logging_config import scraper_logger
+
+HTTP_FETCH_TIMEOUT = float(os.getenv("HTTP_FETCH_TIMEOUT", "15"))
+HTTP_USER_AGENT = os.getenv(
+    "HTTP_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36",
+)
+
+# HTTP/2 needs the optional h2 package; brotli/zstd decoding is enabled by httpx when installed
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Pages with less visible text than this are assumed to be rendered client-side
+MIN_TEXT_CHARS = 200
+# Below this visible-text / markup ratio a page is treated as a JavaScript app shell
+MIN_TEXT_RATIO = 0.02
+
+BLOCKED_STATUS_CODES = {401, 403, 407, 429, 503}
+# The page does not exist; a browser would get the same answer, so these fail the fetch
+MISSING_STATUS_CODES = {404, 410}
+
+# Bot-protection pages; in the browser these are what the captcha solver is needed for
+CAPTCHA_MARKERS = (
+    "cf-challenge",
+    "challenge-platform",
+    "cf-turnstile",
+    "g-recaptcha",
+    "h-captcha",
+    "px-captcha",
+    "captcha-delivery",
+    "_incapsula_resource",
+    "just a moment...",
+    "attention required!",
+)
+
+CHALLENGE_MARKERS = CAPTCHA_MARKERS + (
+    "access denied",
+    "please enable javascript",
+    "enable javascript and cookies",
+    "requires javascript",
+)
+
+SCRIPT_STYLE_PATTERN = re.compile(r"<(script|style|noscript)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+# Query parameters that only track the visitor and never change page content
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "msclkid"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for caching and deduplication: lower-cased scheme and host,
+    default port and fragment removed, tracking parameters dropped, query sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_")
+    ))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class PageNotFound(Exception):
+    """The server answered that the page does not exist (404 or 410)"""
+
+
+@dataclass
+class FetchResponse:
+    """Result of a plain HTTP GET"""
+    url: str
+    status_code: int
+    text: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    http_version: str = ""
+
+
+def visible_text_length(html: str) -> int:
+    """Approximate length of the visible text without building a DOM"""
+    text = TAG_PATTERN.sub(" ", SCRIPT_STYLE_PATTERN.sub(" ", html))
+    return len(WHITESPACE_PATTERN.sub(" ", text).strip())
+
+
+def needs_browser(response: FetchResponse) -> Optional[str]:
+    """
+    Decide whether a plain HTTP response is good enough or the page needs the
+    remote browser. Returns the escalation reason, or None to accept the response.
+    Only 2xx responses are ever accepted (and so cached); callers check
+    MISSING_STATUS_CODES first, since those pages should fail rather than escalate.
+    """
+    if response.status_code in BLOCKED_STATUS_CODES:
+        return f"blocked status {response.status_code}"
+    if not 200 <= response.status_code < 300:
+        return f"error status {response.status_code}"
+
+    content_type = response.headers.get("content-type", "").lower()
+    if content_type and "html" not in content_type and "xml" not in content_type:
+        return f"non-HTML content ({content_type.split(';')[0]})"
+
+    html = response.text or ""
+    if not html.strip():
+        return "empty body"
+
+    lowered = html[:200_000].lower()
+    for marker in CHALLENGE_MARKERS:
+        if marker in lowered:
+            return f"challenge marker '{marker}'"
+
+    text_length = visible_text_length(html)
+    if text_length < MIN_TEXT_CHARS:
+        return f"too little text ({text_length} chars)"
+    if text_length / len(html) < MIN_TEXT_RATIO:
+        return f"low text-to-markup ratio ({text_length / len(html):.3f})"
+
+    return None
+
+
+def conditional_headers(etag: Optional[str], last_modified: Optional[str]) -> Dict[str, str]:
+    """Request headers that turn a GET into a revalidation against stored validators"""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+class HttpFetcher:
+    """Pooled keep-alive HTTP client used as the fast tier before the remote browser"""
+
+    def __init__(self, timeout: float = HTTP_FETCH_TIMEOUT, user_agent: str = HTTP_USER_AGENT):
+        self.logger = scraper_logger
+        self.client = httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            follow_redirects=True,
+            timeout=timeout,
+            headers={
+                "User-Agent": user_agent,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "en-US,en;q=0.9",
+            },
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        )
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> FetchResponse:
+        """GET a URL; raises httpx.HTTPError on network failures"""
+        response = self.client.get(url, headers=headers, timeout=timeout or self.client.timeout)
+        return FetchResponse(
+            url=str(response.url),
+            status_code=response.status_code,
+            text=response.text,
+            headers={key.lower(): value for key, value in response.headers.items()},
+            http_version=response.http_version,
+        )
+
+    def head(self, url: str, timeout: Optional[float] = None) -> FetchResponse:
+        """HEAD a URL to read its validators without downloading the body"""
+        response = self.client.head(url, timeout=timeout or self.client.timeout)
+        return FetchResponse(
+            url=str(response.url),
+            status_code=response.status_code,
+            text="",
+            headers={key.lower(): value for key, value in response.headers.items()},
+            http_version=response.http_version,
+        )
+
+    def close(self) -> None:
+        self.client.close()
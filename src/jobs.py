@@ -0,0 +1,225 @@
+import atexit
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from logging_config import log_context, main_logger
+from telemetry import telemetry
+
+# Jobs running at once across all users; further jobs wait in the queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Unfinished (queued or running) jobs one user may have
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", "3"))
+# Finished jobs keep their results this long, and at most this many are kept (oldest evicted first)
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "1800"))
+JOB_MAX_RETAINED = int(os.getenv("JOB_MAX_RETAINED", "200"))
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+FINISHED_STATUSES = (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when its owner cancelled it"""
+
+
+class JobLimitError(RuntimeError):
+    """The owner already has the maximum number of unfinished jobs"""
+
+
+@dataclass
+class Job:
+    """A unit of background work; fields are written by the worker and read by any session"""
+    id: str
+    owner: str
+    kind: str
+    description: str
+    status: str = STATUS_QUEUED
+    progress: float = 0.0
+    message: str = ""
+    # Partial output shown while the job runs (e.g. streamed model tokens)
+    preview: str = ""
+    result: Any = None
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+    _future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def finished_ok(self) -> bool:
+        return self.status == STATUS_DONE
+
+    @property
+    def active(self) -> bool:
+        return self.status not in FINISHED_STATUSES
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class JobContext:
+    """Handed to a running job so it can report progress and notice cancellation"""
+
+    def __init__(self, job: Job):
+        self.job = job
+
+    @property
+    def cancelled(self) -> bool:
+        return self.job._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        """Raise JobCancelled if the job was cancelled; call between steps of long work"""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def report(self, progress: Optional[float] = None, message: Optional[str] = None, preview: Optional[str] = None) -> None:
+        """Update progress (0..1), the status message and/or the partial output, then check for cancellation"""
+        if progress is not None:
+            self.job.progress = min(1.0, max(0.0, progress))
+        if message is not None:
+            self.job.message = message
+        if preview is not None:
+            self.job.preview = preview
+        self.check_cancelled()
+
+
+class JobManager:
+    """
+    Process-wide executor for scrape and parse jobs, so the Streamlit script only submits
+    work and polls it. Jobs run on a bounded thread pool (the work is network-bound and
+    shares the process's caches and browser pool), each owner may have a limited number
+    of unfinished jobs, and finished jobs keep their results until they expire or the
+    retention limit evicts the oldest. Cancellation is cooperative: queued jobs never
+    start, running jobs stop at their next report() or check_cancelled().
+    """
+
+    def __init__(
+        self,
+        max_workers: int = JOB_WORKERS,
+        max_per_owner: int = JOB_MAX_PER_USER,
+        retention_seconds: float = JOB_RETENTION_SECONDS,
+        max_retained: int = JOB_MAX_RETAINED,
+    ):
+        self.logger = main_logger
+        self.max_workers = max(1, max_workers)
+        self.max_per_owner = max(1, max_per_owner)
+        self.retention_seconds = retention_seconds
+        self.max_retained = max(1, max_retained)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, owner: str, kind: str, description: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Job:
+        """
+        Queue fn(context, *args, **kwargs) as a job of owner and return it immediately.
+        Raises JobLimitError when owner already has max_per_owner unfinished jobs.
+        """
+        with self._lock:
+            self._evict()
+            active = sum(1 for job in self._jobs.values() if job.owner == owner and job.active)
+            if active >= self.max_per_owner:
+                raise JobLimitError(f"{active} jobs are already running; wait for one to finish or cancel it")
+            job = Job(uuid.uuid4().hex[:12], owner, kind, description)
+            self._jobs[job.id] = job
+            job._future = self._executor.submit(telemetry.bind(self._run), job, fn, args, kwargs)
+
+        self.logger.info("Queued %s job %s: %.200s", kind, job.id, description)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        with log_context(job_id=job.id):
+            if job._cancel.is_set():
+                self._finish(job, STATUS_CANCELLED)
+                return
+            job.status = STATUS_RUNNING
+            job.started = time.time()
+            try:
+                with telemetry.span("job", kind=job.kind, job_id=job.id):
+                    job.result = fn(JobContext(job), *args, **kwargs)
+                self._finish(job, STATUS_DONE)
+            except JobCancelled:
+                self._finish(job, STATUS_CANCELLED)
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {str(e)}"
+                self.logger.error("%s job %s failed: %s", job.kind.title(), job.id, job.error)
+                self._finish(job, STATUS_FAILED)
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.status = status
+        job.finished = time.time()
+        if status == STATUS_DONE:
+            job.progress = 1.0
+        self.logger.info("%s job %s %s after %.2fs", job.kind.title(), job.id, status, job.elapsed)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def jobs_for(self, owner: str) -> List[Job]:
+        """The owner's retained jobs, newest first"""
+        with self._lock:
+            self._evict()
+            jobs = [job for job in self._jobs.values() if job.owner == owner]
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """Ask a job to stop; returns False if it is unknown or already finished"""
+        job = self._jobs.get(job_id)
+        if job is None or not job.active:
+            return False
+        job._cancel.set()
+        if job._future is not None and job._future.cancel():
+            # Never started, so _run will not record the outcome
+            self._finish(job, STATUS_CANCELLED)
+        self.logger.info("Cancellation requested for %s job %s", job.kind, job.id)
+        return True
+
+    def remove(self, job_id: str) -> None:
+        """Forget a finished job and its result"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not job.active:
+                del self._jobs[job_id]
+
+    def _evict(self) -> None:
+        """Drop expired finished jobs, then the oldest finished ones beyond max_retained (lock held)"""
+        now = time.time()
+        finished = sorted((job for job in self._jobs.values() if not job.active), key=lambda job: job.finished or 0.0)
+        excess = len(finished) - self.max_retained
+        for n, job in enumerate(finished):
+            if n < excess or now - (job.finished or now) > self.retention_seconds:
+                del self._jobs[job.id]
+
+    def shutdown(self) -> None:
+        for job in list(self._jobs.values()):
+            job._cancel.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+_job_manager: Optional[JobManager] = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """The process-wide JobManager shared by every Streamlit session, created on first use"""
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager()
+                atexit.register(_job_manager.shutdown)
+    return _job_manager
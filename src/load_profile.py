@@ -0,0 +1,178 @@
+import os
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Tuple
+
+from http_fetch import CAPTCHA_MARKERS
+
+SCRAPER_LOAD_PROFILE = os.getenv("SCRAPER_LOAD_PROFILE", "fast")
+# Extra comma-separated URL wildcard patterns blocked by every profile that blocks anything
+SCRAPER_BLOCK_URL_PATTERNS = tuple(
+    pattern.strip() for pattern in os.getenv("SCRAPER_BLOCK_URL_PATTERNS", "").split(",") if pattern.strip()
+)
+SCRAPER_NETWORK_IDLE_MS = int(os.getenv("SCRAPER_NETWORK_IDLE_MS", "500"))
+SCRAPER_READY_TIMEOUT = float(os.getenv("SCRAPER_READY_TIMEOUT", "10"))
+
+# Cloudflare injects its challenge-platform script into ordinary pages too, so in a rendered
+# page only the markers of an actual challenge trigger the solver
+BROWSER_CAPTCHA_MARKERS = tuple(marker for marker in CAPTCHA_MARKERS if marker != "challenge-platform")
+
+WAIT_DOM_CONTENT_LOADED = "domcontentloaded"
+WAIT_LOAD = "load"
+WAIT_NETWORK_IDLE = "network_idle"
+
+CAPTCHA_ALWAYS = "always"
+CAPTCHA_AUTO = "auto"
+CAPTCHA_NEVER = "never"
+
+# Network.setBlockedURLs only matches URL wildcards, so resource types are mapped to file extensions
+RESOURCE_TYPE_EXTENSIONS = {
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "media": ("mp4", "webm", "ogg", "mp3", "wav", "m4a", "mov", "m3u8"),
+    "stylesheet": ("css",),
+}
+
+TRACKER_URL_PATTERNS = (
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*adservice.google.*",
+    "*connect.facebook.net*",
+    "*hotjar.com*",
+    "*clarity.ms*",
+    "*segment.io*",
+    "*cdn.segment.com*",
+    "*scorecardresearch.com*",
+    "*nr-data.net*",
+)
+
+
+@dataclass(frozen=True)
+class LoadProfile:
+    """
+    How much of a page the browser loads and what "ready" means. Blocked resource types
+    and URL patterns are refused by the browser before any bytes are fetched; readiness is
+    checked inside the page in a single round trip instead of fixed sleeps and implicit waits.
+    """
+    name: str
+    blocked_resource_types: Tuple[str, ...] = ()
+    blocked_url_patterns: Tuple[str, ...] = ()
+    # Session-level: applied when a browser session is created ("normal", "eager" or "none")
+    page_load_strategy: str = "normal"
+    wait_for: str = WAIT_LOAD
+    wait_selector: Optional[str] = None
+    network_idle_ms: int = SCRAPER_NETWORK_IDLE_MS
+    wait_timeout: float = SCRAPER_READY_TIMEOUT
+    captcha: str = CAPTCHA_AUTO
+
+    def blocked_patterns(self) -> Tuple[str, ...]:
+        """URL wildcard patterns for Network.setBlockedURLs"""
+        patterns = []
+        for resource_type in self.blocked_resource_types:
+            for extension in RESOURCE_TYPE_EXTENSIONS.get(resource_type, ()):
+                patterns.extend((f"*.{extension}", f"*.{extension}?*"))
+        patterns.extend(self.blocked_url_patterns)
+        if patterns:
+            patterns.extend(SCRAPER_BLOCK_URL_PATTERNS)
+        return tuple(dict.fromkeys(patterns))
+
+    def with_selector(self, selector: Optional[str]) -> "LoadProfile":
+        """This profile, additionally waiting for a CSS selector to match"""
+        return replace(self, wait_selector=selector or None)
+
+
+LOAD_PROFILES: Dict[str, LoadProfile] = {
+    # Everything loads and the solver always runs: the slowest, most faithful rendering
+    "full": LoadProfile(
+        name="full",
+        page_load_strategy="normal",
+        wait_for=WAIT_LOAD,
+        captcha=CAPTCHA_ALWAYS,
+    ),
+    # Skip images, fonts, media and trackers; ready at DOMContentLoaded
+    "fast": LoadProfile(
+        name="fast",
+        blocked_resource_types=("image", "font", "media"),
+        blocked_url_patterns=TRACKER_URL_PATTERNS,
+        page_load_strategy="eager",
+        wait_for=WAIT_DOM_CONTENT_LOADED,
+    ),
+    # Client-rendered apps: also skip stylesheets, but wait until XHR/fetch traffic settles
+    "spa": LoadProfile(
+        name="spa",
+        blocked_resource_types=("image", "font", "media", "stylesheet"),
+        blocked_url_patterns=TRACKER_URL_PATTERNS,
+        page_load_strategy="eager",
+        wait_for=WAIT_NETWORK_IDLE,
+    ),
+}
+
+
+def get_load_profile(name: Optional[str] = None, wait_selector: Optional[str] = None) -> LoadProfile:
+    """A named preset (default SCRAPER_LOAD_PROFILE), optionally waiting for a CSS selector"""
+    name = name or SCRAPER_LOAD_PROFILE
+    if name not in LOAD_PROFILES:
+        raise ValueError(f"Unknown load profile '{name}', expected one of {', '.join(LOAD_PROFILES)}")
+    profile = LOAD_PROFILES[name]
+    return profile.with_selector(wait_selector) if wait_selector else profile
+
+
+# Runs in the page via execute_async_script. Polls in the browser (no WebDriver round trips)
+# until the profile's readiness condition holds, returning early when a challenge page is showing.
+READY_SCRIPT = """
+const [waitFor, selector, idleMs, timeoutMs, markers, done] = arguments;
+const started = performance.now();
+let lastActivity = started;
+let observer = null;
+let timer = null;
+const captchaMarker = () => {
+  const root = document.documentElement;
+  const html = root ? root.outerHTML.slice(0, 200000).toLowerCase() : '';
+  return markers.find(marker => html.includes(marker)) || null;
+};
+const finish = (ready, reason, captcha) => {
+  if (timer !== null) clearInterval(timer);
+  if (observer) observer.disconnect();
+  done({ready, reason, captcha, waited_ms: Math.round(performance.now() - started)});
+};
+try {
+  observer = new PerformanceObserver(() => { lastActivity = performance.now(); });
+  observer.observe({type: 'resource'});
+} catch (e) {}
+const check = () => {
+  const state = document.readyState;
+  let ready = waitFor === 'load' ? state === 'complete' : state !== 'loading';
+  if (ready && waitFor === 'network_idle') ready = performance.now() - lastActivity >= idleMs;
+  if (ready && selector) {
+    try { ready = document.querySelector(selector) !== null; }
+    catch (e) { return finish(false, 'invalid selector', null); }
+  }
+  if (ready) return finish(true, 'ready', captchaMarker());
+  if (performance.now() - started >= timeoutMs) return finish(false, 'timeout', captchaMarker());
+};
+const marker = document.readyState === 'loading' ? null : captchaMarker();
+if (marker) {
+  finish(false, 'captcha', marker);
+} else {
+  timer = setInterval(check, 50);
+  check();
+}
+"""
+
+
+def wait_until_ready(driver: Any, profile: LoadProfile) -> Dict[str, Any]:
+    """
+    Block until the page meets the profile's readiness condition or its wait_timeout passes.
+    Returns {"ready", "reason", "captcha" (matched marker or None), "waited_ms"}.
+    """
+    driver.set_script_timeout(profile.wait_timeout + 5)
+    result = driver.execute_async_script(
+        READY_SCRIPT,
+        profile.wait_for,
+        profile.wait_selector,
+        profile.network_idle_ms,
+        int(profile.wait_timeout * 1000),
+        list(BROWSER_CAPTCHA_MARKERS),
+    )
+    return result if isinstance(result, dict) else {"ready": True, "reason": "ready", "captcha": None, "waited_ms": 0}
@@ -1,42 +1,237 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
 import os
+from typing import Any, Dict, Iterator, Optional
 
-def setup_logger(name: str, log_file: str = None, level: int = logging.INFO) -> logging.Logger:
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" for the human-readable line format, "json" for one JSON object per record
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() in ("1", "true", "yes")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+# Fraction of DEBUG records kept; per-chunk logs are DEBUG so batch runs can sample them down
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Identifiers of the work being done (Streamlit rerun, batch job), attached to every record
+_log_context: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("log_context", default={})
+
+
+def get_log_context() -> Dict[str, str]:
+    return _log_context.get()
+
+
+def set_log_context(**ids: Any) -> contextvars.Token:
+    """Add identifiers (e.g. request_id, job_id) to records logged from this context"""
+    merged = {**_log_context.get(), **{key: str(value) for key, value in ids.items() if value is not None}}
+    return _log_context.set(merged)
+
+
+def reset_log_context(token: contextvars.Token) -> None:
+    _log_context.reset(token)
+
+
+@contextmanager
+def log_context(**ids: Any) -> Iterator[Dict[str, str]]:
+    token = set_log_context(**ids)
+    try:
+        yield _log_context.get()
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the caller's log context onto the record before it leaves the calling thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _log_context.get()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keeps a random fraction of DEBUG records; other levels always pass"""
+
+    def __init__(self, rate: float = LOG_DEBUG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno != logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the log context identifiers as top-level fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "line": record.lineno,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+            **getattr(record, "context", {}),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The classic line format, with log context identifiers appended when present"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = getattr(record, "context", None)
+        if context:
+            line += " [" + " ".join(f"{key}={value}" for key, value in context.items()) + "]"
+        return line
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
     """
-    Set up a logger with both file and console handlers
+    Hands records to the background listener untouched: message interpolation, exception
+    formatting, timestamps, JSON encoding and file writes all happen on the listener
+    thread. Callers must therefore log with %-style arguments that are not mutated
+    afterwards (numbers, strings), never with pre-built f-strings. The listener thread is
+    started by the first record, so importing this module starts no threads.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if _listener is None:
+            _start_listener()
+        super().emit(record)
+
+
+class LogFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-rotated log file whose directory is created when the file is first opened"""
+
+    def _open(self):
+        directory = os.path.dirname(self.baseFilename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return super()._open()
+
+
+_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_lock = threading.Lock()
+_output_handlers = []
+# Loggers whose records only go to their own file, never to the console
+_export_loggers = set()
+
+
+def _formatter() -> logging.Formatter:
+    return JsonFormatter() if LOG_FORMAT == "json" else TextFormatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+
+def _start_listener() -> None:
+    """Start the single writer thread over every output handler registered so far"""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = logging.handlers.QueueListener(_queue, *_output_handlers, respect_handler_level=True)
+            _listener.start()
+
+
+def _add_output_handler(handler: logging.Handler) -> None:
+    """Register an output handler; a listener already running picks it up, otherwise the first record starts it"""
+    with _listener_lock:
+        _output_handlers.append(handler)
+        if _listener is not None:
+            _listener.handlers = tuple(_output_handlers)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def setup_logger(name: str, log_file: str = None, level: int = None) -> logging.Logger:
+    """
+    Set up a logger that queues records to a background writer, which sends them to the
+    console and to a size-rotated log file
     """
     logger = logging.getLogger(name)
-    logger.setLevel(level)
-    
+    logger.setLevel(level if level is not None else logging.getLevelName(LOG_LEVEL))
+
     # Prevent duplicate handlers
     if logger.handlers:
         return logger
-    
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
-    # File handler (optional)
+
+    formatter = _formatter()
+
+    # Console output is shared by all loggers, so it is only registered once
+    if LOG_CONSOLE and not any(getattr(handler, "console", False) for handler in _output_handlers):
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.console = True
+        console_handler.setFormatter(formatter)
+        console_handler.addFilter(lambda record: record.name not in _export_loggers)
+        _add_output_handler(console_handler)
+
+    # File handler (optional); delay=True defers opening the file (and creating its
+    # directory) until the first record is written
     if log_file:
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(level)
+        file_handler = LogFileHandler(
+            log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True, encoding="utf-8"
+        )
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    
+        file_handler.addFilter(logging.Filter(name))
+        _add_output_handler(file_handler)
+
+    queue_handler = DeferredQueueHandler(_queue)
+    queue_handler.addFilter(DebugSampler())
+    queue_handler.addFilter(ContextFilter())
+    logger.addHandler(queue_handler)
+
+    return logger
+
+
+def setup_export_logger(name: str, path: str) -> logging.Logger:
+    """
+    Set up a logger whose messages are appended verbatim, one per line, to path by the
+    background writer, e.g. for exporting spans without file I/O on the caller's thread
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if logger.handlers:
+        return logger
+
+    _export_loggers.add(name)
+    file_handler = LogFileHandler(path, delay=True, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    file_handler.addFilter(logging.Filter(name))
+    _add_output_handler(file_handler)
+    logger.addHandler(DeferredQueueHandler(_queue))
     return logger
 
 # Create loggers for different modules
 scraper_logger = setup_logger('scraper', '../logs/scraper.log')
 parser_logger = setup_logger('parser', '../logs/parser.log')
-main_logger = setup_logger('main', '../logs/main.log')
\ No newline at end of file
+main_logger = setup_logger('main', '../logs/main.log')
+cache_logger = setup_logger('cache', '../logs/cache.log')
@@ -1,9 +1,68 @@
 import streamlit as st
-from scrape import scrape_website, extract_body_content, clean_body_content, split_dom_content
-from parse import parse_with_gemini
+from scrape import fetch_page, cache_cleaned_content, extract_clean_content, dedup_content, split_dom_content, get_scraper
+from parse import iter_parse_with_gemini, parse_many_with_gemini, parse_structured, GEMINI_API_KEY, GEMINI_MODEL
+from relevance import ChunkIndex
+from chunking import CHUNK_STRATEGY_CONTENT, CHUNK_STRATEGY_PACKED
+from dedup import DEDUP_LEVEL, DEDUP_LEVELS
+from load_profile import LOAD_PROFILES, SCRAPER_LOAD_PROFILE, get_load_profile
+from crawler import CRAWL_MAX_DEPTH, CRAWL_MAX_PAGES, Crawler
+from structured import ExtractionSchema, RecordTable
+from jobs import JobContext, JobLimitError, STATUS_CANCELLED, STATUS_DONE, get_job_manager
 import time
 from datetime import datetime
-from logging_config import main_logger
+import uuid
+from logging_config import main_logger, set_log_context
+from telemetry import telemetry
+from stage_cache import content_hash, stage_cache
+
+# Display names for the tier that served a scraped page
+TIER_LABELS = {
+    "http": "HTTP",
+    "browser": "Browser",
+    "cache": "Cache",
+    "revalidated": "Cache (revalidated)",
+}
+
+LOAD_PROFILE_LABELS = {
+    "fast": "Fast (skip images, fonts, trackers)",
+    "spa": "JavaScript app (wait for network idle)",
+    "full": "Full (load everything)",
+}
+
+DEDUP_LEVEL_LABELS = {
+    "off": "Off",
+    "light": "Light (exact repeats)",
+    "balanced": "Balanced (+ near-duplicates)",
+    "aggressive": "Aggressive (+ boilerplate phrases)",
+}
+
+# Pipeline stages shown in the sidebar performance panel
+PERFORMANCE_STAGES = {
+    "scrape": "Scrape",
+    "extract": "Extract",
+    "clean": "Clean",
+    "split": "Split",
+    "llm_call": "LLM Call",
+}
+
+# How often the page polls running jobs for progress
+JOB_POLL_SECONDS = 1.0
+
+JOB_STATUS_ICONS = {
+    "queued": "⏳",
+    "running": "🔄",
+    "done": "✅",
+    "failed": "❌",
+    "cancelled": "🚫",
+}
+
+# Characters shown per page of the content preview; the full text is only sent on download
+PREVIEW_PAGE_CHARS = 20_000
+
+CHUNK_STRATEGY_LABELS = {
+    CHUNK_STRATEGY_PACKED: "Packed (fewest AI calls)",
+    CHUNK_STRATEGY_CONTENT: "Content-defined (page monitoring)",
+}
 
 # Page configuration
 st.set_page_config(
@@ -54,6 +113,16 @@ if 'scrape_history' not in st.session_state:
     st.session_state.scrape_history = []
 if 'current_url' not in st.session_state:
     st.session_state.current_url = ""
+# Jobs belong to this id; it is kept in the URL so a page refresh finds its jobs again
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = st.query_params.get("session") or uuid.uuid4().hex[:16]
+    st.query_params["session"] = st.session_state.user_id
+# Finished jobs whose results this session has already taken in
+if 'handled_jobs' not in st.session_state:
+    st.session_state.handled_jobs = set()
+# Keep track of parsing history for this session
+if 'parse_history' not in st.session_state:
+    st.session_state.parse_history = []
 
 # Main header
 st.markdown("""
@@ -63,6 +132,424 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Exposes /metrics when METRICS_PORT is set; safe to call on every rerun
+telemetry.start_metrics_server()
+
+# Every rerun is one user interaction; its logs (including worker threads) share this id
+set_log_context(request_id=uuid.uuid4().hex[:12])
+
+
+def format_seconds(seconds: float) -> str:
+    return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+
+@st.fragment(run_every="5s")
+def performance_panel():
+    """Live stage latency percentiles across every session of this server process"""
+    rows = []
+    for stage, label in PERFORMANCE_STAGES.items():
+        stats = telemetry.stage_percentiles(stage)
+        if stats:
+            rows.append({
+                "Stage": label,
+                "p50": format_seconds(stats["p50"]),
+                "p95": format_seconds(stats["p95"]),
+                "Count": telemetry.stage_duration.count(stage=stage),
+            })
+    if not rows:
+        return
+    
+    st.subheader("⏱️ Performance")
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    errors = telemetry.stage_errors.value()
+    retries = telemetry.llm_calls.value(status="retry")
+    if errors or retries:
+        st.caption(f"{errors:.0f} failed stages, {retries:.0f} LLM retries")
+
+def get_chunks(content: str, digest: str, settings: tuple) -> list:
+    """
+    Chunks for settings (chunk tokens, overlap, model, strategy), memoized by content hash
+    across reruns. Settings are passed in rather than read from the sidebar so background
+    jobs use the values from when they were submitted.
+    """
+    return stage_cache.get_or_compute("split", digest, settings, lambda: split_dom_content(content, *settings))
+
+
+def get_chunk_index(content: str, digest: str, settings: tuple) -> ChunkIndex:
+    """Relevance index over the chunks, built once per page and chunk setting"""
+    return stage_cache.get_or_compute(
+        "index", digest, settings, lambda: ChunkIndex(get_chunks(content, digest, settings))
+    )
+
+
+def preview_pages(content: str, digest: str) -> list:
+    """(start, end) offsets of preview pages, cut at line breaks where possible"""
+    def compute():
+        pages = []
+        start = 0
+        while start < len(content):
+            end = min(start + PREVIEW_PAGE_CHARS, len(content))
+            if end < len(content):
+                newline = content.rfind("\n", start, end)
+                if newline > start:
+                    end = newline + 1
+            pages.append((start, end))
+            start = end
+        return pages or [(0, 0)]
+    return stage_cache.get_or_compute("preview", digest, (PREVIEW_PAGE_CHARS,), compute)
+
+
+def show_record_table(table: RecordTable, elapsed_time: float, exports: dict, key: str = "records") -> None:
+    """
+    Render structured extraction results with CSV and Parquet downloads. The files are
+    only built once the user asks for them and are kept in exports, so later reruns
+    neither rebuild them nor send them again until they are wanted.
+    """
+    if not len(table):
+        st.warning("No records were extracted. Try adjusting the fields or the description.")
+        return
+    
+    st.success(f"✅ Extracted {len(table)} records in {elapsed_time:.2f} seconds!")
+    st.subheader("📊 Extracted Records")
+    st.dataframe(table.columns, use_container_width=True)
+    st.caption(f"{table.merged} duplicate records merged, {table.rejected} records did not match the fields")
+    
+    if "csv" not in exports:
+        if not st.button("💾 Prepare Downloads", key=f"{key}_prepare", help="Build CSV and Parquet files of this table"):
+            return
+        exports["csv"] = table.to_csv_bytes()
+        exports["parquet"] = table.to_parquet_bytes()
+    
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    csv_col, parquet_col = st.columns(2)
+    with csv_col:
+        st.download_button(
+            "💾 Download CSV", exports["csv"], file_name=f"extracted_records_{stamp}.csv",
+            mime="text/csv", on_click="ignore", use_container_width=True, key=f"{key}_csv"
+        )
+    with parquet_col:
+        st.download_button(
+            "💾 Download Parquet", exports["parquet"], file_name=f"extracted_records_{stamp}.parquet",
+            mime="application/vnd.apache.parquet", on_click="ignore", use_container_width=True,
+            key=f"{key}_parquet"
+        )
+
+
+def clean_page(scrape_result) -> str:
+    """Cleaned text of a scraped page, reusing the page cache's copy or a memoized one"""
+    cleaned = scrape_result.cleaned
+    if cleaned is None:
+        html_content = scrape_result.html
+        cleaned = stage_cache.get_or_compute(
+            "clean", content_hash(html_content), (), lambda: extract_clean_content(html_content)
+        )
+        cache_cleaned_content(scrape_result.url, cleaned)
+    return cleaned
+
+
+def crawl_content(crawler: Crawler, seed: str, context: JobContext, dedup_level: str, chunk_settings: tuple):
+    """
+    Crawl same-site pages from seed. Each page is cleaned, deduplicated under its own URL
+    (so site boilerplate memory learns from every page) and split into chunks as it
+    arrives. Returns the seed's ScrapeResult, the pages' text joined under a header line
+    per URL, the chunks of all pages in order, the page count and the duplicate chars removed.
+    """
+    seed_result = None
+    sections = []
+    chunks = []
+    saved_chars = 0
+    pages = crawler.crawl([seed])
+    try:
+        for page in pages:
+            seed_result = seed_result or page.result
+            if page.result.ok:
+                page_content, dedup_stats = dedup_content(clean_page(page.result), page.url, dedup_level)
+                saved_chars += dedup_stats.saved_chars
+                section = f"=== {page.url} ===\n{page_content}"
+                sections.append(section)
+                # Chunks never span two pages, as in the batch runner
+                chunks.extend(get_chunks(section, content_hash(section), chunk_settings))
+            context.report(
+                0.1 + 0.7 * len(sections) / crawler.max_pages,
+                f"🕸️ Crawled {len(sections)} of up to {crawler.max_pages} pages: {page.url}"
+            )
+    finally:
+        # Stops queued fetches when the job is cancelled
+        pages.close()
+    return seed_result, "\n\n".join(sections), chunks, len(sections), saved_chars
+
+
+def scrape_job(context: JobContext, website_uri: str, force_refresh: bool, load_profile, crawl_site: bool,
+               crawl_depth: int, crawl_pages: int, dedup_level: str, chunk_settings: tuple) -> dict:
+    """Background job: fetch (or crawl), clean, dedup and chunk a website"""
+    context.report(0.1, "🌐 Connecting to website...")
+    if crawl_site:
+        crawler = Crawler(
+            get_scraper(), max_pages=crawl_pages, max_depth=crawl_depth,
+            force_refresh=force_refresh, load_profile=load_profile
+        )
+        scrape_result, cleaned_content, chunks, crawled_pages, duplicate_chars = crawl_content(
+            crawler, website_uri, context, dedup_level, chunk_settings
+        )
+    else:
+        scrape_result = fetch_page(website_uri, force_refresh=force_refresh, load_profile=load_profile)
+        crawled_pages = 1
+    
+    if scrape_result is None or not scrape_result.ok:
+        raise RuntimeError((scrape_result.error if scrape_result else None) or "Scraping failed")
+    
+    if crawl_site:
+        # Crawled pages were cleaned, deduplicated and split as they arrived; store their
+        # chunks under the joined content so parsing reuses them
+        digest = content_hash(cleaned_content)
+        stage_cache.get_or_compute("split", digest, chunk_settings, lambda: chunks)
+    else:
+        # Extract and clean body in a single pass
+        context.report(0.6, "📄 Extracting and cleaning content...")
+        cleaned_content = clean_page(scrape_result)
+        
+        # Drop repeated blocks and site boilerplate before chunking
+        context.report(0.8, "🧹 Removing duplicate content...")
+        cleaned_content, dedup_stats = dedup_content(cleaned_content, website_uri, dedup_level)
+        duplicate_chars = dedup_stats.saved_chars
+        
+        # Chunk now so the first extraction on this page does not wait for it
+        context.report(0.9, "✂️ Splitting content into chunks...")
+        digest = content_hash(cleaned_content)
+        chunks = get_chunks(cleaned_content, digest, chunk_settings)
+    
+    main_logger.info("Scraping completed successfully for %s", website_uri)
+    return {
+        'url': website_uri,
+        'content': cleaned_content,
+        'digest': digest,
+        'pages': crawled_pages,
+        'crawled': crawl_site,
+        'tier': scrape_result.tier,
+        'phases': scrape_result.phases,
+        'duplicate_chars': duplicate_chars,
+        'chunks': len(chunks),
+    }
+
+
+def parse_job(context: JobContext, content: str, digest: str, chunk_settings: tuple, parse_descriptions: list,
+              extraction_schema, source: str, max_workers: int, use_prefilter: bool, top_k) -> dict:
+    """
+    Background job: run one or more extraction queries over the chunks of content. Text
+    results come back per query; with an extraction schema every query adds its records
+    to one table, merged on the key fields.
+    """
+    main_logger.info("User initiated parsing with %d descriptions", len(parse_descriptions))
+    context.report(0.05, "🔄 Preparing content chunks...")
+    
+    # Chunks and the relevance index are reused across queries for the same page and settings
+    dom_chunks = get_chunks(content, digest, chunk_settings)
+    chunk_index = get_chunk_index(content, digest, chunk_settings) if use_prefilter else None
+    context.report(0.2, f"🤖 Processing {len(dom_chunks)} chunks with AI...")
+    
+    outcome = {'descriptions': parse_descriptions, 'digest': digest, 'table': None, 'results': []}
+    if extraction_schema is not None:
+        table = RecordTable(extraction_schema)
+        for n, description in enumerate(parse_descriptions, 1):
+            context.report(message=f"🤖 Extracting records for query {n}/{len(parse_descriptions)}...")
+            parse_structured(
+                dom_chunks, extraction_schema, description, max_workers=max_workers,
+                relevance_index=chunk_index, top_k=top_k, table=table, source=source
+            )
+            context.report(0.2 + 0.8 * n / len(parse_descriptions))
+        outcome['table'] = table
+    elif len(parse_descriptions) == 1:
+        # Chunk results (and their tokens) are published as the job's preview as they arrive
+        chunk_texts = {}
+        partial_texts = {}
+        completed = 0
+        last_preview = 0.0
+        events = iter_parse_with_gemini(
+            dom_chunks, parse_descriptions[0], max_workers=max_workers,
+            relevance_index=chunk_index, top_k=top_k, stream_tokens=True
+        )
+        try:
+            for event in events:
+                if event.done:
+                    completed += 1
+                    partial_texts.pop(event.index, None)
+                    if event.text:
+                        chunk_texts[event.index] = event.text
+                    context.report(0.2 + 0.8 * completed / event.total, f"🤖 Processed {completed}/{event.total} chunks with AI...")
+                else:
+                    partial_texts[event.index] = partial_texts.get(event.index, "") + event.text
+                
+                # Throttle rebuilding the preview while tokens stream in
+                if event.done or time.time() - last_preview > 0.2:
+                    live_texts = {**partial_texts, **chunk_texts}
+                    context.report(preview="\n\n".join(live_texts[i] for i in sorted(live_texts)))
+                    last_preview = time.time()
+        finally:
+            # Cancels chunks not yet sent when the job is cancelled
+            events.close()
+        outcome['results'] = ["\n\n".join(chunk_texts[i] for i in sorted(chunk_texts))]
+    else:
+        outcome['results'] = parse_many_with_gemini(
+            dom_chunks, parse_descriptions, max_workers=max_workers, relevance_index=chunk_index, top_k=top_k
+        )
+    
+    if outcome['table'] is not None:
+        main_logger.info("Structured parsing completed: %d records", len(outcome['table']))
+    else:
+        main_logger.info(f"Parsing completed successfully. Result lengths: {[len(r) for r in outcome['results']]}")
+    return outcome
+
+
+def submit_job(kind: str, description: str, fn, *args) -> None:
+    """Queue a job for this user, or explain why it cannot start yet"""
+    try:
+        get_job_manager().submit(st.session_state.user_id, kind, description, fn, *args)
+    except JobLimitError as e:
+        st.warning(f"⏳ {str(e)}")
+
+
+def user_jobs(kind: str) -> list:
+    """This user's retained jobs of one kind, newest first"""
+    return [job for job in get_job_manager().jobs_for(st.session_state.user_id) if job.kind == kind]
+
+
+def job_progress_panel(kind: str) -> None:
+    """
+    Progress, partial output and a cancel button for each unfinished job of kind. Runs as a
+    polling fragment while jobs are active and reruns the whole app once one finishes, so
+    the page picks up its result.
+    """
+    for job in user_jobs(kind):
+        if not job.active:
+            if job.id not in st.session_state.handled_jobs:
+                st.rerun()
+            continue
+        status_col, cancel_col = st.columns([5, 1])
+        with status_col:
+            st.progress(job.progress, text=f"{JOB_STATUS_ICONS[job.status]} {job.message or job.description}")
+        with cancel_col:
+            if st.button("✖ Cancel", key=f"cancel_{job.id}", use_container_width=True):
+                get_job_manager().cancel(job.id)
+        if job.preview:
+            st.markdown(job.preview)
+
+
+def show_job_progress(kind: str) -> None:
+    """Render job_progress_panel, polling only while this user has unfinished jobs of kind"""
+    polling = any(job.active for job in user_jobs(kind))
+    st.fragment(job_progress_panel, run_every=JOB_POLL_SECONDS if polling else None)(kind)
+
+
+def handle_finished_jobs() -> None:
+    """Take in results of jobs that finished since the last run: load scraped content, record history"""
+    for job in sorted(get_job_manager().jobs_for(st.session_state.user_id), key=lambda job: job.finished or 0.0):
+        if job.active or job.id in st.session_state.handled_jobs:
+            continue
+        st.session_state.handled_jobs.add(job.id)
+        timestamp = datetime.fromtimestamp(job.finished).strftime('%H:%M:%S')
+        if job.kind == "scrape":
+            st.session_state.last_scrape_job = job.id
+            if job.status == STATUS_DONE:
+                st.session_state.dom_content = job.result['content']
+                st.session_state.dom_hash = job.result['digest']
+                st.session_state.current_url = job.result['url']
+                st.session_state.pop('download_ready', None)
+            if job.status != STATUS_CANCELLED:
+                st.session_state.scrape_history.append({
+                    'url': job.description,
+                    'status': 'success' if job.status == STATUS_DONE else 'failed',
+                    'timestamp': timestamp,
+                    'content_length': len(job.result['content']) if job.status == STATUS_DONE else 0,
+                    'pages': job.result['pages'] if job.status == STATUS_DONE else 0,
+                    'tier': job.result['tier'] if job.status == STATUS_DONE else None,
+                    'error': job.error,
+                })
+        elif job.kind == "parse" and job.status == STATUS_DONE:
+            table = job.result['table']
+            results = job.result['results'] or [""] * len(job.result['descriptions'])
+            for description, parsed_result in zip(job.result['descriptions'], results):
+                st.session_state.parse_history.append({
+                    'description': description,
+                    'timestamp': timestamp,
+                    'result_length': len(table) if table is not None else len(parsed_result)
+                })
+
+
+def show_scrape_outcome(job) -> None:
+    """Success message and metrics of a finished scrape job, or why it did not succeed"""
+    if job.status == STATUS_CANCELLED:
+        st.info(f"🚫 Scraping {job.description} was cancelled.")
+        return
+    if job.status != STATUS_DONE:
+        st.error(f"Failed to scrape the website ({job.error}). Please check the URL and try again.")
+        return
+    
+    result = job.result
+    st.success(
+        f"✅ Website scraped successfully in {job.elapsed:.2f} seconds!"
+        + (f" ({result['pages']} pages crawled)" if result['crawled'] else "")
+    )
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric(
+            "Content Length", f"{len(result['content']):,} chars",
+            delta=f"-{result['duplicate_chars']:,} duplicate" if result['duplicate_chars'] else None,
+            delta_color="off"
+        )
+    with col2:
+        st.metric("Processing Time", f"{job.elapsed:.2f}s")
+    with col3:
+        st.metric("Served By", TIER_LABELS.get(result['tier'], "Browser"))
+    with col4:
+        st.metric("Chunks Created", result['chunks'])
+    
+    if result['phases']:
+        st.caption("⏱️ Fetch phases: " + " · ".join(
+            f"{name.replace('_', ' ')} {format_seconds(seconds)}" for name, seconds in result['phases'].items()
+        ))
+
+
+def show_parse_job(job) -> None:
+    """Results of a finished extraction job, with downloads"""
+    if job.status == STATUS_CANCELLED:
+        st.info("🚫 Extraction was cancelled.")
+        return
+    if job.status != STATUS_DONE:
+        st.error(f"An error occurred during parsing: {job.error}")
+        return
+    
+    descriptions = job.result['descriptions']
+    parsed_results = job.result['results']
+    if job.result['table'] is not None:
+        # Built files live with the job, so they are made once and evicted with its result
+        show_record_table(job.result['table'], job.elapsed, job.result.setdefault('exports', {}), key=f"records_{job.id}")
+    elif any(parsed_result.strip() for parsed_result in parsed_results):
+        st.success(f"✅ Data extracted successfully in {job.elapsed:.2f} seconds!")
+        for n, (description, parsed_result) in enumerate(zip(descriptions, parsed_results), 1):
+            if len(descriptions) > 1:
+                st.markdown("---")
+                st.markdown(f"**Query {n}:** {description}")
+            
+            if not parsed_result.strip():
+                st.warning("No data was extracted for this query.")
+                continue
+            
+            st.markdown(parsed_result)
+            
+            # Download button for results
+            st.download_button(
+                "💾 Download Results",
+                parsed_result,
+                file_name=f"extracted_data_{n}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                mime="text/plain",
+                on_click="ignore",
+                key=f"download_result_{job.id}_{n}"
+            )
+    else:
+        st.warning("No data was extracted. Try refining your description or check if the content contains the requested information.")
+
+handle_finished_jobs()
+
 # Sidebar
 with st.sidebar:
     st.title("📊 Dashboard")
@@ -79,6 +566,8 @@ with st.sidebar:
         with col2:
             st.metric("Success Rate", f"{(successful_scrapes/total_scrapes)*100:.1f}%")
     
+    performance_panel()
+    
     # Scrape History
     if st.session_state.scrape_history:
         st.subheader("Recent Activity")
@@ -89,9 +578,52 @@ with st.sidebar:
     
     # Settings
     st.subheader("⚙️ Settings")
-    chunk_size = st.slider("Chunk Size", 1000, 10000, 6000, 500)
+    chunk_tokens = st.slider(
+        "Chunk Budget (tokens)", 250, 8000, 1500, 250,
+        help="Maximum estimated tokens per chunk sent to Gemini; larger budgets mean fewer API calls"
+    )
+    chunk_overlap = st.slider("Chunk Overlap (tokens)", 0, 500, 0, 50)
+    chunk_strategy = st.selectbox(
+        "Chunking Mode",
+        [CHUNK_STRATEGY_PACKED, CHUNK_STRATEGY_CONTENT],
+        format_func=lambda strategy: CHUNK_STRATEGY_LABELS[strategy],
+        help="Content-defined chunks stay identical across re-scrapes of a slowly changing page, "
+             "so only the changed parts are sent to the AI model again"
+    )
+    dedup_level = st.selectbox(
+        "Duplicate Removal",
+        list(DEDUP_LEVELS),
+        index=list(DEDUP_LEVELS).index(DEDUP_LEVEL) if DEDUP_LEVEL in DEDUP_LEVELS else 1,
+        format_func=lambda level: DEDUP_LEVEL_LABELS[level],
+        help="Drop repeated navigation, footers and duplicate sections before chunking; "
+             "blocks seen on several pages of the same site are remembered and removed on later pages"
+    )
+    load_profile_name = st.selectbox(
+        "Page Load Profile",
+        list(LOAD_PROFILES),
+        index=list(LOAD_PROFILES).index(SCRAPER_LOAD_PROFILE) if SCRAPER_LOAD_PROFILE in LOAD_PROFILES else 0,
+        format_func=lambda name: LOAD_PROFILE_LABELS.get(name, name),
+        help="What the browser loads for pages that need it, and when the page counts as ready"
+    )
+    wait_selector = st.text_input(
+        "Wait for CSS Selector",
+        placeholder="e.g. .product-list",
+        help="Optional: in the browser, also wait until this element appears before reading the page"
+    )
+    max_concurrency = st.slider("Concurrent AI Requests", 1, 16, 4, 1)
+    use_prefilter = st.checkbox(
+        "Relevance Prefilter", False,
+        help="Only send chunks that look relevant to the query to the AI model"
+    )
+    prefilter_top_k = st.slider(
+        "Max Chunks per Query", 0, 50, 0, 1,
+        help="Upper bound on chunks sent per query when the prefilter is on (0 = no limit)",
+        disabled=not use_prefilter
+    )
     show_logs = st.checkbox("Show Detailed Logs", False)
 
+chunk_settings = (chunk_tokens, chunk_overlap, GEMINI_MODEL, chunk_strategy)
+
 # Main content
 col1, col2 = st.columns([2, 1])
 
@@ -123,101 +655,55 @@ with col2:
     
     with col2_2:
         if 'dom_content' in st.session_state:
-            download_content = st.download_button(
-                "💾 Download Content",
-                st.session_state.dom_content,
-                file_name=f"scraped_content_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                mime="text/plain",
-                use_container_width=True
-            )
+            # The file is embedded in the page, so only send it once the user asks for it
+            if st.session_state.get('download_ready') == st.session_state.dom_hash:
+                st.download_button(
+                    "💾 Download Content",
+                    st.session_state.dom_content,
+                    file_name=f"scraped_content_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                    mime="text/plain",
+                    on_click="ignore",
+                    use_container_width=True
+                )
+            elif st.button("💾 Prepare Download", use_container_width=True):
+                st.session_state.download_ready = st.session_state.dom_hash
+                st.rerun()
 
 # Scraping section
 st.subheader("🔍 Step 1: Scrape Website")
 
+force_refresh = st.checkbox(
+    "🔁 Force refresh",
+    False,
+    help="Ignore the page cache and fetch the website again"
+)
+
+crawl_col1, crawl_col2, crawl_col3 = st.columns([2, 1, 1])
+with crawl_col1:
+    crawl_site = st.checkbox(
+        "🕸️ Crawl same-site pages",
+        False,
+        help="Follow links on this site (categories, pagination, item pages) and extract from every page"
+    )
+with crawl_col2:
+    crawl_depth = st.number_input("Link Depth", 1, 5, max(1, min(CRAWL_MAX_DEPTH, 5)), disabled=not crawl_site,
+                                  help="Link hops from the start page; pagination does not count")
+with crawl_col3:
+    crawl_pages = st.number_input("Max Pages", 1, 500, max(1, min(CRAWL_MAX_PAGES, 500)), disabled=not crawl_site)
+
 if st.button("🚀 Start Scraping", disabled=not url_valid, use_container_width=True):
     if website_uri:
-        start_time = time.time()
-        
-        # Progress indicators
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        try:
-            main_logger.info(f"User initiated scraping for: {website_uri}")
-            
-            # Step 1: Scraping
-            status_text.text("🌐 Connecting to website...")
-            progress_bar.progress(25)
-            
-            html_content = scrape_website(website_uri)
-            
-            if not html_content:
-                st.error("Failed to scrape the website. Please check the URL and try again.")
-                st.session_state.scrape_history.append({
-                    'url': website_uri,
-                    'status': 'failed',
-                    'timestamp': datetime.now().strftime('%H:%M:%S'),
-                    'error': 'Scraping failed'
-                })
-                st.stop()
-            
-            # Step 2: Extract body
-            status_text.text("📄 Extracting content...")
-            progress_bar.progress(50)
-            
-            body_content = extract_body_content(html_content)
-            
-            # Step 3: Clean content
-            status_text.text("🧹 Cleaning content...")
-            progress_bar.progress(75)
-            
-            cleaned_content = clean_body_content(body_content)
-            
-            # Step 4: Complete
-            status_text.text("✅ Scraping completed!")
-            progress_bar.progress(100)
-            
-            # Store results
-            st.session_state.dom_content = cleaned_content
-            st.session_state.current_url = website_uri
-            
-            elapsed_time = time.time() - start_time
-            
-            # Add to history
-            st.session_state.scrape_history.append({
-                'url': website_uri,
-                'status': 'success',
-                'timestamp': datetime.now().strftime('%H:%M:%S'),
-                'content_length': len(cleaned_content)
-            })
-            
-            # Success message with metrics
-            st.success(f"✅ Website scraped successfully in {elapsed_time:.2f} seconds!")
-            
-            # Display metrics
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Content Length", f"{len(cleaned_content):,} chars")
-            with col2:
-                st.metric("Processing Time", f"{elapsed_time:.2f}s")
-            with col3:
-                chunks = split_dom_content(cleaned_content, chunk_size)
-                st.metric("Chunks Created", len(chunks))
-            
-            main_logger.info(f"Scraping completed successfully for {website_uri}")
-            
-        except Exception as e:
-            st.error(f"An error occurred: {str(e)}")
-            main_logger.error(f"Scraping failed for {website_uri}: {str(e)}")
-            st.session_state.scrape_history.append({
-                'url': website_uri,
-                'status': 'failed',
-                'timestamp': datetime.now().strftime('%H:%M:%S'),
-                'error': str(e)
-            })
-        finally:
-            progress_bar.empty()
-            status_text.empty()
+        main_logger.info("User initiated scraping for: %s", website_uri)
+        load_profile = get_load_profile(load_profile_name, wait_selector.strip() or None)
+        submit_job(
+            "scrape", website_uri, scrape_job, website_uri, force_refresh, load_profile,
+            crawl_site, int(crawl_depth), int(crawl_pages), dedup_level, chunk_settings
+        )
+
+show_job_progress("scrape")
+last_scrape = get_job_manager().get(st.session_state.get('last_scrape_job', ''))
+if last_scrape is not None:
+    show_scrape_outcome(last_scrape)
 
 # Content preview
 if 'dom_content' in st.session_state:
@@ -233,10 +719,8 @@ if 'dom_content' in st.session_state:
         # Button to scrape a new website
         if st.button("🔄 Scrape New Site", use_container_width=True):
             # Clear current content to allow new scraping
-            if 'dom_content' in st.session_state:
-                del st.session_state.dom_content
-            if 'current_url' in st.session_state:
-                del st.session_state.current_url
+            for key in ('dom_content', 'dom_hash', 'current_url', 'download_ready', 'last_scrape_job'):
+                st.session_state.pop(key, None)
             st.rerun()
     
     with col3:
@@ -244,13 +728,21 @@ if 'dom_content' in st.session_state:
         content_size = len(st.session_state.dom_content)
         st.metric("Content Size", f"{content_size:,} chars")
     
-    with st.expander("🔍 View Full DOM Content", expanded=False):
+    with st.expander("🔍 View DOM Content", expanded=False):
+        pages = preview_pages(st.session_state.dom_content, st.session_state.dom_hash)
+        page = 1
+        if len(pages) > 1:
+            page = st.number_input(f"Page (of {len(pages)})", 1, len(pages), 1, key="preview_page")
+        start, end = pages[page - 1]
         st.text_area(
             "Content", 
-            st.session_state.dom_content, 
+            st.session_state.dom_content[start:end], 
             height=300,
-            help="This is the cleaned content extracted from the website"
+            help="This is the cleaned content extracted from the website, shown a page at a time; "
+                 "use Prepare Download for the full text"
         )
+        if len(pages) > 1:
+            st.caption(f"Characters {start + 1:,}–{end:,} of {content_size:,}")
     
     # Parsing section
     st.subheader("🤖 Step 2: AI-Powered Data Extraction")
@@ -258,6 +750,9 @@ if 'dom_content' in st.session_state:
     # Add a note about multiple queries
     st.markdown("💡 **Tip:** You can ask multiple questions about the same website without re-scraping!")
     
+    if not GEMINI_API_KEY:
+        st.warning("⚠️ GEMINI_API_KEY is not set - scraping works, but data extraction will fail until it is configured.")
+    
     # Parse description input
     parse_description = st.text_area(
         "What would you like to extract?",
@@ -265,16 +760,40 @@ if 'dom_content' in st.session_state:
         help="Describe what specific information you want to extract from the scraped content"
     )
     
-    # Keep track of parsing history for this session
-    if 'parse_history' not in st.session_state:
-        st.session_state.parse_history = []
+    output_format = st.radio("Output Format", ["Text", "Table"], horizontal=True,
+                             help="Table: extract records with fixed fields, merged and deduplicated across chunks")
+    extraction_schema = None
+    if output_format == "Table":
+        schema_spec = st.text_area(
+            "Fields",
+            placeholder="name*: string - Product name\nprice: number\nin_stock: boolean",
+            help="One field per line as name: type (string, number, integer, boolean) - description. "
+                 "Mark key fields with * (records with equal keys are merged) and required fields with !"
+        )
+        if schema_spec.strip():
+            try:
+                extraction_schema = ExtractionSchema.parse(schema_spec)
+            except ValueError as e:
+                st.error(f"Invalid fields: {str(e)}")
+    fields_ready = output_format == "Text" or extraction_schema is not None
     
-    col1, col2 = st.columns([3, 1])
+    # Queries waiting to be run together in one pass over the chunks
+    if 'query_queue' not in st.session_state:
+        st.session_state.query_queue = []
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
     
     with col1:
-        parse_button = st.button("🎯 Extract Data", disabled=not parse_description.strip(), use_container_width=True)
+        parse_button = st.button(
+            "🎯 Extract Data", disabled=not parse_description.strip() or not fields_ready, use_container_width=True
+        )
     
     with col2:
+        if st.button("➕ Add to Queue", disabled=not parse_description.strip(), use_container_width=True):
+            if parse_description.strip() not in st.session_state.query_queue:
+                st.session_state.query_queue.append(parse_description.strip())
+    
+    with col3:
         if st.button("💡 Examples", use_container_width=True):
             st.info("""
             **Example queries:**
@@ -285,6 +804,24 @@ if 'dom_content' in st.session_state:
             - Extract article titles and summaries
             """)
     
+    # Queued queries are sent together so each chunk is only processed once
+    run_queue = False
+    if st.session_state.query_queue:
+        with st.expander(f"📋 Query Queue ({len(st.session_state.query_queue)})", expanded=True):
+            for i, query in enumerate(st.session_state.query_queue, 1):
+                st.write(f"**{i}.** {query}")
+            
+            queue_col1, queue_col2 = st.columns([3, 1])
+            with queue_col1:
+                run_queue = st.button(
+                    f"🚀 Run {len(st.session_state.query_queue)} Queued Queries Together",
+                    use_container_width=True
+                )
+            with queue_col2:
+                if st.button("🗑️ Clear Queue", use_container_width=True):
+                    st.session_state.query_queue = []
+                    st.rerun()
+    
     # Show previous queries for this website
     if st.session_state.parse_history:
         with st.expander("📝 Previous Queries for This Website", expanded=False):
@@ -302,67 +839,35 @@ if 'dom_content' in st.session_state:
         parse_button = True
         del st.session_state.temp_parse_description
     
-    if parse_button and parse_description:
-        start_time = time.time()
-        
-        # Progress indicators
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        try:
-            main_logger.info(f"User initiated parsing with description: {parse_description}")
-            
-            status_text.text("🔄 Preparing content chunks...")
-            progress_bar.progress(20)
-            
-            # Split content into chunks
-            dom_chunks = split_dom_content(st.session_state.dom_content, chunk_size)
-            
-            status_text.text(f"🤖 Processing {len(dom_chunks)} chunks with AI...")
-            progress_bar.progress(40)
-            
-            # Parse with Gemini
-            parsed_result = parse_with_gemini(dom_chunks, parse_description)
-            
-            status_text.text("✅ Extraction completed!")
-            progress_bar.progress(100)
-            
-            elapsed_time = time.time() - start_time
-            
-            # Add to parse history
-            st.session_state.parse_history.append({
-                'description': parse_description,
-                'timestamp': datetime.now().strftime('%H:%M:%S'),
-                'result_length': len(parsed_result) if parsed_result else 0
-            })
-            
-            if parsed_result.strip():
-                st.success(f"✅ Data extracted successfully in {elapsed_time:.2f} seconds!")
-                
-                # Display results
-                st.subheader("📊 Extracted Data")
-                st.markdown("---")
-                st.markdown(parsed_result)
-                
-                # Download button for results
-                st.download_button(
-                    "💾 Download Results",
-                    parsed_result,
-                    file_name=f"extracted_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                    mime="text/plain"
-                )
-                
-                main_logger.info(f"Parsing completed successfully. Result length: {len(parsed_result)}")
-            else:
-                st.warning("No data was extracted. Try refining your description or check if the content contains the requested information.")
-                main_logger.warning("Parsing completed but no results were extracted")
-                
-        except Exception as e:
-            st.error(f"An error occurred during parsing: {str(e)}")
-            main_logger.error(f"Parsing failed: {str(e)}")
-        finally:
-            progress_bar.empty()
-            status_text.empty()
+    parse_descriptions = []
+    if run_queue:
+        parse_descriptions = list(st.session_state.query_queue)
+        st.session_state.query_queue = []
+    elif parse_button and parse_description:
+        parse_descriptions = [parse_description]
+    
+    if parse_descriptions:
+        submit_job(
+            "parse", "; ".join(parse_descriptions), parse_job, st.session_state.dom_content,
+            st.session_state.dom_hash, chunk_settings, parse_descriptions, extraction_schema,
+            st.session_state.current_url, max_concurrency, use_prefilter, prefilter_top_k or None
+        )
+    
+    show_job_progress("parse")
+    
+    # Results of extractions on the loaded content, newest first
+    finished_parses = [
+        job for job in user_jobs("parse")
+        if not job.active and (job.result is None or job.result['digest'] == st.session_state.dom_hash)
+    ]
+    if finished_parses:
+        st.subheader("📊 Extracted Data")
+    for n, job in enumerate(finished_parses):
+        with st.expander(f"{JOB_STATUS_ICONS[job.status]} {job.description}", expanded=n == 0):
+            show_parse_job(job)
+            if st.button("🗑️ Dismiss", key=f"dismiss_{job.id}"):
+                get_job_manager().remove(job.id)
+                st.rerun()
 
 else:
     st.info("👆 Please scrape a website first to enable data extraction functionality")
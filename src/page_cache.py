@@ -0,0 +1,273 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+from dotenv import load_dotenv
+load_dotenv("../.env")
+
+from logging_config import cache_logger
+from http_fetch import normalize_url
+
+try:
+    import zstandard
+    CODEC = "zstd"
+except ImportError:
+    zstandard = None
+    CODEC = "zlib"
+
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", "../cache/pages.sqlite3")
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", "3600"))
+PAGE_CACHE_MAX_MB = int(os.getenv("PAGE_CACHE_MAX_MB", "500"))
+
+
+def compress(text: str, codec: str = CODEC) -> bytes:
+    data = text.encode("utf-8")
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress(blob: bytes, codec: str) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstandard is required to read this cache entry")
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    return zlib.decompress(blob).decode("utf-8")
+
+
+@dataclass
+class CachedPage:
+    """A page stored in the PageCache"""
+    url: str
+    html: str
+    cleaned: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    tier: Optional[str] = None
+    # Where the page was served from after redirects
+    final_url: Optional[str] = None
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    @property
+    def revalidatable(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+class PageCache:
+    """
+    SQLite store of scraped pages keyed by normalized URL. Raw HTML and cleaned text are
+    kept compressed (zstd when available, zlib otherwise) with the response validators
+    and fetch time. The store is trimmed to max_bytes, least recently used first; its size
+    is tracked as a running total so writes under the limit never scan the table.
+    """
+
+    def __init__(self, path: str = PAGE_CACHE_PATH, ttl_seconds: int = PAGE_CACHE_TTL, max_bytes: int = PAGE_CACHE_MAX_MB * 1024 * 1024):
+        self.logger = cache_logger
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+        self._initialize_disk()
+
+    def _initialize_disk(self) -> None:
+        """Open the SQLite file; the cache is disabled if this fails"""
+        try:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    html BLOB NOT NULL,
+                    cleaned BLOB,
+                    etag TEXT,
+                    last_modified TEXT,
+                    tier TEXT,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    final_url TEXT
+                )
+                """
+            )
+            # Stores created before final_url was tracked gain the column in place
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pages)")}
+            if "final_url" not in columns:
+                self._conn.execute("ALTER TABLE pages ADD COLUMN final_url TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages (accessed_at)")
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            self.logger.info(f"Page cache opened at {self.path} ({CODEC})")
+        except Exception as e:
+            self.logger.warning(f"Page cache unavailable: {str(e)}")
+            self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return page.age() <= self.ttl_seconds
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Return the stored page regardless of age, or None"""
+        if self._conn is None:
+            return None
+
+        key = normalize_url(url)
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT codec, html, cleaned, etag, last_modified, fetched_at, tier, final_url FROM pages WHERE url = ?",
+                    (key,),
+                ).fetchone()
+                if row is None:
+                    return None
+                self._conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), key))
+                self._conn.commit()
+
+            codec, html, cleaned, etag, last_modified, fetched_at, tier, final_url = row
+            return CachedPage(
+                url=key,
+                html=decompress(html, codec),
+                cleaned=decompress(cleaned, codec) if cleaned is not None else None,
+                etag=etag,
+                last_modified=last_modified,
+                fetched_at=fetched_at,
+                tier=tier,
+                final_url=final_url,
+            )
+        except Exception as e:
+            self.logger.warning(f"Page cache read failed for {url}: {str(e)}")
+            return None
+
+    def put(
+        self,
+        url: str,
+        html: str,
+        tier: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        cleaned: Optional[str] = None,
+        final_url: Optional[str] = None,
+    ) -> None:
+        """Store a freshly fetched page, replacing any previous entry"""
+        if self._conn is None:
+            return
+
+        now = time.time()
+        html_blob = compress(html)
+        cleaned_blob = compress(cleaned) if cleaned is not None else None
+        size = len(html_blob) + len(cleaned_blob or b"")
+        try:
+            with self._lock:
+                previous = self._conn.execute("SELECT size FROM pages WHERE url = ?", (normalize_url(url),)).fetchone()
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO pages
+                        (url, codec, html, cleaned, etag, last_modified, tier, size, fetched_at, accessed_at, final_url)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (normalize_url(url), CODEC, html_blob, cleaned_blob, etag, last_modified, tier, size, now, now, final_url),
+                )
+                self._total_bytes += size - (previous[0] if previous else 0)
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+                self._conn.commit()
+            self.logger.info("Cached page %s (%d chars -> %d bytes)", url, len(html), size)
+        except Exception as e:
+            self.logger.warning(f"Page cache write failed for {url}: {str(e)}")
+
+    def set_cleaned(self, url: str, cleaned: str) -> None:
+        """Attach cleaned text to an existing entry"""
+        if self._conn is None:
+            return
+
+        blob = compress(cleaned)
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT codec, size, length(html) FROM pages WHERE url = ?", (normalize_url(url),)
+                ).fetchone()
+                if row is None:
+                    return
+                codec, old_size, html_size = row
+                if codec != CODEC:
+                    blob = compress(cleaned, codec)
+                self._conn.execute(
+                    "UPDATE pages SET cleaned = ?, size = ? WHERE url = ?",
+                    (blob, html_size + len(blob), normalize_url(url)),
+                )
+                self._total_bytes += html_size + len(blob) - old_size
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+                self._conn.commit()
+        except Exception as e:
+            self.logger.warning(f"Page cache update failed for {url}: {str(e)}")
+
+    def touch(self, url: str) -> None:
+        """Mark an entry as freshly validated (e.g. after a 304 Not Modified)"""
+        if self._conn is None:
+            return
+
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, normalize_url(url))
+                )
+                self._conn.commit()
+        except Exception as e:
+            self.logger.warning(f"Page cache update failed for {url}: {str(e)}")
+
+    def delete(self, url: str) -> None:
+        if self._conn is None:
+            return
+
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT size FROM pages WHERE url = ?", (normalize_url(url),)).fetchone()
+                if row is None:
+                    return
+                self._conn.execute("DELETE FROM pages WHERE url = ?", (normalize_url(url),))
+                self._conn.commit()
+                self._total_bytes -= row[0]
+        except Exception as e:
+            self.logger.warning(f"Page cache delete failed for {url}: {str(e)}")
+
+    def _evict(self) -> None:
+        """Drop least recently used pages until the store is under max_bytes (lock held)"""
+        evicted = 0
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute("SELECT url, size FROM pages ORDER BY accessed_at LIMIT 64").fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            for url, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self._total_bytes -= size
+                evicted += 1
+        self.logger.info("Evicted %d cached pages to stay under %d bytes", evicted, self.max_bytes)
+
+    def clear(self) -> None:
+        if self._conn is None:
+            return
+
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.commit()
+            self._total_bytes = 0
@@ -1,7 +1,20 @@
-from google import genai
+import functools
+import threading
 from logging_config import parser_logger
+from response_cache import ResponseCache, RESPONSE_CACHE_ENABLED
+from relevance import ChunkIndex
+from rate_limit import RateLimiter, get_rate_limiter
+from chunking import estimate_tokens
+from structured import (
+    STRUCTURED_JSON_MODE, STRUCTURED_TEMPLATE_VERSION, ExtractionSchema, RecordTable, StructuredOutputError, parse_records
+)
+from telemetry import telemetry
+import queue
+import re
 import time
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 import os
 from dotenv import load_dotenv
 load_dotenv("../.env")
@@ -9,6 +22,10 @@ load_dotenv("../.env")
 # global configurations
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL")
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+
+# Bump whenever TEMPLATE changes so cached responses from the old prompt are not reused
+TEMPLATE_VERSION = "1"
 
 TEMPLATE = """
 You are an expert data extraction assistant. Your task is to extract specific information from the provided web content with precision and accuracy.
@@ -31,13 +48,86 @@ You are an expert data extraction assistant. Your task is to extract specific in
 **Output the extracted data below:**
 """
 
-client = genai.Client(api_key=GEMINI_API_KEY)
+# Combined prompt used to answer several requirements about one chunk in a single call;
+# its version is kept distinct from TEMPLATE_VERSION because both key the response cache
+MULTI_TEMPLATE_VERSION = "multi-1"
+
+MULTI_TEMPLATE = """
+You are an expert data extraction assistant. Your task is to extract specific information from the provided web content with precision and accuracy.
+
+**Content to analyze:**
+{dom_content}
+
+**Extraction requirements (answer each one separately):**
+{parse_descriptions}
+
+**Instructions:**
+1. Answer every requirement in order, starting each answer on a new line with its marker exactly as given (e.g. [Q1])
+2. Under each marker, extract ONLY the information that directly matches that requirement
+3. Return the data in a clean, structured format (JSON, list, or plain text as appropriate)
+4. If multiple items match, present them in an organized manner
+5. If no relevant information is found for a requirement, output its marker with nothing after it
+6. Do not include explanations, comments, or additional text
+7. Ensure extracted data is accurate and complete
+8. Maintain the original formatting/structure when relevant
+
+**Output the extracted data below:**
+"""
+
+QUERY_MARKER_PATTERN = re.compile(r"^[ \t*#]*\[Q(\d+)\][ \t*:]*", re.MULTILINE)
+
+
+def split_keyed_response(text: str) -> Dict[int, str]:
+    """Split a MULTI_TEMPLATE response into {query number: answer}; unmarked text is ignored"""
+    matches = list(QUERY_MARKER_PATTERN.finditer(text or ""))
+    answers = {}
+    for n, match in enumerate(matches):
+        end = matches[n + 1].start() if n + 1 < len(matches) else len(text)
+        answers[int(match.group(1))] = text[match.end():end].strip()
+    return answers
+
+
+@dataclass
+class ChunkResult:
+    """
+    Progress event from iter_parse_with_gemini. Finished chunks have done=True and the
+    full answer (or error); with token streaming, done=False events carry a text delta.
+    """
+    index: int
+    total: int
+    text: Optional[str]
+    done: bool = True
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    cached: bool = False
+
 
 class GeminiParser:
-    def __init__(self):
+    def __init__(
+        self,
+        max_workers: int = GEMINI_MAX_CONCURRENCY,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
         self.logger = parser_logger
-        self.client = None
-        self._initialize_client()
+        self.max_workers = max(1, max_workers)
+        self.cache = cache if cache is not None else (ResponseCache() if RESPONSE_CACHE_ENABLED else None)
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Gemini client, created on first use so a missing API key only fails the calls that need it"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._initialize_client()
+        return self._client
+
+    @client.setter
+    def client(self, client) -> None:
+        self._client = client
 
     def _initialize_client(self) -> None:
         """Initialize Gemini client with error handling"""
@@ -45,72 +135,522 @@ class GeminiParser:
             if not GEMINI_API_KEY:
                 raise ValueError("GEMINI_API_KEY not found in environment variables")
             
-            self.client = genai.Client(api_key=GEMINI_API_KEY)
+            # google.genai takes about a second to import, so it is only loaded when a call is made
+            from google import genai
+            self._client = genai.Client(api_key=GEMINI_API_KEY)
             self.logger.info("Gemini client initialized successfully")
             
         except Exception as e:
-            self.logger.error(f"Failed to initialize Gemini client: {str(e)}")
+            self.logger.error("Failed to initialize Gemini client: %s", e)
             raise
 
-    def parse_with_gemini(self, dom_chunks: List[str], parse_description: str) -> str:
+    def parse_with_gemini(
+        self,
+        dom_chunks: List[str],
+        parse_description: str,
+        max_workers: Optional[int] = None,
+        relevance_index: Optional[ChunkIndex] = None,
+        top_k: Optional[int] = None,
+        min_score: float = 0.0,
+    ) -> str:
+        """
+        Parse content chunks using the Gemini API with enhanced logging and error handling.
+        Chunks are sent concurrently through a bounded thread pool; results keep chunk order.
+        When a relevance_index built over dom_chunks is given, only the chunks it ranks as
+        relevant to the description (top_k / above min_score) are sent.
+        """
+        parsed_results = {}
+        for event in self.iter_parse_with_gemini(
+            dom_chunks, parse_description, max_workers, relevance_index, top_k, min_score
+        ):
+            if event.done and event.text:
+                parsed_results[event.index] = event.text
+        
+        final_result = "\n\n".join(parsed_results[i] for i in sorted(parsed_results))
+        self.logger.info("Final result length: %d characters", len(final_result))
+        
+        return final_result
+
+    def iter_parse_with_gemini(
+        self,
+        dom_chunks: List[str],
+        parse_description: str,
+        max_workers: Optional[int] = None,
+        relevance_index: Optional[ChunkIndex] = None,
+        top_k: Optional[int] = None,
+        min_score: float = 0.0,
+        stream_tokens: bool = False,
+    ) -> Iterator[ChunkResult]:
         """
-        Parse content chunks using the Gemini API with enhanced logging and error handling
+        Streaming variant of parse_with_gemini: yields a ChunkResult as soon as each chunk
+        finishes (in completion order). With stream_tokens=True, partial ChunkResults
+        (done=False) carrying text deltas from the streaming API are yielded as they arrive.
         """
         if not dom_chunks:
             self.logger.warning("No DOM chunks provided for parsing")
-            return ""
+            return
         
         if not parse_description.strip():
             self.logger.warning("No parse description provided")
-            return ""
+            return
+        
+        if relevance_index is not None:
+            dom_chunks = self._select_relevant(dom_chunks, parse_description, relevance_index, top_k, min_score)
+        
+        total = len(dom_chunks)
+        max_workers = max(1, min(max_workers or self.max_workers, total))
         
         start_time = time.time()
-        self.logger.info(f"Starting parsing process for {len(dom_chunks)} chunks")
-        self.logger.info(f"Parse description: {parse_description}")
+        self.logger.info("Starting parsing process for %d chunks (%d in flight)", total, max_workers)
+        self.logger.info("Parse description (%d chars): %.200s", len(parse_description), parse_description)
+        # Opened without becoming current: a generator must not leave it set in the caller's context
+        parse_span = telemetry.start_span("parse", chunks=total, queries=1, workers=max_workers)
         
-        parsed_results = []
-        successful_parses = 0
-        failed_parses = 0
+        # Workers report token deltas and finished chunks through one queue, so results
+        # are yielded on the caller's thread
+        events: "queue.Queue[ChunkResult]" = queue.Queue()
         
-        for i, chunk in enumerate(dom_chunks, start=1):
+        def work(index: int, chunk: str) -> None:
             chunk_start_time = time.time()
-            self.logger.info(f"Processing chunk {i}/{len(dom_chunks)} (size: {len(chunk)} chars)")
-            
+            on_token = (lambda delta: events.put(ChunkResult(index, total, delta, done=False))) if stream_tokens else None
             try:
-                prompt = TEMPLATE.format(dom_content=chunk, parse_description=parse_description)
-                
-                response = self.client.models.generate_content(
-                    model=GEMINI_MODEL,
-                    contents=prompt
-                )
-                
-                if response and hasattr(response, 'text') and response.text.strip():
-                    parsed_results.append(response.text.strip())
-                    successful_parses += 1
-                    chunk_time = time.time() - chunk_start_time
-                    self.logger.info(f"Chunk {i} parsed successfully in {chunk_time:.2f}s")
-                else:
-                    self.logger.warning(f"Empty or invalid response for chunk {i}")
-                    
+                result, cached = self._parse_chunk(index, total, chunk, parse_description, on_token)
+                events.put(ChunkResult(index, total, result, elapsed=time.time() - chunk_start_time, cached=cached))
             except Exception as e:
-                failed_parses += 1
-                self.logger.error(f"Error parsing chunk {i}: {str(e)}")
-                # Continue processing other chunks
-                continue
+                events.put(ChunkResult(index, total, None, error=str(e), elapsed=time.time() - chunk_start_time))
+        
+        successful_parses = 0
+        failed_parses = 0
+        cache_hits = 0
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini")
+        try:
+            for i, chunk in enumerate(dom_chunks, start=1):
+                executor.submit(telemetry.bind(work, parse_span), i, chunk)
+            
+            remaining = total
+            while remaining:
+                event = events.get()
+                if event.done:
+                    remaining -= 1
+                    cache_hits += event.cached
+                    if event.error:
+                        failed_parses += 1
+                        self.logger.error("Error parsing chunk %d: %s", event.index, event.error)
+                    elif event.text:
+                        successful_parses += 1
+                yield event
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            parse_span.set(succeeded=successful_parses, failed=failed_parses, cache_hits=cache_hits)
+            telemetry.end_span(parse_span)
+            
+            # Log summary
+            total_time = time.time() - start_time
+            self.logger.info("Parsing completed in %.2fs", total_time)
+            self.logger.info("Success rate: %d/%d chunks", successful_parses, total)
+            self.logger.info("Cache hits: %d/%d chunks (reused stored results, %d sent to the LLM)", cache_hits, total, total - cache_hits)
+            
+            if failed_parses > 0:
+                self.logger.warning("Failed to parse %d chunks", failed_parses)
+
+    def parse_many_with_gemini(
+        self,
+        dom_chunks: List[str],
+        parse_descriptions: List[str],
+        max_workers: Optional[int] = None,
+        relevance_index: Optional[ChunkIndex] = None,
+        top_k: Optional[int] = None,
+        min_score: float = 0.0,
+    ) -> List[str]:
+        """
+        Answer several parse descriptions in one pass over the chunks. Each chunk is sent
+        once with a combined prompt asking for keyed answers, which are split back into
+        per-query results. Returns one result string per description, in the same order.
+        """
+        descriptions = [description for description in parse_descriptions if description.strip()]
+        if not dom_chunks or not descriptions:
+            self.logger.warning("No DOM chunks or parse descriptions provided for batch parsing")
+            return ["" for _ in parse_descriptions]
+        
+        # Work out which queries need each chunk (all of them unless the relevance filter says otherwise)
+        wanted = [list(range(len(descriptions))) for _ in dom_chunks]
+        if relevance_index is not None and len(relevance_index) != len(dom_chunks):
+            self.logger.warning("Relevance index does not match the provided chunks, sending all chunks")
+        elif relevance_index is not None:
+            wanted = [[] for _ in dom_chunks]
+            for q, description in enumerate(descriptions):
+                for i in relevance_index.select(description, top_k=top_k, min_score=min_score):
+                    wanted[i].append(q)
+            needed = sum(1 for queries in wanted if queries)
+            self.logger.info("Relevance filter kept %d/%d chunks (%d API calls skipped)", needed, len(dom_chunks), len(dom_chunks) - needed)
+        
+        jobs = [(i, queries) for i, queries in enumerate(wanted, start=1) if queries]
+        max_workers = max(1, min(max_workers or self.max_workers, len(jobs) or 1))
+        
+        start_time = time.time()
+        self.logger.info("Starting batch parsing of %d queries over %d chunks (%d in flight)", len(descriptions), len(jobs), max_workers)
+        
+        answers: List[List[Optional[str]]] = [[None] * len(dom_chunks) for _ in descriptions]
+        successful_parses = 0
+        empty_parses = 0
+        failed_parses = 0
+        cache_hits = 0
+        
+        with telemetry.span("parse", chunks=len(jobs), queries=len(descriptions), workers=max_workers) as span, \
+                ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini") as executor:
+            futures = {
+                executor.submit(
+                    telemetry.bind(self._parse_chunk_multi), i, len(dom_chunks), dom_chunks[i - 1],
+                    [(q, descriptions[q]) for q in queries]
+                ): i
+                for i, queries in jobs
+            }
+            
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    chunk_answers, hits = future.result()
+                    cache_hits += hits
+                    if any(chunk_answers.values()):
+                        successful_parses += 1
+                    else:
+                        empty_parses += 1
+                    for q, answer in chunk_answers.items():
+                        answers[q][i - 1] = answer
+                        
+                except Exception as e:
+                    failed_parses += 1
+                    self.logger.error("Error parsing chunk %d: %s", i, e)
+                    continue
+            
+            span.set(succeeded=successful_parses, empty=empty_parses, failed=failed_parses, cache_hits=cache_hits)
         
-        # Log summary
         total_time = time.time() - start_time
-        self.logger.info(f"Parsing completed in {total_time:.2f}s")
-        self.logger.info(f"Success rate: {successful_parses}/{len(dom_chunks)} chunks")
+        self.logger.info("Batch parsing completed in %.2fs", total_time)
+        self.logger.info(
+            "Success rate: %d/%d chunks (%d with no answers), cache hits: %d answers",
+            successful_parses, len(jobs), empty_parses, cache_hits
+        )
         
         if failed_parses > 0:
-            self.logger.warning(f"Failed to parse {failed_parses} chunks")
+            self.logger.warning("Failed to parse %d chunks", failed_parses)
         
-        final_result = "\n\n".join(parsed_results) if parsed_results else ""
-        self.logger.info(f"Final result length: {len(final_result)} characters")
+        results = iter("\n\n".join(answer for answer in chunk_answers if answer) for chunk_answers in answers)
+        return [next(results) if description.strip() else "" for description in parse_descriptions]
+
+    def parse_structured(
+        self,
+        dom_chunks: List[str],
+        schema: ExtractionSchema,
+        parse_description: str = "",
+        max_workers: Optional[int] = None,
+        relevance_index: Optional[ChunkIndex] = None,
+        top_k: Optional[int] = None,
+        min_score: float = 0.0,
+        table: Optional[RecordTable] = None,
+        source: Optional[str] = None,
+    ) -> RecordTable:
+        """
+        Extract records matching schema from every chunk. Each chunk's response is requested
+        as JSON (through the API's response schema when STRUCTURED_JSON_MODE is on), validated
+        and coerced to the field types, and merged in chunk order into table (a new one by
+        default), where records with the same key fields are deduplicated across chunks and
+        pages. source is stored with each new row. Returns the table.
+        """
+        table = table if table is not None else RecordTable(schema)
+        if not dom_chunks:
+            self.logger.warning("No DOM chunks provided for structured parsing")
+            return table
         
-        return final_result
+        if relevance_index is not None:
+            query = parse_description.strip() or " ".join(schema.names)
+            dom_chunks = self._select_relevant(dom_chunks, query, relevance_index, top_k, min_score)
+        
+        total = len(dom_chunks)
+        max_workers = max(1, min(max_workers or self.max_workers, total))
+        start_time = time.time()
+        self.logger.info("Starting structured parsing of %d chunks into %d fields (%d in flight)", total, len(schema.fields), max_workers)
+        
+        chunk_records: Dict[int, List[Dict[str, Any]]] = {}
+        failed_parses = 0
+        cache_hits = 0
+        rejected = 0
+        
+        with telemetry.span("parse", chunks=total, queries=1, workers=max_workers, structured=True) as span, \
+                ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini") as executor:
+            futures = {
+                executor.submit(
+                    telemetry.bind(self._parse_chunk_structured), i, total, chunk, schema, parse_description
+                ): i
+                for i, chunk in enumerate(dom_chunks, start=1)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    records, chunk_rejected, cached = future.result()
+                except Exception as e:
+                    failed_parses += 1
+                    self.logger.error("Error parsing chunk %d: %s", i, e)
+                    continue
+                chunk_records[i] = records
+                rejected += chunk_rejected
+                cache_hits += cached
+            
+            # Merging in chunk order keeps row order and first-seen values deterministic
+            before = len(table)
+            for i in sorted(chunk_records):
+                table.add(chunk_records.pop(i), source)
+            table.rejected += rejected
+            span.set(succeeded=total - failed_parses, failed=failed_parses, cache_hits=cache_hits,
+                     records=len(table) - before, rejected=rejected)
+        
+        self.logger.info(
+            "Structured parsing completed in %.2fs: %d new records (%d in table, %d merged, %d rejected), "
+            "%d/%d chunks from cache", time.time() - start_time, len(table) - before, len(table),
+            table.merged, rejected, cache_hits, total
+        )
+        if failed_parses > 0:
+            self.logger.warning("Failed to parse %d chunks", failed_parses)
+        return table
+
+    def _select_relevant(
+        self,
+        dom_chunks: List[str],
+        parse_description: str,
+        relevance_index: ChunkIndex,
+        top_k: Optional[int],
+        min_score: float,
+    ) -> List[str]:
+        """Keep only the chunks the relevance index scores as matching the description"""
+        if len(relevance_index) != len(dom_chunks):
+            self.logger.warning("Relevance index does not match the provided chunks, sending all chunks")
+            return dom_chunks
+        
+        selected = relevance_index.select(parse_description, top_k=top_k, min_score=min_score)
+        skipped = len(dom_chunks) - len(selected)
+        self.logger.info("Relevance filter kept %d/%d chunks (%d API calls skipped)", len(selected), len(dom_chunks), skipped)
+        return [dom_chunks[i] for i in selected]
+
+    def _parse_chunk(
+        self,
+        index: int,
+        total: int,
+        chunk: str,
+        parse_description: str,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[Optional[str], bool]:
+        """
+        Send a single chunk to Gemini, serving repeated requests from the response cache.
+        Returns (result, served_from_cache); result is None for empty responses. Raises on API errors.
+        """
+        chunk_start_time = time.time()
+        self.logger.debug("Processing chunk %d/%d (size: %d chars)", index, total, len(chunk))
+        
+        cached = self._cached_response(chunk, parse_description)
+        if cached is not None:
+            self.logger.debug("Chunk %d served from cache", index)
+            return cached or None, True
+        
+        result = self._generate(TEMPLATE.format(dom_content=chunk, parse_description=parse_description), on_token)
+        
+        if result:
+            chunk_time = time.time() - chunk_start_time
+            self.logger.debug("Chunk %d parsed successfully in %.2fs", index, chunk_time)
+        else:
+            self.logger.warning("Empty or invalid response for chunk %d", index)
+        
+        self._store_response(chunk, parse_description, TEMPLATE_VERSION, result)
+        return result, False
+
+    def _parse_chunk_multi(
+        self, index: int, total: int, chunk: str, queries: List[Tuple[int, str]]
+    ) -> Tuple[Dict[int, Optional[str]], int]:
+        """
+        Answer several queries about one chunk with a single MULTI_TEMPLATE call.
+        Cached answers are reused and only the remaining queries are sent.
+        Returns ({query position: answer}, cache hit count). Raises on API errors.
+        """
+        answers: Dict[int, Optional[str]] = {}
+        pending = []
+        for q, description in queries:
+            cached = self._cached_response(chunk, description)
+            if cached is not None:
+                answers[q] = cached or None
+            else:
+                pending.append((q, description))
+        cache_hits = len(answers)
+        
+        if len(pending) == 1:
+            q, description = pending[0]
+            answers[q], _ = self._parse_chunk(index, total, chunk, description)
+            return answers, cache_hits
+        
+        if not pending:
+            self.logger.debug("Chunk %d served from cache", index)
+            return answers, cache_hits
+        
+        chunk_start_time = time.time()
+        self.logger.debug("Processing chunk %d/%d for %d queries (size: %d chars)", index, total, len(pending), len(chunk))
+        
+        numbered = "\n".join(f"[Q{n}] {description}" for n, (_, description) in enumerate(pending, start=1))
+        keyed = split_keyed_response(self._generate(
+            MULTI_TEMPLATE.format(dom_content=chunk, parse_descriptions=numbered)
+        ) or "")
+        
+        for n, (q, description) in enumerate(pending, start=1):
+            answers[q] = keyed.get(n) or None
+            # Only cache answers the model explicitly keyed, so a malformed reply is retried next time
+            if n in keyed:
+                self._store_response(chunk, description, MULTI_TEMPLATE_VERSION, answers[q])
+        
+        chunk_time = time.time() - chunk_start_time
+        self.logger.debug("Chunk %d parsed in %.2fs (%d/%d keyed answers)", index, chunk_time, len(keyed), len(pending))
+        return answers, cache_hits
+
+    def _parse_chunk_structured(
+        self, index: int, total: int, chunk: str, schema: ExtractionSchema, parse_description: str
+    ) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """
+        Extract one chunk's records as validated JSON. A reply that is not JSON is asked for
+        once more before the chunk fails; only valid replies are cached.
+        Returns (records, rejected record count, served_from_cache). Raises on API errors.
+        """
+        cache_description = f"{parse_description}\n{schema.fingerprint()}"
+        cached = self._cached_response(chunk, cache_description, (STRUCTURED_TEMPLATE_VERSION,))
+        if cached is not None:
+            try:
+                records, rejected = parse_records(cached, schema)
+                self.logger.debug("Chunk %d served from cache", index)
+                return records, rejected, True
+            except StructuredOutputError:
+                pass
+        
+        self.logger.debug("Processing chunk %d/%d for structured records (size: %d chars)", index, total, len(chunk))
+        prompt = schema.prompt(chunk, parse_description)
+        config = {"response_mime_type": "application/json", "response_schema": schema.response_schema()} if STRUCTURED_JSON_MODE else None
+        for attempt in range(2):
+            result = self._generate(prompt, config=config)
+            try:
+                records, rejected = parse_records(result, schema)
+            except StructuredOutputError as e:
+                self.logger.warning("Chunk %d reply is not valid JSON (attempt %d): %s", index, attempt + 1, e)
+                continue
+            self._store_response(chunk, cache_description, STRUCTURED_TEMPLATE_VERSION, result)
+            if rejected:
+                self.logger.debug("Chunk %d: %d records did not match the schema", index, rejected)
+            return records, rejected, False
+        raise StructuredOutputError(f"Chunk {index} did not return JSON records")
+
+    def _generate(
+        self,
+        prompt: str,
+        on_token: Optional[Callable[[str], None]] = None,
+        config: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """
+        Call Gemini through the shared rate limiter and return the stripped response text,
+        or None if it is empty. Throttling and transient errors are retried with backoff.
+        With on_token, the streaming API is used and each text delta is passed to it; a
+        stream that fails after emitting text is not retried, so deltas are never repeated.
+        config (e.g. a JSON response schema) is passed through to the API.
+        """
+        options = {"config": config} if config else {}
+        tokens = estimate_tokens(prompt)
+        
+        with telemetry.span("llm_call", model=GEMINI_MODEL, prompt_chars=len(prompt), stream=on_token is not None) as span:
+            try:
+                if on_token is not None:
+                    parts = []
+                    usage = []
+                    
+                    def stream() -> Optional[str]:
+                        for piece in self.client.models.generate_content_stream(model=GEMINI_MODEL, contents=prompt, **options):
+                            if getattr(piece, 'usage_metadata', None) is not None:
+                                usage.append(piece.usage_metadata)
+                            text = getattr(piece, 'text', None)
+                            if text:
+                                parts.append(text)
+                                on_token(text)
+                        return "".join(parts).strip() or None
+                    
+                    result = self.rate_limiter.call(stream, tokens=tokens, can_retry=lambda: not parts)
+                    self._record_usage(span, usage[-1] if usage else None, tokens, result)
+                    return result
+                
+                response = self.rate_limiter.call(
+                    lambda: self.client.models.generate_content(model=GEMINI_MODEL, contents=prompt, **options),
+                    tokens=tokens,
+                )
+            except Exception:
+                telemetry.llm_calls.inc(status="error")
+                raise
+            
+            result = None
+            if response and hasattr(response, 'text') and response.text and response.text.strip():
+                result = response.text.strip()
+            self._record_usage(span, getattr(response, 'usage_metadata', None), tokens, result)
+            return result
+    
+    @staticmethod
+    def _record_usage(span, usage_metadata, estimated_prompt_tokens: int, result: Optional[str]) -> None:
+        """Attach token usage to the call's span, preferring the API's counts over local estimates"""
+        prompt_tokens = getattr(usage_metadata, 'prompt_token_count', None) or estimated_prompt_tokens
+        output_tokens = getattr(usage_metadata, 'candidates_token_count', None)
+        if output_tokens is None:
+            output_tokens = estimate_tokens(result or "")
+        span.set(prompt_tokens=prompt_tokens, output_tokens=output_tokens, estimated=usage_metadata is None)
+        telemetry.llm_tokens.observe(prompt_tokens, direction="input")
+        telemetry.llm_tokens.observe(output_tokens, direction="output")
+        telemetry.llm_calls.inc(status="ok")
+
+    def _cached_response(
+        self, chunk: str, parse_description: str, versions: Tuple[str, ...] = (TEMPLATE_VERSION, MULTI_TEMPLATE_VERSION)
+    ) -> Optional[str]:
+        """Look up an answer from any of the prompt versions (by default the single-query or the combined prompt)"""
+        if self.cache is None:
+            return None
+        for version in versions:
+            cached = self.cache.get(ResponseCache.make_key(chunk, parse_description, GEMINI_MODEL, version))
+            if cached is not None:
+                return cached
+        return None
+
+    def _store_response(self, chunk: str, parse_description: str, version: str, result: Optional[str]) -> None:
+        if self.cache is None:
+            return
+        self.cache.set(ResponseCache.make_key(chunk, parse_description, GEMINI_MODEL, version), result or "")
+
+_parser: Optional[GeminiParser] = None
+_parser_lock = threading.Lock()
+
+
+def get_parser() -> GeminiParser:
+    """The process-wide GeminiParser, created on first use"""
+    global _parser
+    if _parser is None:
+        with _parser_lock:
+            if _parser is None:
+                _parser = GeminiParser()
+    return _parser
+
+
+def __getattr__(name: str) -> Any:
+    # `parse.parser` still works, but only builds the parser when it is first accessed
+    if name == "parser":
+        return get_parser()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _delegate(name: str) -> Callable[..., Any]:
+    @functools.wraps(getattr(GeminiParser, name))
+    def call(*args: Any, **kwargs: Any) -> Any:
+        return getattr(get_parser(), name)(*args, **kwargs)
+    return call
+
 
-# Create instance for backward compatibility
-parser = GeminiParser()
-parse_with_gemini = parser.parse_with_gemini
\ No newline at end of file
+# Module-level functions for backward compatibility
+parse_with_gemini = _delegate("parse_with_gemini")
+parse_many_with_gemini = _delegate("parse_many_with_gemini")
+iter_parse_with_gemini = _delegate("iter_parse_with_gemini")
+parse_structured = _delegate("parse_structured")
\ No newline at end of file
@@ -0,0 +1,242 @@
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import httpx
+from logging_config import parser_logger
+from telemetry import telemetry
+
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "60"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "1"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "60"))
+# Calls in flight across the whole process, shared by every user; the AIMD limit moves below this
+GEMINI_MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "8"))
+
+# Status codes that mean "slow down" and shrink the concurrency limit
+THROTTLE_STATUS_CODES = {429, 503}
+# Status codes worth retrying at all
+RETRYABLE_STATUS_CODES = THROTTLE_STATUS_CODES | {500, 502, 504}
+
+RETRY_DELAY_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)s\s*$")
+
+T = TypeVar("T")
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status of an API error (google.genai errors carry it as .code), if any"""
+    for attribute in ("code", "status_code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Server-requested wait in seconds, from a Retry-After header or a
+    google.rpc.RetryInfo retryDelay in the error details
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers:
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                pass
+
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", []) or []:
+            delay = isinstance(detail, dict) and detail.get("retryDelay")
+            match = delay and RETRY_DELAY_PATTERN.match(str(delay))
+            if match:
+                return float(match.group(1))
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    return error_status(error) in RETRYABLE_STATUS_CODES
+
+
+class TokenBucket:
+    """Blocking token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take amount tokens (going into debt if needed) and return how long to wait before using them"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on calls in flight: grows by one after a full window of successes and
+    halves on throttling. Rejections of calls that started before the last decrease are
+    part of the same congestion event and do not shrink the limit again.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._epoch = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Hold one in-flight slot; yields the epoch to pass to on_throttle"""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            epoch = self._epoch
+        try:
+            yield epoch
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self) -> None:
+        with self._condition:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self, epoch: int) -> None:
+        with self._condition:
+            if epoch == self._epoch:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self._epoch += 1
+
+
+class RateLimiter:
+    """
+    Client-side scheduler for model calls: requests-per-minute and tokens-per-minute
+    buckets, AIMD concurrency, and retries with full-jitter exponential backoff that
+    honours the server's retry-after. One instance is shared by the whole process.
+    """
+
+    def __init__(
+        self,
+        rpm: int = GEMINI_RPM,
+        tpm: int = GEMINI_TPM,
+        max_concurrency: int = GEMINI_MAX_IN_FLIGHT,
+        max_retries: int = GEMINI_MAX_RETRIES,
+        base_delay: float = GEMINI_BACKOFF_BASE,
+        max_delay: float = GEMINI_BACKOFF_MAX,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.logger = parser_logger
+        self.requests = TokenBucket(rpm, clock=clock)
+        self.tokens = TokenBucket(tpm, clock=clock)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self._stats_lock = threading.Lock()
+
+    def call(self, fn: Callable[[], T], tokens: int = 0, can_retry: Callable[[], bool] = lambda: True) -> T:
+        """
+        Run fn under the limits, retrying transient failures. can_retry is checked before
+        each retry so callers that already emitted partial output can opt out.
+        """
+        attempt = 0
+        while True:
+            wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+            if wait > 0:
+                self.logger.debug("Rate limit reached, waiting %.2fs", wait)
+                self.sleep(wait)
+
+            with self.concurrency.slot() as epoch:
+                try:
+                    result = fn()
+                except Exception as e:
+                    error = e
+                else:
+                    self.concurrency.on_success()
+                    with self._stats_lock:
+                        self.calls += 1
+                    return result
+
+            status = error_status(error)
+            if status in THROTTLE_STATUS_CODES:
+                self.concurrency.on_throttle(epoch)
+                with self._stats_lock:
+                    self.throttled += 1
+            if attempt >= self.max_retries or not is_retryable(error) or not can_retry():
+                raise error
+
+            delay = self._backoff(attempt, retry_after(error))
+            attempt += 1
+            with self._stats_lock:
+                self.retries += 1
+            telemetry.llm_calls.inc(status="retry", code=status)
+            span = telemetry.current_span()
+            if span is not None:
+                span.set(retries=attempt)
+            self.logger.warning(
+                "Model call failed (%s), retry %d/%d in %.2fs (concurrency limit %d)",
+                status or type(error).__name__, attempt, self.max_retries, delay, int(self.concurrency.limit)
+            )
+            self.sleep(delay)
+
+    def _backoff(self, attempt: int, server_delay: Optional[float]) -> float:
+        """Full-jitter exponential backoff, never shorter than what the server asked for"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if server_delay is not None:
+            delay = max(delay, min(server_delay, self.max_delay))
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "concurrency_limit": int(self.concurrency.limit),
+            "in_flight": self.concurrency.in_flight,
+        }
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """The process-wide limiter shared by every parser and Streamlit session"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
@@ -0,0 +1,130 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+from logging_config import parser_logger
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Query words that describe the extraction itself rather than the content to find
+STOPWORDS = {
+    "a", "about", "all", "an", "and", "any", "are", "as", "at", "be", "by", "each", "every",
+    "extract", "find", "for", "from", "get", "give", "in", "information", "is", "it", "list",
+    "me", "of", "on", "or", "page", "please", "show", "that", "the", "their", "them", "this",
+    "to", "website", "what", "which", "with",
+}
+
+# Query keywords mapped to patterns that mark chunks likely to contain that kind of data
+INTENT_PATTERNS = {
+    "email": (
+        {"email", "mail", "contact"},
+        re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"),
+    ),
+    "phone": (
+        {"phone", "telephone", "mobile", "tel", "contact", "number"},
+        re.compile(r"\+?\d[\d\s().-]{7,}\d"),
+    ),
+    "price": (
+        {"price", "cost", "amount", "fee", "salary", "rate"},
+        re.compile(r"[$€£¥₹]\s?\d|\d(?:[\d.,]*)\s?(?:usd|eur|gbp|inr)\b", re.IGNORECASE),
+    ),
+    "link": (
+        {"link", "url", "href"},
+        re.compile(r"https?://|www\.", re.IGNORECASE),
+    ),
+    "date": (
+        {"date", "time", "when", "schedule", "deadline", "posted"},
+        re.compile(
+            r"\b\d{1,4}[/-]\d{1,2}[/-]\d{1,4}\b|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2}",
+            re.IGNORECASE,
+        ),
+    ),
+}
+INTENT_BOOST = 2.0
+
+
+def _stem(token: str) -> str:
+    """Plural folding (Porter step 1a) so 'products' matches 'product' and 'categories' matches 'category'"""
+    if token.endswith("sses"):
+        token = token[:-2]
+    elif token.endswith("ies"):
+        token = token[:-3] + "y"
+    elif token.endswith("s") and not token.endswith("ss") and len(token) > 3:
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(token) for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+class ChunkIndex:
+    """
+    BM25 index over the chunks of one scraped page, with regex boosts for common
+    extraction intents (emails, phones, prices, links, dates). Build it once per
+    page and reuse it for every query against those chunks.
+    """
+
+    def __init__(self, chunks: List[str], k1: float = 1.5, b: float = 0.75):
+        self.logger = parser_logger
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self._term_freqs: List[Counter] = [Counter(tokenize(chunk)) for chunk in chunks]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if chunks else 0.0
+
+        document_freqs = Counter()
+        for tf in self._term_freqs:
+            document_freqs.update(tf.keys())
+        n = len(chunks)
+        self._idf: Dict[str, float] = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_freqs.items()
+        }
+        self._intent_hits: Dict[str, List[bool]] = {}
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def score(self, query: str) -> List[float]:
+        """Relevance score of every chunk for the query"""
+        terms = [term for term in tokenize(query) if term not in STOPWORDS]
+        scores = []
+        for tf, length in zip(self._term_freqs, self._lengths):
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if not freq:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * length / (self._avg_length or 1))
+                score += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            scores.append(score)
+
+        query_terms = set(terms)
+        for intent, (keywords, _) in INTENT_PATTERNS.items():
+            if query_terms & keywords:
+                for i, hit in enumerate(self._intent_matches(intent)):
+                    if hit:
+                        scores[i] += INTENT_BOOST
+        return scores
+
+    def select(self, query: str, top_k: Optional[int] = None, min_score: float = 0.0) -> List[int]:
+        """
+        Indices (in original chunk order) of chunks scoring above min_score, limited to
+        the top_k best. If nothing scores, every chunk is kept rather than dropping data.
+        """
+        scores = self.score(query)
+        ranked = sorted((i for i, score in enumerate(scores) if score > min_score), key=lambda i: -scores[i])
+        if not ranked:
+            self.logger.info("No chunk matched the query terms; relevance filter disabled for this query")
+            return list(range(len(self.chunks)))
+        if top_k:
+            ranked = ranked[:top_k]
+        return sorted(ranked)
+
+    def _intent_matches(self, intent: str) -> List[bool]:
+        """Per-chunk regex matches for an intent, computed on first use"""
+        if intent not in self._intent_hits:
+            pattern = INTENT_PATTERNS[intent][1]
+            self._intent_hits[intent] = [bool(pattern.search(chunk)) for chunk in self.chunks]
+        return self._intent_hits[intent]
@@ -0,0 +1,265 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from dotenv import load_dotenv
+load_dotenv("../.env")
+
+from logging_config import cache_logger
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "../cache/responses.sqlite3")
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+RESPONSE_CACHE_MAX_MB = int(os.getenv("RESPONSE_CACHE_MAX_MB", "100"))
+RESPONSE_CACHE_MEMORY_ENTRIES = int(os.getenv("RESPONSE_CACHE_MEMORY_ENTRIES", "512"))
+
+# Access times of cache hits are written to disk in batches, not one commit per hit
+TOUCH_BATCH_SIZE = 64
+TOUCH_FLUSH_SECONDS = 30.0
+# Eviction trims the disk tier to this fraction of max_bytes so the next writes do not trim again
+EVICT_TARGET_RATIO = 0.9
+EVICT_BATCH_SIZE = 256
+
+
+class LRUCache:
+    """Small thread-safe in-memory LRU mapping"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max(1, max_entries)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + SQLite) cache for Gemini extraction responses.
+    Entries expire after ttl_seconds and the disk tier is trimmed to max_bytes,
+    evicting the least recently used responses first. The stored size is tracked as a
+    running total so writes under the limit never scan the table, and hits in either
+    tier refresh the disk access time in batches.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = RESPONSE_CACHE_PATH,
+        memory_entries: int = RESPONSE_CACHE_MEMORY_ENTRIES,
+        max_bytes: int = RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+        ttl_seconds: int = RESPONSE_CACHE_TTL,
+    ):
+        self.logger = cache_logger
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(memory_entries)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+        self._touched: Dict[str, float] = {}
+        self._touch_lock = threading.Lock()
+        self._last_flush = time.time()
+        self.hits = 0
+        self.misses = 0
+
+        if path:
+            self._initialize_disk()
+        if self._conn is not None:
+            # Access times still pending at exit would otherwise be lost
+            atexit.register(self.flush)
+
+    def _initialize_disk(self) -> None:
+        """Open the SQLite tier; the cache degrades to memory-only on failure"""
+        try:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self.logger.info(f"Response cache opened at {self.path}")
+        except Exception as e:
+            self.logger.warning(f"Disk cache unavailable, using memory only: {str(e)}")
+            self._conn = None
+
+    @staticmethod
+    def make_key(chunk: str, parse_description: str, model: Optional[str], template_version: str) -> str:
+        """Content-addressed key for a (chunk, description, model, template) combination"""
+        digest = hashlib.sha256()
+        for part in (template_version, model or "", parse_description.strip(), chunk):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response (possibly an empty string) or None on a miss"""
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is not None:
+            value, created_at = entry
+            if now - created_at <= self.ttl_seconds:
+                self.hits += 1
+                self._touch(key, now)
+                return value
+            self.memory.pop(key)
+
+        if self._conn is not None:
+            try:
+                with self._lock:
+                    row = self._conn.execute(
+                        "SELECT value, created_at, size FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and now - row[1] > self.ttl_seconds:
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self._conn.commit()
+                        self._total_bytes -= row[2]
+                        row = None
+                if row:
+                    self.memory.set(key, (row[0], row[1]))
+                    self.hits += 1
+                    self._touch(key, now)
+                    return row[0]
+            except Exception as e:
+                self.logger.warning(f"Disk cache read failed: {str(e)}")
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response in both tiers"""
+        now = time.time()
+        self.memory.set(key, (value, now))
+
+        if self._conn is None:
+            return
+
+        size = len(value.encode("utf-8"))
+        try:
+            with self._lock:
+                previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, now, now),
+                )
+                self._total_bytes += size - (previous[0] if previous else 0)
+                if self._total_bytes > self.max_bytes:
+                    # Eviction goes by access time, so pending hits must be on disk first
+                    self._write_touches()
+                    self._evict()
+                self._conn.commit()
+        except Exception as e:
+            self.logger.warning(f"Disk cache write failed: {str(e)}")
+        if self._flush_due():
+            self.flush()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones until under EVICT_TARGET_RATIO of max_bytes (lock held)"""
+        cutoff = time.time() - self.ttl_seconds
+        expired = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses WHERE created_at < ?", (cutoff,)).fetchone()[0]
+        if expired:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+            self._total_bytes -= expired
+
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        evicted = 0
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT ?", (EVICT_BATCH_SIZE,)
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            for key, size in rows:
+                if self._total_bytes <= target:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.memory.pop(key)
+                self._total_bytes -= size
+                evicted += 1
+        if evicted:
+            self.logger.info("Evicted %d cached responses to stay under %d bytes", evicted, self.max_bytes)
+
+    def _touch(self, key: str, now: float) -> None:
+        """Remember a hit's access time for the next batched write"""
+        if self._conn is None:
+            return
+        with self._touch_lock:
+            self._touched[key] = now
+        if self._flush_due():
+            self.flush()
+
+    def _flush_due(self) -> bool:
+        return bool(self._touched) and (
+            len(self._touched) >= TOUCH_BATCH_SIZE or time.time() - self._last_flush >= TOUCH_FLUSH_SECONDS
+        )
+
+    def _write_touches(self) -> None:
+        """Write pending access times (lock held; the caller commits)"""
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+            self._last_flush = time.time()
+        if touched:
+            self._conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", [(at, key) for key, at in touched.items()]
+            )
+
+    def flush(self) -> None:
+        """Write pending access times of cache hits to disk in one transaction"""
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._write_touches()
+                self._conn.commit()
+        except Exception as e:
+            self.logger.warning(f"Disk cache access-time update failed: {str(e)}")
+
+    def clear(self) -> None:
+        """Remove every cached response"""
+        self.memory.clear()
+        with self._touch_lock:
+            self._touched.clear()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+                self._total_bytes = 0
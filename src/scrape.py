@@ -2,77 +2,462 @@ import os
 from dotenv import load_dotenv
 load_dotenv('../.env')
 
-from selenium.webdriver import Remote, ChromeOptions  
-from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection  
 from bs4 import BeautifulSoup
 from logging_config import scraper_logger
 from selenium.common.exceptions import TimeoutException, WebDriverException
-from selenium.webdriver.support.ui import WebDriverWait
 import time
-from typing import Optional, List
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
+import atexit
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, Optional, List, Tuple, Union
+from session_pool import DriverPool
+from http_fetch import MISSING_STATUS_CODES, FetchResponse, HttpFetcher, PageNotFound, conditional_headers, needs_browser
+from page_cache import CachedPage, PageCache, PAGE_CACHE_ENABLED
+from chunking import CHUNK_STRATEGY_PACKED, DEFAULT_CHUNK_TOKENS, estimate_tokens, iter_chunks, model_token_budget, split_text
+from stream_clean import iter_clean_lines, strip_head
+from dedup import ContentDeduplicator, DedupStats, SiteBoilerplateMemory
+from telemetry import telemetry
+from load_profile import CAPTCHA_ALWAYS, CAPTCHA_AUTO, LoadProfile, get_load_profile, wait_until_ready
+from contextlib import ExitStack, contextmanager
+
+# selenium.webdriver costs ~200 ms to import and is only needed once a page goes to the browser
+if TYPE_CHECKING:
+    from selenium.webdriver import ChromeOptions, Remote
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
 
 SBR_WEBDRIVER = os.getenv("SBR_WEBDRIVER")
+SCRAPER_POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "2"))
+SCRAPER_SESSION_MAX_USES = int(os.getenv("SCRAPER_SESSION_MAX_USES", "20"))
+SCRAPER_SESSION_IDLE_TIMEOUT = float(os.getenv("SCRAPER_SESSION_IDLE_TIMEOUT", "300"))
+MAX_BROWSER_SESSIONS = int(os.getenv("MAX_BROWSER_SESSIONS", "4"))
+SCRAPER_HTTP_FIRST = os.getenv("SCRAPER_HTTP_FIRST", "true").lower() in ("1", "true", "yes")
+# Clean pages with the incremental lxml parser instead of building a BeautifulSoup tree;
+# same output as the lxml tree cleaner, a fraction of the time and memory
+SCRAPER_STREAMING_CLEAN = os.getenv("SCRAPER_STREAMING_CLEAN", "true").lower() in ("1", "true", "yes")
+
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+TIER_CACHE = "cache"
+TIER_REVALIDATED = "revalidated"
+
+# Shared by every WebScraper in the process so the browser-session quota is never exceeded
+BROWSER_SESSION_SLOTS = threading.BoundedSemaphore(MAX_BROWSER_SESSIONS)
+
+
+@dataclass
+class ScrapeResult:
+    """Outcome of scraping one URL; tier records whether plain HTTP or the browser served it"""
+    url: str
+    html: Optional[str] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    tier: Optional[str] = None
+    cleaned: Optional[str] = None
+    # Seconds spent in each fetch phase (connect, navigate, render_wait, ...)
+    phases: Dict[str, float] = field(default_factory=dict)
+    # Where the page was served from after redirects, when known
+    final_url: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.html is not None
+
+    @property
+    def base_url(self) -> str:
+        """URL that relative links on the page resolve against"""
+        return self.final_url or self.url
+
 
 class WebScraper:
-    def __init__(self):
+    def __init__(
+        self,
+        pool_size: int = SCRAPER_POOL_SIZE,
+        max_session_uses: int = SCRAPER_SESSION_MAX_USES,
+        session_idle_timeout: float = SCRAPER_SESSION_IDLE_TIMEOUT,
+        driver_factory: Optional[Callable[[], Any]] = None,
+        http_first: bool = SCRAPER_HTTP_FIRST,
+        http_fetcher: Optional[HttpFetcher] = None,
+        page_cache: Optional[PageCache] = None,
+        deduplicator: Optional[ContentDeduplicator] = None,
+        load_profile: Optional[LoadProfile] = None,
+    ):
         self.logger = scraper_logger
+        self.load_profile = load_profile or get_load_profile()
+        self.http_first = http_first
+        self.http = http_fetcher or HttpFetcher()
+        self.page_cache = page_cache if page_cache is not None else (PageCache() if PAGE_CACHE_ENABLED else None)
+        self.deduplicator = deduplicator or ContentDeduplicator(memory=SiteBoilerplateMemory())
+        self.tier_counts = Counter()
+        self._stats_lock = threading.Lock()
+        self.pool = DriverPool(
+            driver_factory or self._create_driver,
+            size=pool_size,
+            max_uses=max_session_uses,
+            idle_timeout=session_idle_timeout,
+        )
+        
+    def _create_driver(self) -> "Remote":
+        """Open a new remote browser session on the Browser API"""
+        from selenium.webdriver import Remote
+        from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
         
-    def scrape_website(self, website_uri: str, timeout: int = 30) -> Optional[str]:
+        self.logger.info("Connecting to Browser API...")
+        sbr_connection = ChromiumRemoteConnection(SBR_WEBDRIVER, 'goog', 'chrome')
+        return Remote(sbr_connection, options=self._get_chrome_options())
+    
+    def close(self) -> None:
+        """Close all pooled browser sessions and the HTTP client, and persist site boilerplate memory"""
+        self.pool.close()
+        self.http.close()
+        if self.deduplicator.memory is not None:
+            self.deduplicator.memory.save()
+        
+    def scrape_website(
+        self, website_uri: str, timeout: int = 30, force_refresh: bool = False, load_profile: Optional[LoadProfile] = None
+    ) -> Optional[str]:
         """
         Scrape a website with enhanced error handling and logging
         """
-        start_time = time.time()
-        self.logger.info(f"Starting scrape for: {website_uri}")
+        return self.fetch_page(website_uri, timeout, force_refresh, load_profile).html
+    
+    def fetch_page(
+        self, website_uri: str, timeout: int = 30, force_refresh: bool = False, load_profile: Optional[LoadProfile] = None
+    ) -> ScrapeResult:
+        """
+        Scrape one URL, capturing errors and the serving tier in a ScrapeResult instead of raising.
+        Fresh page-cache entries are served directly and stale ones are revalidated first,
+        unless force_refresh is set. load_profile overrides the scraper's default browser
+        load profile (resource blocking, readiness condition, captcha handling) for this page.
+        """
+        with telemetry.span("scrape", url=website_uri) as span:
+            result = self._fetch_page(website_uri, timeout, force_refresh, load_profile or self.load_profile)
+            span.set(tier=result.tier, html_bytes=len(result.html) if result.html else None)
+            span.error = result.error
         
+        telemetry.scrapes.inc(tier=result.tier or "none", status="ok" if result.ok else "error")
+        if result.ok:
+            telemetry.page_bytes.observe(len(result.html), kind="html")
+        return result
+    
+    def _fetch_page(self, website_uri: str, timeout: int, force_refresh: bool, load_profile: LoadProfile) -> ScrapeResult:
+        start_time = time.time()
+        phases: Dict[str, float] = {}
         try:
-            self.logger.info("Connecting to Browser API...")
-            sbr_connection = ChromiumRemoteConnection(SBR_WEBDRIVER, 'goog', 'chrome')
-            
-            with Remote(sbr_connection, options=self._get_chrome_options()) as driver:
-                self.logger.info("Connected successfully! Navigating to website...")
-                
-                # Set timeouts
-                driver.set_page_load_timeout(timeout)
-                driver.implicitly_wait(10)
-                
-                # Navigate to website
-                driver.get(website_uri)
-                
-                # Handle captcha
-                self._handle_captcha(driver)
-                
-                # Wait for page to load completely
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
+            cached = None if force_refresh else self._cached_page(website_uri, timeout)
+            if cached is not None:
+                self._record_tier(cached.tier)
+                return ScrapeResult(
+                    website_uri, html=cached.html, cleaned=cached.cleaned,
+                    elapsed=time.time() - start_time, tier=cached.tier, final_url=cached.final_url
                 )
+            
+            html_content, tier, final_url = self._scrape(website_uri, timeout, load_profile, phases)
+            return ScrapeResult(
+                website_uri, html=html_content, elapsed=time.time() - start_time, tier=tier,
+                phases=phases, final_url=final_url
+            )
                 
-                self.logger.info("Page loaded successfully! Extracting content...")
-                html_content = driver.page_source
-                
-                elapsed_time = time.time() - start_time
-                self.logger.info(f"Scraping completed in {elapsed_time:.2f} seconds")
-                self.logger.info(f"HTML content size: {len(html_content)} characters")
-                
-                return html_content
-                
+        except PageNotFound as e:
+            self.logger.warning("Page not found: %s (%s)", website_uri, e)
+            error = f"Page not found: {str(e)}"
         except TimeoutException:
             self.logger.error(f"Timeout occurred while scraping {website_uri}")
-            return None
+            error = "Timeout"
         except WebDriverException as e:
             self.logger.error(f"WebDriver error: {str(e)}")
-            return None
+            error = f"WebDriver error: {str(e)}"
         except Exception as e:
             self.logger.error(f"Unexpected error during scraping: {str(e)}")
+            error = f"{type(e).__name__}: {str(e)}"
+        
+        return ScrapeResult(website_uri, error=error, elapsed=time.time() - start_time, phases=phases)
+    
+    def cache_cleaned_content(self, website_uri: str, cleaned_content: str) -> None:
+        """Store cleaned text next to the cached HTML so cache hits can skip cleaning"""
+        if self.page_cache is not None:
+            self.page_cache.set_cleaned(website_uri, cleaned_content)
+    
+    def scrape_many(
+        self,
+        urls: Iterable[str],
+        concurrency: Optional[int] = None,
+        timeout: int = 30,
+        force_refresh: bool = False,
+        load_profile: Optional[LoadProfile] = None,
+    ) -> Iterator[ScrapeResult]:
+        """
+        Scrape several URLs in parallel, yielding a ScrapeResult as each page finishes.
+        Failures are reported per URL and never abort the batch. Pages that need the browser
+        are capped by the session pool size and by the process-wide MAX_BROWSER_SESSIONS quota.
+        """
+        urls = list(urls)
+        if not urls:
+            self.logger.warning("No URLs provided for batch scraping")
+            return
+        
+        workers = max(1, min(concurrency or self.pool.size, len(urls)))
+        if not self.http_first:
+            # Every page needs a browser session, so extra workers would only queue on the pool
+            workers = min(workers, self.pool.size)
+        start_time = time.time()
+        self.logger.info("Starting batch scrape of %d URLs with %d workers", len(urls), workers)
+        
+        succeeded = 0
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scraper")
+        try:
+            futures = {
+                executor.submit(telemetry.bind(self.fetch_page), url, timeout, force_refresh, load_profile): url
+                for url in urls
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                succeeded += result.ok
+                yield result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            total_time = time.time() - start_time
+            self.logger.info("Batch scrape finished in %.2fs: %d/%d succeeded", total_time, succeeded, len(urls))
+    
+    def _cached_page(self, website_uri: str, timeout: int) -> Optional[CachedPage]:
+        """
+        Serve a page from the page cache: fresh entries directly, stale ones after a
+        conditional GET confirms they are unchanged (or replaces them with the new body).
+        Returns None when the page has to be fetched again.
+        """
+        if self.page_cache is None:
+            return None
+        
+        cached = self.page_cache.get(website_uri)
+        if cached is None:
+            return None
+        
+        if self.page_cache.is_fresh(cached):
+            self.logger.info("Page cache hit (%.0fs old): %s", cached.age(), website_uri)
+            cached.tier = TIER_CACHE
+            return cached
+        
+        if not cached.revalidatable:
+            self.logger.info("Page cache entry is stale and has no validators: %s", website_uri)
+            return None
+        
+        try:
+            response = self.http.fetch(
+                website_uri,
+                headers=conditional_headers(cached.etag, cached.last_modified),
+                timeout=timeout
+            )
+        except Exception as e:
+            self.logger.info("Revalidation failed for %s: %s", website_uri, e)
+            return None
+        
+        if response.status_code == 304:
+            self.logger.info("Page unchanged since last fetch (304): %s", website_uri)
+            self.page_cache.touch(website_uri)
+            cached.tier = TIER_REVALIDATED
+            return cached
+        
+        if response.status_code in MISSING_STATUS_CODES:
+            # The page is gone; drop the stale copy and let the fetch report the failure
+            self.page_cache.delete(website_uri)
             return None
         
-    def _get_chrome_options(self) -> ChromeOptions:
+        if needs_browser(response) is None:
+            self.logger.info("Page changed, refreshed over HTTP: %s", website_uri)
+            self._store_page(website_uri, response.text, TIER_HTTP, response.headers, response.url)
+            return CachedPage(
+                url=website_uri, html=response.text, cleaned=None,
+                etag=response.headers.get("etag"), last_modified=response.headers.get("last-modified"),
+                fetched_at=time.time(), tier=TIER_HTTP, final_url=response.url
+            )
+        
+        return None
+    
+    def _scrape(
+        self, website_uri: str, timeout: int, load_profile: Optional[LoadProfile] = None, phases: Optional[Dict[str, float]] = None
+    ) -> Tuple[str, str, str]:
+        """
+        Fetch a page's HTML through the cheapest tier that works: a plain HTTP GET first,
+        escalating to the remote browser when the response looks blocked or JS-rendered.
+        Returns (html, tier, final URL after redirects) and records per-phase seconds in
+        phases; raises on failure.
+        """
+        self.logger.info("Starting scrape for: %s", website_uri)
+        phases = phases if phases is not None else {}
+        
+        response = self._fetch_http(website_uri, timeout, phases) if self.http_first else None
+        if response is not None:
+            html_content, tier, headers, final_url = response.text, TIER_HTTP, response.headers, response.url
+        else:
+            html_content, final_url = self._scrape_browser(website_uri, timeout, load_profile or self.load_profile, phases)
+            tier = TIER_BROWSER
+            headers = self._browser_validators(website_uri, timeout) if self.page_cache is not None else {}
+        
+        self._record_tier(tier)
+        self._store_page(website_uri, html_content, tier, headers, final_url)
+        self.logger.info("Page served by %s tier: %s", tier, website_uri)
+        return html_content, tier, final_url
+    
+    def _record_tier(self, tier: str) -> None:
+        with self._stats_lock:
+            self.tier_counts[tier] += 1
+    
+    def _store_page(
+        self, website_uri: str, html_content: str, tier: str, headers: Dict[str, str], final_url: Optional[str] = None
+    ) -> None:
+        if self.page_cache is not None:
+            self.page_cache.put(
+                website_uri, html_content, tier,
+                etag=headers.get("etag"), last_modified=headers.get("last-modified"), final_url=final_url
+            )
+    
+    def _browser_validators(self, website_uri: str, timeout: int) -> Dict[str, str]:
+        """Best-effort HEAD request so browser-rendered pages can be revalidated later"""
+        try:
+            return self.http.head(website_uri, timeout=min(timeout, 5)).headers
+        except Exception:
+            return {}
+    
+    def _fetch_http(self, website_uri: str, timeout: int, phases: Optional[Dict[str, float]] = None) -> Optional[FetchResponse]:
+        """
+        Try the plain HTTP tier; returns None when the page should go to the browser and
+        raises PageNotFound on 404 and 410
+        """
+        start_time = time.time()
+        with self._phase("http_fetch", website_uri, phases if phases is not None else {}) as span:
+            try:
+                response = self.http.fetch(website_uri, timeout=timeout)
+            except Exception as e:
+                span.error = f"{type(e).__name__}: {str(e)}"
+                self.logger.info("HTTP fetch failed, escalating to browser: %s", e)
+                return None
+            
+            span.set(status_code=response.status_code, http_version=response.http_version, html_bytes=len(response.text))
+            if response.status_code in MISSING_STATUS_CODES:
+                raise PageNotFound(f"HTTP {response.status_code} from {response.url}")
+            reason = needs_browser(response)
+            span.set(escalation=reason)
+        
+        elapsed_time = time.time() - start_time
+        if reason:
+            self.logger.info("Escalating to browser after %.2fs: %s", elapsed_time, reason)
+            return None
+        
+        self.logger.info("HTTP fetch completed in %.2f seconds (%s)", elapsed_time, response.http_version)
+        self.logger.info("HTML content size: %d characters", len(response.text))
+        return response
+    
+    @contextmanager
+    def _phase(self, name: str, website_uri: str, phases: Dict[str, float]) -> Iterator[Any]:
+        """A telemetry span whose duration is also recorded in phases"""
+        with telemetry.span(name, url=website_uri) as span:
+            try:
+                yield span
+            finally:
+                phases[name] = phases.get(name, 0.0) + (time.time_ns() - span.start_ns) / 1e9
+    
+    def _scrape_browser(
+        self, website_uri: str, timeout: int, load_profile: Optional[LoadProfile] = None, phases: Optional[Dict[str, float]] = None
+    ) -> Tuple[str, str]:
+        """
+        Render the page in a pooled remote browser session and return (html, the URL the
+        browser ended up on); raises on failure. The load profile decides which requests
+        are blocked, when the page counts as ready, and whether the captcha solver runs.
+        """
+        start_time = time.time()
+        profile = load_profile or self.load_profile
+        phases = phases if phases is not None else {}
+        
+        with ExitStack() as stack:
+            with self._phase("connect", website_uri, phases):
+                stack.enter_context(BROWSER_SESSION_SLOTS)
+                driver = stack.enter_context(self.pool.session())
+            self.logger.info("Browser session ready! Navigating to website...")
+            
+            driver.set_page_load_timeout(timeout)
+            with self._phase("configure", website_uri, phases) as span:
+                blocked = self._block_requests(driver, profile.blocked_patterns())
+                span.set(profile=profile.name, blocked_patterns=len(blocked))
+            
+            with self._phase("navigate", website_uri, phases):
+                driver.get(website_uri)
+            
+            with self._phase("render_wait", website_uri, phases) as span:
+                readiness = wait_until_ready(driver, profile)
+                span.set(wait_for=profile.wait_for, ready=readiness.get("ready"), reason=readiness.get("reason"))
+            
+            # The solver's detect timeout is only worth paying when a challenge is on the page
+            marker = readiness.get("captcha")
+            if profile.captcha == CAPTCHA_ALWAYS or (profile.captcha == CAPTCHA_AUTO and marker):
+                with self._phase("captcha_wait", website_uri, phases) as span:
+                    span.set(marker=marker)
+                    if blocked:
+                        # Image challenges need their images
+                        self._block_requests(driver, ())
+                    self._handle_captcha(driver)
+                if marker:
+                    with self._phase("render_wait", website_uri, phases):
+                        readiness = wait_until_ready(driver, profile)
+            
+            if not readiness.get("ready"):
+                self.logger.warning(
+                    "Page not ready after %.1fs (%s, waiting for %s%s), using what has rendered",
+                    profile.wait_timeout, readiness.get("reason"), profile.wait_for,
+                    f" + {profile.wait_selector}" if profile.wait_selector else ""
+                )
+            
+            self.logger.info("Page loaded successfully! Extracting content...")
+            with self._phase("page_source", website_uri, phases) as span:
+                html_content = driver.page_source
+                final_url = driver.current_url
+                span.set(html_bytes=len(html_content))
+            
+            elapsed_time = time.time() - start_time
+            self.logger.info(
+                "Scraping completed in %.2f seconds (%s profile: %s)", elapsed_time, profile.name,
+                ", ".join(f"{name} {seconds:.2f}s" for name, seconds in phases.items())
+            )
+            self.logger.info("HTML content size: %d characters", len(html_content))
+            
+            return html_content, final_url
+    
+    def _block_requests(self, driver, patterns: Tuple[str, ...]) -> Tuple[str, ...]:
+        """
+        Make the session refuse requests matching the URL patterns (CDP Network.setBlockedURLs).
+        Pooled sessions remember their patterns, so an unchanged profile costs no round trip,
+        and a session whose endpoint refused blocking is not asked again (new sessions are).
+        Returns the patterns now in effect.
+        """
+        current = getattr(driver, "_blocked_url_patterns", ())
+        if patterns == current or getattr(driver, "_blocking_unsupported", False):
+            return current
+        try:
+            driver.execute('executeCdpCommand', {'cmd': 'Network.enable', 'params': {}})
+            driver.execute('executeCdpCommand', {'cmd': 'Network.setBlockedURLs', 'params': {'urls': list(patterns)}})
+            driver._blocked_url_patterns = patterns
+            return patterns
+        except Exception as e:
+            # Not every endpoint exposes the Network domain; fall back to loading everything
+            driver._blocking_unsupported = True
+            self.logger.warning("Request blocking unavailable for this session, loading all resources: %s", e)
+            return current
+        
+    def _get_chrome_options(self) -> "ChromeOptions":
         """Configure Chrome options for optimal scraping"""
+        from selenium.webdriver import ChromeOptions
         options = ChromeOptions()
         options.add_argument('--no-sandbox')
         options.add_argument('--disable-dev-shm-usage')
         options.add_argument('--disable-gpu')
+        # Sessions are pooled, so the default profile's strategy applies to every page they load
+        options.page_load_strategy = self.load_profile.page_load_strategy
         return options
     
     def _handle_captcha(self, driver) -> None:
@@ -90,75 +475,211 @@ class WebScraper:
         except Exception as e:
             self.logger.warning(f"Captcha handling failed: {str(e)}")
 
+    def extract_clean_content(self, html_content: str) -> str:
+        """
+        Extract and clean the page body in a single parse: scripts, styles and
+        noscript blocks are dropped from the body tree and its text is returned
+        without serializing the intermediate body HTML.
+        
+        Head content never reaches the text, and a fragment without a body is cleaned
+        whole. extract_body_content followed by clean_body_content gives the same text;
+        bench/clean_equivalence.py checks both against the streaming cleaner.
+        """
+        if not html_content:
+            self.logger.warning("No HTML content provided")
+            return ""
+        
+        if SCRAPER_STREAMING_CLEAN and HTML_PARSER == 'lxml':
+            return self._stream_clean_content(html_content)
+        
+        try:
+            self.logger.info("Extracting and cleaning body content (%s parser)", HTML_PARSER)
+            body_content = self._parse_body(html_content)
+            
+            with telemetry.span("clean") as span:
+                cleaned_content = self._clean_tree(body_content)
+                span.set(text_chars=len(cleaned_content))
+            telemetry.page_bytes.observe(len(cleaned_content), kind="text")
+            self.logger.info("Content cleaned: %d characters", len(cleaned_content))
+            return cleaned_content
+            
+        except Exception as e:
+            self.logger.error(f"Error extracting body content: {str(e)}")
+            return ""
+    
+    def _stream_clean_content(self, html_content: str) -> str:
+        """
+        extract_clean_content without a parse tree: lines come straight from the pull parser.
+        The same extract and clean spans as the tree path are emitted, so stage metrics do not
+        depend on SCRAPER_STREAMING_CLEAN: extract covers the parse pass that yields the body's
+        text lines, clean covers assembling them into the cleaned text.
+        """
+        try:
+            self.logger.info("Extracting and cleaning body content (streaming)")
+            with telemetry.span("extract", html_bytes=len(html_content), parser=HTML_PARSER, streaming=True) as span:
+                lines = list(iter_clean_lines(html_content))
+                span.set(lines=len(lines))
+            
+            with telemetry.span("clean", streaming=True) as span:
+                cleaned_content = "\n".join(lines)
+                span.set(text_chars=len(cleaned_content))
+            
+            if not cleaned_content:
+                self.logger.warning("No body text found in HTML")
+            telemetry.page_bytes.observe(len(cleaned_content), kind="text")
+            self.logger.info("Content cleaned: %d characters", len(cleaned_content))
+            return cleaned_content
+            
+        except Exception as e:
+            self.logger.error(f"Error extracting body content: {str(e)}")
+            return ""
+    
+    def stream_chunks(
+        self,
+        html_content: Union[str, Iterable[str]],
+        max_tokens: int = DEFAULT_CHUNK_TOKENS,
+        overlap_tokens: int = 0,
+        model: Optional[str] = None,
+        strategy: str = CHUNK_STRATEGY_PACKED,
+    ) -> Iterator[str]:
+        """
+        Clean and split a page in one pass, yielding chunks as they fill up. The cleaned
+        text is never assembled, so memory beyond the input is bounded by the chunk size
+        rather than the page size. Chunks equal split_dom_content(extract_clean_content(html))
+        except that duplicate removal, which needs the whole text, is not applied.
+        """
+        budget = model_token_budget(max_tokens, model)
+        count = 0
+        for chunk in iter_chunks(iter_clean_lines(html_content), budget, overlap_tokens, strategy):
+            count += 1
+            yield chunk
+        self.logger.info("Streamed %d %s chunks of max ~%d tokens", count, strategy, budget)
+    
+    def _parse_body(self, html_content: str):
+        """Parse a page with its head dropped; returns the body, or the whole document for a fragment without one"""
+        with telemetry.span("extract", html_bytes=len(html_content), parser=HTML_PARSER):
+            soup = BeautifulSoup(strip_head(html_content), HTML_PARSER)
+        if soup.body is None:
+            self.logger.info("No body tag found in HTML, using the whole document")
+        return soup.body or soup
+    
     def extract_body_content(self, html_content: str) -> str:
-        """Extract body content from HTML with logging"""
+        """
+        Body HTML of a page, parsed the same way as extract_clean_content. Kept for callers
+        that need the markup; for text, extract_clean_content avoids the second parse.
+        """
         if not html_content:
             self.logger.warning("No HTML content provided")
             return ""
         
         try:
             self.logger.info("Extracting body content from HTML")
-            soup = BeautifulSoup(html_content, 'html.parser')
-            body_content = soup.body
-            
-            if body_content:
-                result = str(body_content)
-                self.logger.info(f"Body content extracted: {len(result)} characters")
-                return result
-            else:
-                self.logger.warning("No body tag found in HTML")
-                return ""
+            result = str(self._parse_body(html_content))
+            self.logger.info("Body content extracted: %d characters", len(result))
+            return result
                 
         except Exception as e:
             self.logger.error(f"Error extracting body content: {str(e)}")
             return ""
     
     def clean_body_content(self, body_content: str) -> str:
-        """Clean body content by removing scripts, styles, and formatting text"""
+        """Clean body HTML from extract_body_content; a wrapper over extract_clean_content"""
         if not body_content:
             self.logger.warning("No body content provided for cleaning")
             return ""
+        return self.extract_clean_content(body_content)
+    
+    @staticmethod
+    def _clean_tree(node) -> str:
+        """Strip script/style/noscript elements from a parsed tree and return its non-empty text lines"""
+        for script_or_style in node(['script', 'style', 'noscript']):
+            script_or_style.decompose()
         
+        return '\n'.join(
+            stripped for stripped in (line.strip() for line in node.get_text(separator='\n').splitlines()) if stripped
+        )
+    
+    def dedup_content(self, cleaned_content: str, website_uri: Optional[str] = None, level: Optional[str] = None) -> Tuple[str, DedupStats]:
+        """
+        Remove repeated blocks, near-duplicate sections and site-wide boilerplate from
+        cleaned text before it is split, so the same navigation or footer is not sent to
+        the model once per chunk. Returns the reduced text and what was removed.
+        """
         try:
-            self.logger.info("Cleaning body content...")
-            soup = BeautifulSoup(body_content, 'html.parser')
-
-            # Remove script and style elements
-            for script_or_style in soup(['script', 'style', 'noscript']):
-                script_or_style.extract()
-
-            # Get text content
-            cleaned_content = soup.get_text(separator='\n')
-            
-            # Clean up whitespace
-            cleaned_content = '\n'.join(
-                line.strip() for line in cleaned_content.splitlines() if line.strip()
-            )
-            
-            self.logger.info(f"Content cleaned: {len(cleaned_content)} characters")
-            return cleaned_content
-            
+            with telemetry.span("dedup", url=website_uri, text_chars=len(cleaned_content)) as span:
+                deduped, stats = self.deduplicator.dedup(cleaned_content, website_uri, level)
+                span.set(saved_chars=stats.saved_chars)
+            return deduped, stats
         except Exception as e:
-            self.logger.error(f"Error cleaning content: {str(e)}")
-            return ""
+            self.logger.error(f"Error deduplicating content: {str(e)}")
+            return cleaned_content, DedupStats(len(cleaned_content), len(cleaned_content))
     
-    def split_dom_content(self, dom_content: str, max_length: int = 6000) -> List[str]:
-        """Split DOM content into chunks with logging"""
+    def split_dom_content(
+        self,
+        dom_content: str,
+        max_tokens: int = DEFAULT_CHUNK_TOKENS,
+        overlap_tokens: int = 0,
+        model: Optional[str] = None,
+        strategy: str = CHUNK_STRATEGY_PACKED,
+    ) -> List[str]:
+        """
+        Split DOM content into chunks on paragraph/line boundaries, each within a
+        token budget clamped to the model's context window. The "packed" strategy
+        uses the fewest chunks; "content" cuts at content-defined boundaries so a
+        re-scraped page with small edits reproduces most chunks unchanged.
+        """
         if not dom_content:
             self.logger.warning("No DOM content provided for splitting")
             return []
         
-        chunks = [
-            dom_content[i:i + max_length] 
-            for i in range(0, len(dom_content), max_length)
-        ]
+        budget = model_token_budget(max_tokens, model)
+        with telemetry.span("split", text_chars=len(dom_content), strategy=strategy, budget_tokens=budget) as span:
+            chunks = split_text(dom_content, budget, overlap_tokens, strategy)
+            span.set(chunks=len(chunks))
         
-        self.logger.info(f"Content split into {len(chunks)} chunks of max {max_length} characters")
+        self.logger.info(
+            "Content split into %d %s chunks of max ~%d tokens (~%d tokens total, overlap %d)",
+            len(chunks), strategy, budget, estimate_tokens(dom_content), overlap_tokens
+        )
         return chunks
 
-# Create instance for backward compatibility
-scraper = WebScraper()
-scrape_website = scraper.scrape_website
-extract_body_content = scraper.extract_body_content
-clean_body_content = scraper.clean_body_content
-split_dom_content = scraper.split_dom_content
\ No newline at end of file
+_scraper: Optional[WebScraper] = None
+_scraper_lock = threading.Lock()
+
+
+def get_scraper() -> WebScraper:
+    """The process-wide WebScraper, created on first use so importing this module stays cheap"""
+    global _scraper
+    if _scraper is None:
+        with _scraper_lock:
+            if _scraper is None:
+                _scraper = WebScraper()
+                atexit.register(_scraper.close)
+    return _scraper
+
+
+def __getattr__(name: str) -> Any:
+    # `scrape.scraper` still works, but only builds the scraper when it is first accessed
+    if name == "scraper":
+        return get_scraper()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _delegate(name: str) -> Callable[..., Any]:
+    @functools.wraps(getattr(WebScraper, name))
+    def call(*args: Any, **kwargs: Any) -> Any:
+        return getattr(get_scraper(), name)(*args, **kwargs)
+    return call
+
+
+# Module-level functions for backward compatibility
+scrape_website = _delegate("scrape_website")
+scrape_many = _delegate("scrape_many")
+fetch_page = _delegate("fetch_page")
+cache_cleaned_content = _delegate("cache_cleaned_content")
+extract_body_content = _delegate("extract_body_content")
+extract_clean_content = _delegate("extract_clean_content")
+clean_body_content = _delegate("clean_body_content")
+dedup_content = _delegate("dedup_content")
+split_dom_content = _delegate("split_dom_content")
+stream_chunks = _delegate("stream_chunks")
\ No newline at end of file
@@ -0,0 +1,155 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional
+from logging_config import scraper_logger
+
+
+class PooledSession:
+    """A live WebDriver plus the bookkeeping the pool needs to recycle it"""
+
+    def __init__(self, driver: Any):
+        self.driver = driver
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.uses = 0
+
+
+class DriverPool:
+    """
+    Bounded pool of warm WebDriver sessions.
+    At most `size` sessions exist at once; sessions are recycled after `max_uses`
+    checkouts, closed by a background reaper after `idle_timeout` seconds unused
+    (remote sessions are billed while open), and health-checked before being
+    handed out. `driver_factory` creates new sessions, so any object
+    with the Selenium driver interface (e.g. a local stand-in) can be pooled.
+    """
+
+    def __init__(
+        self,
+        driver_factory: Callable[[], Any],
+        size: int = 2,
+        max_uses: int = 20,
+        idle_timeout: float = 300,
+        health_check: Optional[Callable[[Any], bool]] = None,
+    ):
+        self.logger = scraper_logger
+        self.driver_factory = driver_factory
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check or self._default_health_check
+        self._idle: List[PooledSession] = []
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self.created = 0
+        self.reused = 0
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None):
+        """Check out a driver; it is returned to the pool unless the body raised"""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No browser session available within {timeout}s")
+
+        pooled = None
+        try:
+            pooled = self._checkout()
+            yield pooled.driver
+        except Exception:
+            if pooled is not None:
+                self.logger.warning("Discarding browser session after error")
+                self._quit(pooled)
+                pooled = None
+            raise
+        finally:
+            if pooled is not None:
+                self._checkin(pooled)
+            self._slots.release()
+
+    def _checkout(self) -> PooledSession:
+        """Reuse a healthy idle session, or create a fresh one"""
+        while True:
+            with self._lock:
+                pooled = self._idle.pop() if self._idle else None
+            if pooled is None:
+                break
+            if time.time() - pooled.last_used > self.idle_timeout:
+                self.logger.info("Recycling idle browser session")
+                self._quit(pooled)
+                continue
+            if not self.health_check(pooled.driver):
+                self.logger.warning("Browser session failed health check, recycling")
+                self._quit(pooled)
+                continue
+            self.reused += 1
+            pooled.uses += 1
+            return pooled
+
+        self.logger.info("Opening new browser session...")
+        start_time = time.time()
+        pooled = PooledSession(self.driver_factory())
+        pooled.uses = 1
+        self.created += 1
+        self.logger.info(f"Browser session opened in {time.time() - start_time:.2f}s")
+        return pooled
+
+    def _checkin(self, pooled: PooledSession) -> None:
+        """Return a session to the idle list, retiring it once it hits max_uses"""
+        if pooled.uses >= self.max_uses:
+            self.logger.info(f"Retiring browser session after {pooled.uses} uses")
+            self._quit(pooled)
+            return
+        pooled.last_used = time.time()
+        with self._lock:
+            self._idle.append(pooled)
+            if self._reaper is None and not self._closed.is_set():
+                self._reaper = threading.Thread(target=self._reap, name="driver-pool-reaper", daemon=True)
+                self._reaper.start()
+
+    def _reap(self) -> None:
+        """Prune expired sessions until none are left idle; _checkin starts a new reaper when needed"""
+        interval = max(1.0, min(self.idle_timeout / 2, 60.0))
+        while not self._closed.wait(interval):
+            self.prune()
+            with self._lock:
+                if not self._idle:
+                    self._reaper = None
+                    return
+
+    def prune(self) -> int:
+        """Close sessions that have been idle longer than idle_timeout"""
+        now = time.time()
+        with self._lock:
+            expired = [p for p in self._idle if now - p.last_used > self.idle_timeout]
+            self._idle = [p for p in self._idle if p not in expired]
+        for pooled in expired:
+            self._quit(pooled)
+        return len(expired)
+
+    def close(self) -> None:
+        """Quit every idle session and stop the reaper"""
+        self._closed.set()
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._quit(pooled)
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    def _quit(self, pooled: PooledSession) -> None:
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            self.logger.warning(f"Error closing browser session: {str(e)}")
+
+    @staticmethod
+    def _default_health_check(driver: Any) -> bool:
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
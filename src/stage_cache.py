@@ -0,0 +1,66 @@
+import hashlib
+import os
+import threading
+from typing import Any, Callable, Hashable, Tuple
+
+from logging_config import main_logger
+from response_cache import LRUCache
+
+# Memoized stage outputs kept per server process; each entry is one page's text, chunks or index
+STAGE_CACHE_ENTRIES = int(os.getenv("STAGE_CACHE_ENTRIES", "64"))
+
+
+def content_hash(text: str) -> str:
+    """Stable key for a document, so identical content maps to the same cached stage outputs"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class StageCache:
+    """
+    Bounded in-memory memo of pipeline stage outputs (cleaned text, chunks, relevance
+    index) keyed by stage name, input content hash and stage settings. Shared by all
+    Streamlit sessions of the process, so reruns and repeated parse clicks reuse work
+    instead of re-splitting and re-indexing the same page.
+    """
+
+    def __init__(self, max_entries: int = STAGE_CACHE_ENTRIES):
+        self.logger = main_logger
+        self._entries = LRUCache(max_entries)
+        self._key_locks: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, stage: str, digest: str, params: Tuple[Hashable, ...], compute: Callable[[], Any]) -> Any:
+        """Return the memoized output for (stage, digest, params), computing it at most once concurrently"""
+        key = (stage, digest, params)
+        value = self._entries.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                value = self._entries.get(key)
+                if value is not None:
+                    self.hits += 1
+                    return value
+                self.misses += 1
+                value = compute()
+                self._entries.set(key, value)
+                self.logger.debug("Memoized %s for %.12s %s", stage, digest, params)
+                return value
+        finally:
+            with self._lock:
+                self._key_locks.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+stage_cache = StageCache()
@@ -0,0 +1,189 @@
+import os
+import re
+from collections import deque
+from html.parser import HTMLParser
+from typing import Deque, Iterable, Iterator, List, Optional, Union
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Characters of HTML handed to the parser per step; bounds how much text is buffered between yields
+STREAM_FEED_CHARS = int(os.getenv("STREAM_FEED_CHARS", str(64 * 1024)))
+
+# Elements whose text never reaches the cleaned output: what the tree cleaner decomposes,
+# plus template, whose contents BeautifulSoup leaves out of get_text()
+SKIPPED_TAGS = frozenset(("script", "style", "noscript", "template"))
+
+
+HEAD_OPEN_PATTERN = re.compile(r"<head(?:\s[^>]*)?>", re.IGNORECASE)
+HEAD_CLOSE_PATTERN = re.compile(r"</head\s*>", re.IGNORECASE)
+BODY_OPEN_PATTERN = re.compile(r"<body[\s>/]", re.IGNORECASE)
+# A page with no <head> tag this far in is passed through unchanged
+HEAD_SCAN_CHARS = 64 * 1024
+# Characters kept between pieces so a tag split across two pieces is still found
+TAG_TAIL_CHARS = 16
+
+
+def without_head(source: Iterable[str]) -> Iterator[str]:
+    """
+    Drop the contents of the <head> element from a stream of HTML pieces. lxml moves text it
+    does not allow in head (and the title after it) into the body, so both cleaners strip the
+    head from the source first and head content never reaches the cleaned text. A head that
+    is never closed ends where the body starts.
+    """
+    source = iter(source)
+    buffer = ""
+    inside = False
+    for piece in source:
+        buffer += piece
+        if not inside:
+            head = HEAD_OPEN_PATTERN.search(buffer)
+            if head is not None:
+                yield buffer[:head.end()]
+                buffer = buffer[head.end():]
+                inside = True
+            elif BODY_OPEN_PATTERN.search(buffer) or len(buffer) > HEAD_SCAN_CHARS:
+                yield buffer
+                break
+            else:
+                continue
+        end = HEAD_CLOSE_PATTERN.search(buffer) or BODY_OPEN_PATTERN.search(buffer)
+        if end is not None:
+            yield buffer[end.start():]
+            break
+        buffer = buffer[-TAG_TAIL_CHARS:]
+    else:
+        if not inside:
+            yield buffer
+        return
+    yield from source
+
+
+def strip_head(html: str) -> str:
+    """without_head for a whole page"""
+    return "".join(without_head([html]))
+
+
+class TextLineCollector:
+    """
+    Parser target that turns start/end/data events into the cleaned text lines of the
+    page body, without building a tree. Consecutive data events between two markup
+    events form one text node, exactly as BeautifulSoup joins them, so the lines match
+    those of the tree cleaner: each text node's lines, stripped, empty ones dropped.
+    """
+
+    def __init__(self):
+        self.lines: Deque[str] = deque()
+        self._text: List[str] = []
+        self._body_depth = 0
+        self._skip_depth = 0
+
+    def start(self, tag: str, attrib=None) -> None:
+        self._flush()
+        tag = tag.lower()
+        if tag == "body":
+            self._body_depth += 1
+        elif tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def end(self, tag: str) -> None:
+        self._flush()
+        tag = tag.lower()
+        if tag == "body":
+            self._body_depth = max(0, self._body_depth - 1)
+        elif tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+
+    def data(self, text: str) -> None:
+        if self._body_depth and not self._skip_depth:
+            self._text.append(text)
+
+    def comment(self, text: str) -> None:
+        # Comments are dropped but still separate the text around them
+        self._flush()
+
+    def pi(self, target: str, data: Optional[str] = None) -> None:
+        self._flush()
+
+    def close(self) -> None:
+        self._flush()
+
+    def _flush(self) -> None:
+        if not self._text:
+            return
+        text = "".join(self._text)
+        self._text.clear()
+        for line in text.splitlines():
+            stripped = line.strip()
+            if stripped:
+                self.lines.append(stripped)
+
+
+class _HTMLParserAdapter(HTMLParser):
+    """Feeds html.parser events to an lxml-style parser target when lxml is not installed"""
+
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, dict(attrs))
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+    def handle_comment(self, data):
+        self.collector.comment(data)
+
+    def close(self):
+        super().close()
+        self.collector.close()
+
+
+def make_event_parser(target):
+    """
+    An incremental HTML parser that reports start/end/data/comment events to target
+    (lxml's parser-target interface) instead of building a tree; call feed() and close()
+    """
+    if etree is not None:
+        return etree.HTMLParser(target=target, huge_tree=True)
+    return _HTMLParserAdapter(target)
+
+
+def pieces(source: Union[str, Iterable[str]], feed_chars: int) -> Iterator[str]:
+    if isinstance(source, str):
+        for start in range(0, len(source), feed_chars):
+            yield source[start:start + feed_chars]
+    else:
+        yield from source
+
+
+def iter_clean_lines(source: Union[str, Iterable[str]], feed_chars: int = STREAM_FEED_CHARS) -> Iterator[str]:
+    """
+    Stream the cleaned text lines of an HTML document's body. source is the whole page
+    or an iterable of pieces (e.g. a streamed HTTP body); it is fed to an incremental
+    parser feed_chars at a time and lines are yielded as they complete, so memory stays
+    bounded by the feed size and the longest text node rather than the page size.
+    """
+    collector = TextLineCollector()
+    parser = make_event_parser(collector)
+
+    for piece in without_head(pieces(source, feed_chars)):
+        if not piece:
+            continue
+        parser.feed(piece)
+        while collector.lines:
+            yield collector.lines.popleft()
+
+    parser.close()
+    while collector.lines:
+        yield collector.lines.popleft()
@@ -0,0 +1,378 @@
+import csv
+import io
+import json
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Ask the model for JSON through the API's response schema (response_mime_type=application/json)
+STRUCTURED_JSON_MODE = os.getenv("STRUCTURED_JSON_MODE", "true").lower() in ("1", "true", "yes")
+
+# Bump whenever STRUCTURED_TEMPLATE changes so cached responses from the old prompt are not reused
+STRUCTURED_TEMPLATE_VERSION = "structured-1"
+
+STRUCTURED_TEMPLATE = """
+You are an expert data extraction assistant. Your task is to extract records from the provided web content as JSON.
+
+**Content to analyze:**
+{dom_content}
+
+**Records to extract:**
+{parse_description}
+
+**Fields of each record:**
+{fields}
+
+**Instructions:**
+1. Return ONLY a JSON array with one object per matching record found in the content
+2. Use exactly the field names above; use null for a field the content does not give
+3. Numbers and booleans must be JSON numbers and booleans, without units, currency symbols or thousands separators
+4. Extract ONLY records and values that appear in the content; never invent them
+5. If no records are found, return []
+6. Do not include explanations, comments, or markdown code fences
+"""
+
+DEFAULT_RECORDS_DESCRIPTION = "Every item in the content that has these fields"
+
+FIELD_TYPES = ("string", "number", "integer", "boolean")
+FIELD_TYPE_ALIASES = {
+    "str": "string", "text": "string",
+    "float": "number", "decimal": "number", "price": "number",
+    "int": "integer",
+    "bool": "boolean",
+}
+# Column recording which page each record came from
+SOURCE_COLUMN = "_source"
+
+TRUE_STRINGS = frozenset(("true", "yes", "y", "1", "in stock", "available"))
+FALSE_STRINGS = frozenset(("false", "no", "n", "0", "out of stock", "unavailable"))
+NUMBER_PATTERN = re.compile(r"-?\d[\d,]*(?:\.\d+)?|-?\.\d+")
+CODE_FENCE_PATTERN = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+FIELD_LINE_PATTERN = re.compile(r"^(?P<name>[^:*!]+?)\s*(?P<flags>[*!]*)\s*(?::\s*(?P<type>\w+))?(?:\s+-\s*(?P<description>.*))?\s*$")
+
+
+class StructuredOutputError(ValueError):
+    """A model response that is not a JSON array (or object) of records"""
+
+
+@dataclass(frozen=True)
+class SchemaField:
+    """One column of the extraction schema; key fields identify a record for deduplication"""
+    name: str
+    type: str = "string"
+    description: str = ""
+    required: bool = False
+    key: bool = False
+
+
+@dataclass(frozen=True)
+class ExtractionSchema:
+    """
+    The fields every extracted record has. Parsed from JSON or from one field per line in
+    the form "name*!: type - description" (* = key field, ! = required, type defaults to string).
+    """
+    fields: Tuple[SchemaField, ...]
+
+    @property
+    def names(self) -> List[str]:
+        return [field.name for field in self.fields]
+
+    @property
+    def key_fields(self) -> List[str]:
+        return [field.name for field in self.fields if field.key]
+
+    @classmethod
+    def parse(cls, spec: Union[str, List[Any], Dict[str, Any]]) -> "ExtractionSchema":
+        """
+        Build a schema from a JSON list of field objects, a {"name": "type"} mapping, a
+        {"fields": [...]} object, or the line format. Raises ValueError on a bad spec.
+        """
+        if isinstance(spec, str):
+            stripped = spec.strip()
+            if stripped.startswith(("[", "{")):
+                try:
+                    spec = json.loads(stripped)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Schema is not valid JSON: {str(e)}") from e
+            else:
+                return cls._build([cls._parse_line(line) for line in re.split(r"[\n;]", stripped) if line.strip()])
+
+        if isinstance(spec, dict) and "fields" in spec:
+            spec = spec["fields"]
+        if isinstance(spec, dict):
+            return cls._build([{"name": name, "type": field_type} for name, field_type in spec.items()])
+        if isinstance(spec, list):
+            return cls._build([item if isinstance(item, dict) else {"name": str(item)} for item in spec])
+        raise ValueError("Schema must be a list of fields or a mapping of field names to types")
+
+    @staticmethod
+    def _parse_line(line: str) -> Dict[str, Any]:
+        match = FIELD_LINE_PATTERN.match(line.strip())
+        if not match:
+            raise ValueError(f"Cannot parse schema field '{line.strip()}'")
+        flags = match.group("flags") or ""
+        return {
+            "name": match.group("name"),
+            "type": match.group("type") or "string",
+            "description": match.group("description") or "",
+            "key": "*" in flags,
+            "required": "!" in flags,
+        }
+
+    @classmethod
+    def _build(cls, items: List[Dict[str, Any]]) -> "ExtractionSchema":
+        fields = []
+        seen = set()
+        for item in items:
+            name = str(item.get("name", "")).strip()
+            field_type = str(item.get("type", "string")).strip().lower()
+            field_type = FIELD_TYPE_ALIASES.get(field_type, field_type)
+            if not name:
+                raise ValueError("Every schema field needs a name")
+            if name == SOURCE_COLUMN or name in seen:
+                raise ValueError(f"Duplicate or reserved field name '{name}'")
+            if field_type not in FIELD_TYPES:
+                raise ValueError(f"Field '{name}' has unknown type '{field_type}', expected one of {', '.join(FIELD_TYPES)}")
+            seen.add(name)
+            fields.append(SchemaField(
+                name, field_type, str(item.get("description") or "").strip(),
+                bool(item.get("required")), bool(item.get("key")),
+            ))
+        if not fields:
+            raise ValueError("Schema has no fields")
+        return cls(tuple(fields))
+
+    def fingerprint(self) -> str:
+        """Stable text identifying the schema, part of the response cache key"""
+        return json.dumps([[f.name, f.type, f.description, f.required, f.key] for f in self.fields], ensure_ascii=False)
+
+    def describe(self) -> str:
+        """Field list for the prompt"""
+        lines = []
+        for field in self.fields:
+            notes = [field.type] + (["required"] if field.required else []) + (["identifies the record"] if field.key else [])
+            lines.append(f"- {field.name} ({', '.join(notes)})" + (f": {field.description}" if field.description else ""))
+        return "\n".join(lines)
+
+    def response_schema(self) -> Dict[str, Any]:
+        """The schema as a Gemini response_schema: an array of objects"""
+        return {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    field.name: {
+                        "type": field.type.upper(),
+                        "nullable": not field.required,
+                        **({"description": field.description} if field.description else {}),
+                    }
+                    for field in self.fields
+                },
+                "required": [field.name for field in self.fields if field.required],
+                "property_ordering": self.names,
+            },
+        }
+
+    def prompt(self, chunk: str, parse_description: str) -> str:
+        return STRUCTURED_TEMPLATE.format(
+            dom_content=chunk,
+            parse_description=parse_description.strip() or DEFAULT_RECORDS_DESCRIPTION,
+            fields=self.describe(),
+        )
+
+    def coerce(self, record: Any) -> Optional[Dict[str, Any]]:
+        """
+        The record with every schema field converted to its type (None when missing or
+        unconvertible) and unknown keys dropped; None if it is not an object, lacks a
+        required field or has no values at all.
+        """
+        if not isinstance(record, dict):
+            return None
+        lowered = {str(key).strip().lower(): value for key, value in record.items()}
+        coerced = {}
+        for field in self.fields:
+            value = record[field.name] if field.name in record else lowered.get(field.name.lower())
+            value = _coerce_value(value, field.type)
+            if value is None and field.required:
+                return None
+            coerced[field.name] = value
+        return coerced if any(value is not None for value in coerced.values()) else None
+
+
+def _coerce_value(value: Any, field_type: str) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value or value.lower() in ("null", "none", "n/a", "-"):
+            return None
+
+    if field_type == "string":
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, ensure_ascii=False) if isinstance(value, dict) else ", ".join(map(str, value))
+        return str(value)
+
+    if field_type == "boolean":
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, (int, float)):
+            return bool(value)
+        lowered = str(value).lower()
+        return True if lowered in TRUE_STRINGS else False if lowered in FALSE_STRINGS else None
+
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        match = NUMBER_PATTERN.search(str(value))
+        if not match:
+            return None
+        number = float(match.group().replace(",", ""))
+    if math.isnan(number) or math.isinf(number):
+        return None
+    if field_type == "integer":
+        return int(number) if number.is_integer() else None
+    return number
+
+
+def parse_records(text: Optional[str], schema: ExtractionSchema) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Validate a model response against the schema. Returns (records, rejected count);
+    raises StructuredOutputError when the response is not JSON records at all.
+    """
+    if not text or not text.strip():
+        return [], 0
+    try:
+        data = json.loads(CODE_FENCE_PATTERN.sub("", text))
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"Response is not valid JSON: {str(e)}") from e
+
+    if isinstance(data, dict):
+        # One record, or a wrapper such as {"records": [...]} around the array
+        lists = [value for value in data.values() if isinstance(value, list)]
+        is_record = any(name in data for name in schema.names)
+        data = lists[0] if len(lists) == 1 and not is_record else [data]
+    if not isinstance(data, list):
+        raise StructuredOutputError(f"Expected a JSON array of records, got {type(data).__name__}")
+
+    records = []
+    for item in data:
+        record = schema.coerce(item)
+        if record is not None:
+            records.append(record)
+    return records, len(data) - len(records)
+
+
+def _normalize_key_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class RecordTable:
+    """
+    Extracted records stored column by column, deduplicated on the schema's key fields
+    (or on all fields when it has none). A duplicate fills the gaps of the record it matches
+    instead of adding a row. Rows only grow by appending to the column lists, so memory and
+    export time stay linear in the number of records. Safe to fill from several threads.
+    """
+
+    def __init__(self, schema: ExtractionSchema):
+        self.schema = schema
+        self.columns: Dict[str, List[Any]] = {name: [] for name in schema.names + [SOURCE_COLUMN]}
+        self._rows: Dict[Tuple[Any, ...], int] = {}
+        self._key_names = schema.key_fields or schema.names
+        self._lock = threading.Lock()
+        self.merged = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self.columns[SOURCE_COLUMN])
+
+    def _key(self, record: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+        key = tuple(_normalize_key_value(record.get(name)) for name in self._key_names)
+        # Records without any key value cannot be matched, so each one is kept
+        return key if any(value is not None for value in key) else None
+
+    def add(self, records: Iterable[Dict[str, Any]], source: Optional[str] = None) -> int:
+        """Merge already-validated records in; returns how many new rows were added"""
+        added = 0
+        with self._lock:
+            for record in records:
+                key = self._key(record)
+                row = self._rows.get(key) if key is not None else None
+                if row is not None:
+                    self.merged += 1
+                    for name in self.schema.names:
+                        column = self.columns[name]
+                        if column[row] is None and record.get(name) is not None:
+                            column[row] = record[name]
+                    continue
+
+                if key is not None:
+                    self._rows[key] = len(self)
+                for name in self.schema.names:
+                    self.columns[name].append(record.get(name))
+                self.columns[SOURCE_COLUMN].append(source)
+                added += 1
+        return added
+
+    def extend(self, other: "RecordTable") -> int:
+        """Merge another table's rows (e.g. one page's results) into this one"""
+        self.rejected += other.rejected
+        added = 0
+        for record, source in zip(other.records(include_source=False), other.columns[SOURCE_COLUMN]):
+            added += self.add([record], source)
+        return added
+
+    def records(self, include_source: bool = True) -> Iterator[Dict[str, Any]]:
+        names = list(self.columns) if include_source else self.schema.names
+        for values in zip(*(self.columns[name] for name in names)):
+            yield dict(zip(names, values))
+
+    def write_csv(self, output: IO[str]) -> None:
+        """Stream the table to a text file as CSV, header first"""
+        writer = csv.writer(output)
+        writer.writerow(self.columns)
+        writer.writerows(zip(*self.columns.values()))
+
+    def to_csv_bytes(self) -> bytes:
+        buffer = io.StringIO()
+        self.write_csv(buffer)
+        return buffer.getvalue().encode("utf-8")
+
+    def to_arrow(self):
+        """The table as a pyarrow.Table with one typed column per field"""
+        # pyarrow is only imported when a Parquet/Arrow export is requested
+        import pyarrow as pa
+
+        arrow_types = {"string": pa.string(), "number": pa.float64(), "integer": pa.int64(), "boolean": pa.bool_()}
+        arrow_schema = pa.schema(
+            [pa.field(field.name, arrow_types[field.type]) for field in self.schema.fields]
+            + [pa.field(SOURCE_COLUMN, pa.string())]
+        )
+        return pa.Table.from_pydict(self.columns, schema=arrow_schema)
+
+    def write_parquet(self, path: Union[str, IO[bytes]]) -> None:
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), path, compression="zstd")
+
+    def to_parquet_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        self.write_parquet(buffer)
+        return buffer.getvalue()
+
+    def export(self, path: str) -> None:
+        """Write the table to path as Parquet (.parquet/.pq) or CSV (anything else)"""
+        if path.lower().endswith((".parquet", ".pq")):
+            self.write_parquet(path)
+        else:
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                self.write_csv(f)
@@ -0,0 +1,314 @@
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from logging_config import main_logger, reset_log_context, set_log_context, get_log_context, setup_export_logger
+
+# OTLP/JSON span lines (one ExportTraceServiceRequest per line) are appended here when set
+TELEMETRY_SPAN_FILE = os.getenv("TELEMETRY_SPAN_FILE", "")
+# Serve Prometheus text metrics on this port when non-zero, on loopback unless METRICS_HOST says otherwise
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+SERVICE_NAME = "dataharvest-ai"
+
+# Seconds; stages range from a split (~1 ms) to a slow browser load (~60 s)
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7)
+TOKEN_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+# Samples kept per series for percentile queries
+RESERVOIR_SIZE = 1024
+RECENT_SPANS = 500
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> LabelSet:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, with a sample reservoir for percentiles"""
+
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._series: Dict[LabelSet, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    "counts": [0] * len(self.buckets), "sum": 0.0, "count": 0,
+                    "samples": deque(maxlen=RESERVOIR_SIZE),
+                }
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+            series["samples"].append(value)
+
+    def percentiles(self, fractions: Tuple[float, ...] = (0.5, 0.95, 0.99), **labels: Any) -> Optional[Dict[str, float]]:
+        """Percentiles over recent samples of every series matching the given labels"""
+        wanted = set(_labels(labels))
+        with self._lock:
+            samples = [value for key, series in self._series.items() if wanted <= set(key) for value in series["samples"]]
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return {f"p{round(fraction * 100)}": _percentile(ordered, fraction) for fraction in fractions}
+
+    def count(self, **labels: Any) -> int:
+        wanted = set(_labels(labels))
+        with self._lock:
+            return sum(series["count"] for key, series in self._series.items() if wanted <= set(key))
+
+    def exposition(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                base = ",".join(f'{name}="{value}"' for name, value in key)
+                joiner = "," if base else ""
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f'{self.name}_bucket{{{base}{joiner}le="{bound:g}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{base}{joiner}le="+Inf"}} {series["count"]}')
+                suffix = f"{{{base}}}" if base else ""
+                lines.append(f"{self.name}_sum{suffix} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{suffix} {series['count']}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelSet, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        wanted = set(_labels(labels))
+        with self._lock:
+            return sum(value for key, value in self._values.items() if wanted <= set(key))
+
+    def exposition(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                base = ",".join(f'{name}="{label}"' for name, label in key)
+                lines.append(f"{self.name}{{{base}}} {value:g}" if base else f"{self.name} {value:g}")
+        return lines
+
+
+@dataclass
+class Span:
+    """One timed stage; attributes carry URL, sizes, chunk counts and token usage"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class _OtlpLine:
+    """A finished span rendered as one OTLP/JSON export request when the log writer formats it"""
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __str__(self) -> str:
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": "dataharvest.telemetry"}, "spans": [self.span.to_otlp()]}],
+            }]
+        })
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Telemetry:
+    """
+    Spans and metrics for the scrape/parse pipeline. Every finished span feeds the
+    stage_duration_seconds histogram; metrics are exposed in Prometheus text format and
+    spans can be appended to a file as OTLP/JSON, one export request per line.
+    """
+
+    def __init__(self, span_file: Optional[str] = TELEMETRY_SPAN_FILE):
+        self.logger = main_logger
+        self.span_file = span_file or None
+        self.stage_duration = Histogram("stage_duration_seconds", "Duration of pipeline stages", DURATION_BUCKETS)
+        self.page_bytes = Histogram("page_bytes", "Size of fetched and cleaned pages", SIZE_BUCKETS)
+        self.llm_tokens = Histogram("llm_tokens", "Tokens per model call by direction", TOKEN_BUCKETS)
+        self.stage_errors = Counter("stage_errors_total", "Failed pipeline stages")
+        self.scrapes = Counter("scrapes_total", "Scraped pages by serving tier and outcome")
+        self.llm_calls = Counter("llm_calls_total", "Model calls by outcome")
+        self.recent_spans: Deque[Span] = deque(maxlen=RECENT_SPANS)
+        # Spans go through the logging queue, so serialization and file writes happen on its writer thread
+        self._span_log = setup_export_logger(f"span_export.{self.span_file}", self.span_file) if self.span_file else None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        """Open a span without making it current; pair with end_span (e.g. across a generator's yields)"""
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+        )
+        span.set(**attributes)
+        return span
+
+    def end_span(self, span: Span) -> None:
+        self._finish(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Time a block as a child of the current span; exceptions mark it failed and propagate"""
+        span = self.start_span(name, _current_span.get(), **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def bind(self, fn: Callable[..., Any], parent: Optional[Span] = None) -> Callable[..., Any]:
+        """
+        Wrap fn so spans it opens on a worker thread become children of parent
+        (by default the caller's current span), and its logs carry the caller's log context
+        """
+        parent = parent or _current_span.get()
+        log_ids = get_log_context()
+
+        def run(*args: Any, **kwargs: Any) -> Any:
+            token = _current_span.set(parent)
+            log_token = set_log_context(**log_ids)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                reset_log_context(log_token)
+                _current_span.reset(token)
+
+        return run
+
+    def _finish(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        self.stage_duration.observe(span.duration, stage=span.name)
+        if span.error:
+            self.stage_errors.inc(stage=span.name)
+        self.recent_spans.append(span)
+        if self._span_log is not None:
+            self._span_log.info("%s", _OtlpLine(span))
+
+    def stage_percentiles(self, stage: str) -> Optional[Dict[str, float]]:
+        return self.stage_duration.percentiles(stage=stage)
+
+    def prometheus_text(self) -> str:
+        lines: List[str] = []
+        for metric in (self.stage_duration, self.page_bytes, self.llm_tokens, self.stage_errors, self.scrapes, self.llm_calls):
+            lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+    def start_metrics_server(self, port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[int]:
+        """Serve /metrics on host in a daemon thread; idempotent. Returns the bound port, or None if disabled."""
+        if self._server is not None:
+            return self._server.server_port
+        if not port:
+            return None
+
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            self.logger.warning("Metrics endpoint not started on %s:%d: %s", host, port, e)
+            return None
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        self.logger.info("Serving Prometheus metrics on %s:%d/metrics", host, self._server.server_port)
+        return self._server.server_port
+
+
+telemetry = Telemetry()